@@ -63,6 +63,7 @@ export default defineConfig({
             { text: 'Dashboard', link: '/ops/dashboard' },
             { text: 'Docs Hosting', link: '/ops/docs-hosting' },
             { text: 'Operations', link: '/ops/operations' },
+            { text: 'Benchmarks', link: '/ops/benchmarks' },
             { text: 'Runbooks', link: '/ops/runbooks' },
             { text: 'Troubleshooting', link: '/ops/troubleshooting' }
           ]
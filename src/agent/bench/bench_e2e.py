@@ -0,0 +1,221 @@
+"""
+End-to-end load and latency benchmark for the interactive agent.
+
+Runs main.py's Slack handlers and SREScheduler against the fake Claude CLI
+(fake_claude.py), a fake kubectl (fake_kubectl.py) and an in-process fake
+Slack Web API, fully offline.
+
+Usage:
+    python bench_e2e.py --scenario all --events 50 --namespaces 20 --claude-delay 2
+
+Scenarios:
+    mention   N concurrent @mentions in new threads
+    thread    N concurrent replies in threads that already have a session
+    scan      one scheduler cycle over N namespaces
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import resource
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BENCH_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(BENCH_DIR.parent / "main"))
+
+CHANNEL = "CBENCH"
+
+
+def percentile(values: list[float], pct: float) -> float:
+    """Nearest-rank percentile of a list of values."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def summarize(name: str, latencies: list[float], elapsed: float, slack_calls: int) -> dict:
+    """Build the result row for one scenario."""
+    return {
+        "scenario": name,
+        "events": len(latencies),
+        "elapsed_s": round(elapsed, 3),
+        "throughput_per_s": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        "p50_s": round(percentile(latencies, 50), 3),
+        "p99_s": round(percentile(latencies, 99), 3),
+        "max_s": round(max(latencies, default=0.0), 3),
+        "slack_calls": slack_calls,
+        "rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "child_rss_mb": round(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024, 1),
+    }
+
+
+async def timed(coro) -> float:
+    """Await a coroutine and return its duration."""
+    start = time.perf_counter()
+    await coro
+    return time.perf_counter() - start
+
+
+async def bench_mentions(agent, slack, events: int) -> dict:
+    """Mention storm: every event opens a new thread."""
+    from fake_slack import FakeSay, mention_event
+
+    say = FakeSay(agent.slack_client, CHANNEL)
+    calls_before = sum(slack.calls.values())
+    start = time.perf_counter()
+    latencies = await asyncio.gather(*[
+        timed(agent.handle_mention(mention_event(slack, CHANNEL, f"are pods healthy? #{i}"), say))
+        for i in range(events)
+    ])
+    return summarize("mention", latencies, time.perf_counter() - start,
+                     sum(slack.calls.values()) - calls_before)
+
+
+async def bench_thread_replies(agent, slack, events: int) -> dict:
+    """Thread-reply burst: replies to threads that already have sessions."""
+    from fake_slack import FakeSay, message_event
+
+    threads = [slack.next_ts() for _ in range(events)]
+    for i, thread_ts in enumerate(threads):
+        await agent.session_store.save_session(thread_ts, f"bench-session-{i}", CHANNEL)
+
+    say = FakeSay(agent.slack_client, CHANNEL)
+    calls_before = sum(slack.calls.values())
+    start = time.perf_counter()
+    latencies = await asyncio.gather(*[
+        timed(agent.handle_message(message_event(slack, CHANNEL, "what changed?", thread_ts), say))
+        for thread_ts in threads
+    ])
+    return summarize("thread", latencies, time.perf_counter() - start,
+                     sum(slack.calls.values()) - calls_before)
+
+
+async def bench_scan_cycle(agent, slack, namespaces: int) -> dict:
+    """One scheduler cycle over N namespaces."""
+    from scheduler import SREScheduler
+
+    latencies = []
+
+    async def scan(namespace: str, cluster: str):
+        start = time.perf_counter()
+        result = await agent.run_scheduled_scan(namespace, cluster)
+        latencies.append(time.perf_counter() - start)
+        return result
+
+    scheduler = SREScheduler(
+        scan_callback=scan,
+        namespaces=[f"bench-ns-{i}" for i in range(namespaces)],
+        alert_callback=agent.post_scan_digest if agent.SCAN_DIGEST else None
+    )
+    calls_before = sum(slack.calls.values())
+    start = time.perf_counter()
+    await scheduler.run_once()
+    return summarize("scan", latencies, time.perf_counter() - start,
+                     sum(slack.calls.values()) - calls_before)
+
+
+async def run(args) -> list[dict]:
+    # Environment must be set before main is imported
+    workdir = Path(tempfile.mkdtemp(prefix="lucas-bench-"))
+    (workdir / "bin").mkdir()
+    (workdir / "bin" / "claude").symlink_to(BENCH_DIR / "fake_claude.py")
+    # Pod state, log pre-scan, history and answer cache fingerprints never reach a real cluster
+    (workdir / "bin" / "kubectl").symlink_to(BENCH_DIR / "fake_kubectl.py")
+    os.environ["PATH"] = f"{workdir / 'bin'}{os.pathsep}{os.environ['PATH']}"
+    os.environ["SQLITE_PATH"] = str(workdir / "bench.db")
+    os.environ["SRE_ALERT_CHANNEL"] = CHANNEL
+    os.environ.setdefault("SLACK_BOT_TOKEN", "xoxb-bench")
+    os.environ.setdefault("PROMPT_FILE", str(BENCH_DIR.parent / "entrypoint" / "master-prompt-interactive.md"))
+    os.environ.setdefault("LOG_PRESCAN", "false")
+    os.environ.setdefault("DELTA_PROMPTS", "false")
+    os.environ["FAKE_CLAUDE_DELAY"] = str(args.claude_delay)
+    os.environ["FAKE_CLAUDE_RESULT_BYTES"] = str(args.result_bytes)
+    os.environ["FAKE_CLAUDE_TOOL_OUTPUT_BYTES"] = str(args.tool_output_bytes)
+    if args.unhealthy:
+        os.environ["FAKE_CLAUDE_RESULT"] = (
+            "Checked 12 pods. api-7f9c is in CrashLoopBackOff and needs attention.\n"
+            "===VERDICT_START===\n"
+            '{"status": "issues_found", "severity": "high", "pod_count": 12, "summary": "api crashlooping", '
+            '"findings": [{"pod": "api-7f9c", "issue": "CrashLoopBackOff", "severity": "high", '
+            '"action": "Check logs", "fixed": false}]}\n'
+            "===VERDICT_END==="
+        )
+    if args.recording:
+        os.environ["FAKE_CLAUDE_RECORDING"] = str(Path(args.recording).resolve())
+
+    import main as agent
+    from fake_slack import FakeSlackServer
+    from sessions import RunStore, SessionStore
+    from slack_sdk.web.async_client import AsyncWebClient
+    from tools import SlackTools
+
+    if not args.verbose:
+        logging.getLogger().setLevel(logging.WARNING)
+
+    slack = FakeSlackServer(latency=args.slack_latency)
+    await slack.start()
+
+    agent.session_store = SessionStore()
+    await agent.session_store.connect()
+    agent.run_store = RunStore()
+    await agent.run_store.connect()
+    agent.slack_client = AsyncWebClient(token="xoxb-bench", base_url=slack.base_url)
+    agent.slack_tools = SlackTools(agent.slack_client, default_channel=CHANNEL)
+    # Handlers wait for main()'s startup, which the bench does itself
+    agent.health.started.set()
+
+    results = []
+    try:
+        if args.scenario in ("mention", "all"):
+            results.append(await bench_mentions(agent, slack, args.events))
+        if args.scenario in ("thread", "all"):
+            results.append(await bench_thread_replies(agent, slack, args.events))
+        if args.scenario in ("scan", "all"):
+            results.append(await bench_scan_cycle(agent, slack, args.namespaces))
+    finally:
+        await agent.session_store.close()
+        await agent.run_store.close()
+        await slack.stop()
+        shutil.rmtree(workdir, ignore_errors=True)
+    return results
+
+
+def print_table(results: list[dict]):
+    columns = list(results[0].keys())
+    widths = [max(len(c), *(len(str(r[c])) for r in results)) for c in columns]
+    print("  ".join(c.ljust(w) for c, w in zip(columns, widths)))
+    for r in results:
+        print("  ".join(str(r[c]).ljust(w) for c, w in zip(columns, widths)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenario", choices=["mention", "thread", "scan", "all"], default="all")
+    parser.add_argument("--events", type=int, default=20, help="events per mention/thread scenario")
+    parser.add_argument("--namespaces", type=int, default=10, help="namespaces in the scan cycle")
+    parser.add_argument("--claude-delay", type=float, default=1.0, help="seconds per fake agent run")
+    parser.add_argument("--result-bytes", type=int, default=2000, help="size of the fake agent result")
+    parser.add_argument("--tool-output-bytes", type=int, default=4096, help="size of each fake tool result")
+    parser.add_argument("--slack-latency", type=float, default=0.05, help="seconds per fake Slack API call")
+    parser.add_argument("--unhealthy", action="store_true", help="fake agent reports issues, so scans post alerts")
+    parser.add_argument("--recording", help="stream-json file for the fake CLI to replay")
+    parser.add_argument("--json", help="also write results to this JSON file")
+    parser.add_argument("--verbose", action="store_true", help="show agent INFO logs")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    print_table(results)
+    if args.json:
+        Path(args.json).write_text(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,251 @@
+"""
+Storage micro-benchmark for RunStore and SessionStore.
+
+Fills a synthetic database of a configurable size, then measures the
+latency and throughput of the store operations used by the agent, with
+optional concurrent reader load (dashboard-style queries on separate
+connections). Results are appended to a JSONL file and compared with the
+previous result for the same parameters.
+
+Usage:
+    python bench_storage.py --runs 100000 --sessions 20000 --readers 4
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+BENCH_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(BENCH_DIR.parent / "main"))
+
+from bench_e2e import percentile, print_table  # noqa: E402
+from sessions import RunStore, SessionStore  # noqa: E402
+
+DEFAULT_RESULTS = BENCH_DIR / "results" / "storage.jsonl"
+
+# Queries the dashboard runs against the shared database
+READER_QUERIES = [
+    "SELECT id, started_at, namespace, status, pod_count, error_count FROM runs ORDER BY id DESC LIMIT 50",
+    "SELECT status, COUNT(*) FROM runs GROUP BY status",
+    "SELECT namespace, SUM(total_tokens), SUM(cost) FROM token_usage GROUP BY namespace",
+    "SELECT COUNT(*) FROM slack_sessions",
+]
+
+
+def fill(db_path: str, runs: int, sessions: int):
+    """Bulk-insert synthetic rows with plain sqlite3 (not part of the measurement)."""
+    now = datetime.utcnow()
+    rng = random.Random(42)
+    namespaces = [f"ns-{i}" for i in range(20)]
+    report = "Checked pods, found CrashLoopBackOff in api. " * 20
+
+    conn = sqlite3.connect(db_path)
+    conn.executemany(
+        """INSERT INTO runs (started_at, ended_at, namespace, mode, status, pod_count, error_count, report, log)
+           VALUES (?, ?, ?, 'autonomous', ?, ?, ?, ?, ?)""",
+        (
+            (
+                (now - timedelta(minutes=runs - i)).strftime("%Y-%m-%d %H:%M:%S"),
+                (now - timedelta(minutes=runs - i - 1)).strftime("%Y-%m-%d %H:%M:%S"),
+                rng.choice(namespaces),
+                rng.choice(["ok", "ok", "ok", "issues_found", "failed"]),
+                rng.randint(1, 50),
+                rng.randint(0, 3),
+                report,
+                report * 2,
+            )
+            for i in range(runs)
+        )
+    )
+    conn.executemany(
+        """INSERT INTO token_usage (run_id, namespace, model, input_tokens, output_tokens, total_tokens, cost, created_at)
+           VALUES (?, ?, 'claude-sonnet-4-5-20250929', 1200, 300, 1500, 0.0081, ?)""",
+        ((i + 1, rng.choice(namespaces), now.strftime("%Y-%m-%d %H:%M:%S")) for i in range(runs))
+    )
+    conn.executemany(
+        """INSERT INTO slack_sessions (thread_ts, session_id, channel, namespace, created_at, updated_at)
+           VALUES (?, ?, 'CBENCH', NULL, ?, ?)""",
+        (
+            (f"1700000000.{i:06d}", f"session-{i}", now.isoformat(), now.isoformat())
+            for i in range(sessions)
+        )
+    )
+    conn.commit()
+    conn.close()
+
+
+async def measure(name: str, ops: int, operation, setup=None) -> dict:
+    """
+    Run an async operation `ops` times and collect latency stats.
+
+    setup(i), if given, runs before each operation and is not timed.
+    """
+    latencies = []
+    for i in range(ops):
+        if setup:
+            await setup(i)
+        op_start = time.perf_counter()
+        await operation(i)
+        latencies.append(time.perf_counter() - op_start)
+    elapsed = sum(latencies)
+    return {
+        "operation": name,
+        "ops": ops,
+        "ops_per_s": round(ops / elapsed, 1),
+        "mean_ms": round(sum(latencies) / ops * 1000, 3),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+        "max_ms": round(max(latencies) * 1000, 3),
+    }
+
+
+async def reader(db_path: str, stop: asyncio.Event, counts: dict):
+    """Issue dashboard queries on a separate connection until stopped."""
+    import aiosqlite
+
+    async with aiosqlite.connect(db_path) as db:
+        while not stop.is_set():
+            for query in READER_QUERIES:
+                try:
+                    async with db.execute(query) as cursor:
+                        await cursor.fetchall()
+                    counts["queries"] += 1
+                except aiosqlite.OperationalError:
+                    counts["errors"] += 1
+
+
+async def run(args) -> list[dict]:
+    workdir = Path(tempfile.mkdtemp(prefix="lucas-storage-bench-"))
+    db_path = str(workdir / "bench.db")
+
+    run_store = RunStore(db_path)
+    session_store = SessionStore(db_path)
+    await run_store.connect()
+    await session_store.connect()
+
+    fill_start = time.perf_counter()
+    fill(db_path, args.runs, args.sessions)
+    print(f"Filled {args.runs} runs / {args.sessions} sessions in {time.perf_counter() - fill_start:.1f}s")
+
+    stop = asyncio.Event()
+    reader_counts = {"queries": 0, "errors": 0}
+    readers = [asyncio.create_task(reader(db_path, stop, reader_counts)) for _ in range(args.readers)]
+
+    run_ids = []
+    results = []
+    try:
+        async def create_run(i):
+            run_ids.append(await run_store.create_run(f"ns-{i % 20}"))
+
+        async def update_run(i):
+            await run_store.update_run(run_ids[i % len(run_ids)], status="ok", pod_count=10, report="ok " * 500)
+
+        async def record_token_usage(i):
+            await run_store.record_token_usage(run_ids[i % len(run_ids)], "ns-0", "claude-sonnet-4-5-20250929", 1200, 300, 0.0081)
+
+        async def save_session(i):
+            await session_store.save_session(f"1800000000.{i:06d}", f"bench-{i}", "CBENCH")
+
+        async def get_session(i):
+            await session_store.get_session(f"1700000000.{i % max(args.sessions, 1):06d}")
+
+        async def age_sessions(i):
+            # Age a batch of sessions so every cleanup has rows to delete
+            await session_store._db.execute(
+                "UPDATE slack_sessions SET updated_at = ? WHERE rowid IN "
+                "(SELECT rowid FROM slack_sessions ORDER BY rowid LIMIT 10)",
+                ((datetime.utcnow() - timedelta(days=30)).isoformat(),)
+            )
+            await session_store._db.commit()
+
+        async def cleanup_old_sessions(i):
+            await session_store.cleanup_old_sessions(days=7)
+
+        for name, operation, ops, setup in [
+            ("create_run", create_run, args.ops, None),
+            ("update_run", update_run, args.ops, None),
+            ("record_token_usage", record_token_usage, args.ops, None),
+            ("save_session", save_session, args.ops, None),
+            ("get_session", get_session, args.ops, None),
+            ("cleanup_old_sessions", cleanup_old_sessions, max(args.ops // 10, 1), age_sessions),
+        ]:
+            results.append(await measure(name, ops, operation, setup))
+    finally:
+        stop.set()
+        await asyncio.gather(*readers)
+        await run_store.close()
+        await session_store.close()
+        db_size = os.path.getsize(db_path)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print(f"Readers: {reader_counts['queries']} queries, {reader_counts['errors']} errors; "
+          f"database size {db_size / 1024 / 1024:.1f} MB")
+    return results
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BENCH_DIR, stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def load_previous(path: Path, params: dict) -> dict:
+    """Find the most recent stored result with the same parameters."""
+    if not path.exists():
+        return {}
+    previous = {}
+    for line in path.read_text().splitlines():
+        try:
+            entry = json.loads(line)
+        except json.JSONDecodeError:
+            continue
+        if entry.get("params") == params:
+            previous = entry
+    return {r["operation"]: r for r in previous.get("results", [])}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=100000, help="synthetic runs (and token_usage rows)")
+    parser.add_argument("--sessions", type=int, default=10000, help="synthetic Slack sessions")
+    parser.add_argument("--ops", type=int, default=500, help="measured calls per operation")
+    parser.add_argument("--readers", type=int, default=2, help="concurrent reader connections")
+    parser.add_argument("--results", default=str(DEFAULT_RESULTS), help="JSONL file results are appended to")
+    args = parser.parse_args()
+
+    params = {"runs": args.runs, "sessions": args.sessions, "ops": args.ops, "readers": args.readers}
+    results_path = Path(args.results)
+    previous = load_previous(results_path, params)
+
+    results = asyncio.run(run(args))
+    for r in results:
+        before = previous.get(r["operation"])
+        r["p50_change"] = f"{(r['p50_ms'] / before['p50_ms'] - 1) * 100:+.0f}%" if before and before["p50_ms"] else "-"
+    print_table(results)
+
+    results_path.parent.mkdir(parents=True, exist_ok=True)
+    with results_path.open("a") as f:
+        f.write(json.dumps({
+            "timestamp": datetime.utcnow().isoformat(),
+            "commit": git_commit(),
+            "params": params,
+            "results": [{k: v for k, v in r.items() if k != "p50_change"} for r in results],
+        }) + "\n")
+    print(f"Results appended to {results_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Fake Claude Code CLI for offline benchmarks.
+
+Accepts the same arguments as `claude` and writes stream-json output.
+Behaviour is controlled with environment variables:
+
+    FAKE_CLAUDE_RECORDING        Replay this stream-json file instead of generating output
+    FAKE_CLAUDE_DELAY            Total seconds to spend "thinking" (default 1.0)
+    FAKE_CLAUDE_TOOL_CALLS       Simulated tool calls (default 2)
+    FAKE_CLAUDE_TOOL_OUTPUT_BYTES  Size of each tool result (default 4096)
+    FAKE_CLAUDE_RESULT           Final result text
+    FAKE_CLAUDE_RESULT_BYTES     Pad the result text to this many bytes
+"""
+
+import json
+import os
+import sys
+import time
+import uuid
+
+
+def emit(data: dict):
+    sys.stdout.write(json.dumps(data) + "\n")
+    sys.stdout.flush()
+
+
+def replay(path: str, delay: float):
+    """Replay a recorded stream, spreading the delay over its lines."""
+    with open(path) as f:
+        lines = [line for line in f if line.strip()]
+    for line in lines:
+        time.sleep(delay / max(len(lines), 1))
+        sys.stdout.write(line if line.endswith("\n") else line + "\n")
+        sys.stdout.flush()
+
+
+def generate(session_id: str, delay: float):
+    """Generate a synthetic run with tool calls and a final result."""
+    tool_calls = int(os.environ.get("FAKE_CLAUDE_TOOL_CALLS", "2"))
+    tool_output = "x" * int(os.environ.get("FAKE_CLAUDE_TOOL_OUTPUT_BYTES", "4096"))
+    result = os.environ.get(
+        "FAKE_CLAUDE_RESULT",
+        "Checked 12 pods, all good. No issues found.\n"
+        "===VERDICT_START===\n"
+        '{"status": "ok", "severity": "none", "pod_count": 12, "summary": "All good", "findings": []}\n'
+        "===VERDICT_END==="
+    )
+    result = result.ljust(int(os.environ.get("FAKE_CLAUDE_RESULT_BYTES", "0")), ".")
+    step = delay / (tool_calls + 1)
+
+    emit({"type": "system", "subtype": "init", "session_id": session_id})
+    for i in range(tool_calls):
+        tool_id = f"toolu_{i}"
+        emit({"type": "assistant", "session_id": session_id, "message": {"content": [
+            {"type": "tool_use", "id": tool_id, "name": "Bash",
+             "input": {"command": "kubectl get pods -n default"}}
+        ]}})
+        time.sleep(step)
+        emit({"type": "user", "session_id": session_id, "message": {"content": [
+            {"type": "tool_result", "tool_use_id": tool_id, "content": tool_output}
+        ]}})
+    time.sleep(step)
+    emit({
+        "type": "result",
+        "subtype": "success",
+        "result": result,
+        "session_id": session_id,
+        "total_cost_usd": 0.0123,
+        "usage": {"input_tokens": 1200, "output_tokens": 300},
+    })
+
+
+def main():
+    args = sys.argv[1:]
+    # Like the CLI, --fork-session continues a resumed session under a new ID
+    if "--resume" in args and "--fork-session" not in args:
+        session_id = args[args.index("--resume") + 1]
+    else:
+        session_id = str(uuid.uuid4())
+    delay = float(os.environ.get("FAKE_CLAUDE_DELAY", "1.0"))
+
+    recording = os.environ.get("FAKE_CLAUDE_RECORDING")
+    if recording:
+        replay(recording, delay)
+    else:
+        generate(session_id, delay)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+"""
+Fake kubectl for offline benchmarks.
+
+`get pods ... -o json` returns healthy Deployment pods, `logs` returns no
+lines, and every other command succeeds with no output. Controlled with:
+
+    FAKE_KUBECTL_PODS   Pods per namespace (default 12)
+"""
+
+import json
+import os
+import sys
+
+
+def pods() -> dict:
+    items = []
+    for i in range(int(os.environ.get("FAKE_KUBECTL_PODS", "12"))):
+        items.append({
+            "metadata": {
+                "name": f"app{i}-7d9f8c6b5-x{i}",
+                "labels": {"pod-template-hash": "7d9f8c6b5"},
+                "ownerReferences": [{"kind": "ReplicaSet", "name": f"app{i}-7d9f8c6b5"}],
+            },
+            "status": {
+                "phase": "Running",
+                "containerStatuses": [
+                    {"name": "app", "ready": True, "restartCount": 0, "state": {"running": {}}}
+                ],
+            },
+        })
+    return {"items": items}
+
+
+def main():
+    args = sys.argv[1:]
+    if args[:2] == ["get", "pods"]:
+        sys.stdout.write(json.dumps(pods()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""In-process fake Slack Web API and event layer for offline benchmarks."""
+
+import asyncio
+import itertools
+import time
+from collections import Counter
+
+from aiohttp import web
+
+
+class FakeSlackServer:
+    """
+    Minimal Slack Web API served on localhost.
+
+    Point an AsyncWebClient at `base_url` to use it. Every method answers
+    ok after `latency` seconds; chat.postMessage returns a unique ts.
+    """
+
+    def __init__(self, latency: float = 0.05, port: int = 0):
+        self.latency = latency
+        self.port = port
+        self.calls = Counter()
+        self.messages: list[dict] = []
+        self._ts = itertools.count(1)
+        self._runner: web.AppRunner = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.port}/api/"
+
+    async def start(self):
+        http_app = web.Application()
+        http_app.router.add_post("/api/{method}", self._handle)
+        self._runner = web.AppRunner(http_app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, "127.0.0.1", self.port).start()
+        self.port = self._runner.addresses[0][1]
+
+    async def stop(self):
+        if self._runner:
+            await self._runner.cleanup()
+
+    def next_ts(self) -> str:
+        return f"{int(time.time())}.{next(self._ts):06d}"
+
+    async def _handle(self, request: web.Request) -> web.Response:
+        method = request.match_info["method"]
+        self.calls[method] += 1
+        if request.content_type == "application/json":
+            payload = await request.json()
+        else:
+            payload = dict(await request.post())
+        await asyncio.sleep(self.latency)
+
+        if method == "auth.test":
+            return web.json_response({"ok": True, "user_id": "UFAKEBOT", "team_id": "TFAKE"})
+        if method == "chat.postMessage":
+            ts = self.next_ts()
+            self.messages.append({**payload, "ts": ts})
+            return web.json_response({"ok": True, "channel": payload.get("channel"), "ts": ts})
+        return web.json_response({"ok": True})
+
+
+class FakeSay:
+    """Stand-in for Bolt's say() that posts through a Web API client."""
+
+    def __init__(self, client, channel: str):
+        self.client = client
+        self.channel = channel
+
+    async def __call__(self, text: str = "", thread_ts: str = None, **kwargs):
+        return await self.client.chat_postMessage(
+            channel=self.channel, text=text, thread_ts=thread_ts, **kwargs
+        )
+
+
+def mention_event(server: FakeSlackServer, channel: str, text: str, thread_ts: str = None) -> dict:
+    """Build an app_mention event as delivered over socket mode."""
+    ts = server.next_ts()
+    event = {"type": "app_mention", "channel": channel, "user": "UHUMAN",
+             "text": f"<@UFAKEBOT> {text}", "ts": ts}
+    if thread_ts:
+        event["thread_ts"] = thread_ts
+    return event
+
+
+def message_event(server: FakeSlackServer, channel: str, text: str, thread_ts: str = None,
+                  channel_type: str = "channel") -> dict:
+    """Build a message event (thread reply or DM)."""
+    event = {"type": "message", "channel": channel, "user": "UHUMAN", "text": text,
+             "ts": server.next_ts(), "channel_type": channel_type}
+    if thread_ts:
+        event["thread_ts"] = thread_ts
+    return event
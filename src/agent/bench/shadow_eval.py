@@ -0,0 +1,266 @@
+"""
+Shadow evaluation of models and system prompts against stored scans.
+
+Replays the prompts of recent scheduled scans (runs.prompt in lucas.db)
+through other models or system prompt files, or parses recorded CLI output
+offline, and compares the verdicts with the ones the scans produced.
+
+Usage:
+    # Live: run the claude CLI once per scan and variant (needs API access and the cluster)
+    python shadow_eval.py --db lucas.db --runs 20 --variant sonnet --variant opus
+    python shadow_eval.py --db lucas.db --variant sonnet:../entrypoint/my-prompt.md
+
+    # Offline: parse recordings/<variant>/<run_id>.jsonl (stream-json output)
+    python shadow_eval.py --db lucas.db --recordings recordings/
+
+A variant is a CLAUDE_MODEL name ("sonnet", "opus") or model ID, optionally
+followed by ":PROMPT_FILE". Live runs default to the report-only prompt, so
+shadow runs never change the cluster.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import time
+from pathlib import Path
+from typing import NamedTuple, Optional
+
+BENCH_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(BENCH_DIR.parent / "main"))
+
+from bench_e2e import percentile, print_table  # noqa: E402
+
+REPORT_PROMPT = BENCH_DIR.parent / "entrypoint" / "master-prompt-interactive-report.md"
+
+
+class Variant(NamedTuple):
+    """A model and system prompt to evaluate."""
+    name: str
+    model: str
+    prompt_file: str
+
+
+class Replay(NamedTuple):
+    """One stored scan evaluated with one variant."""
+    run_id: int
+    variant: str
+    model: str
+    seconds: float
+    input_tokens: int
+    output_tokens: int
+    cost: float
+    verdict: Optional[dict]
+    error: str
+
+
+def parse_variant(spec: str, model_map: dict[str, str]) -> Variant:
+    """Parse "model[:prompt_file]"; model is a MODEL_MAP key or a model ID."""
+    model, _, prompt_file = spec.partition(":")
+    return Variant(spec, model_map.get(model.lower(), model), prompt_file or str(REPORT_PROMPT))
+
+
+def finding_pods(verdict: dict) -> set[str]:
+    return {f.get("pod", "") for f in verdict.get("findings") or []}
+
+
+def agreement(original: dict, shadow: dict) -> dict:
+    """
+    Compare a shadow verdict with the original one.
+
+    Returns:
+        alert: both verdicts agree on whether something is wrong (status not ok)
+        severity: same overall severity
+        findings: Jaccard overlap of the pods with findings (1.0 if both have none)
+    """
+    pods_a, pods_b = finding_pods(original), finding_pods(shadow)
+    union = pods_a | pods_b
+    return {
+        "alert": (original.get("status") != "ok") == (shadow.get("status") != "ok"),
+        "severity": original.get("severity") == shadow.get("severity"),
+        "findings": len(pods_a & pods_b) / len(union) if union else 1.0,
+    }
+
+
+def verdict_dict(verdict) -> Optional[dict]:
+    """A parsed verdict in the shape stored in runs.verdict."""
+    return json.loads(verdict.to_json()) if verdict else None
+
+
+async def replay_live(agent, run: dict, variant: Variant) -> Replay:
+    """Run a stored scan prompt through the CLI with the variant's model and prompt."""
+    from spans import SpanRecorder
+    from verdict import parse_verdict
+
+    spans = SpanRecorder()
+    try:
+        response, _, token_usage = await agent.run_claude_agent(
+            prompt=run["prompt"],
+            namespace=run["namespace"],
+            entry_point="scan",
+            spans=spans,
+            cluster=run["cluster"],
+            model=variant.model,
+            prompt_file=variant.prompt_file
+        )
+    except agent.AgentUnavailable as e:
+        return Replay(run["id"], variant.name, variant.model, 0.0, 0, 0, 0.0, None, str(e))
+
+    # Process time only, so queueing behind other replays does not count
+    seconds = sum(s["duration_ms"] for s in spans.spans if s["name"] == "agent.process") / 1000
+    return Replay(
+        run["id"], variant.name, token_usage["model"], seconds,
+        token_usage["input_tokens"], token_usage["output_tokens"], usage_cost(agent, token_usage),
+        verdict_dict(parse_verdict(response)),
+        response if response.startswith("Error running agent") else ""
+    )
+
+
+def replay_recording(agent, run: dict, variant: Variant, path: Path) -> Replay:
+    """Parse a recorded stream-json output the way run_claude_agent does."""
+    from claude_stream import ClaudeStreamParser
+    from verdict import parse_verdict
+
+    parser = ClaudeStreamParser(variant.model)
+    duration_ms = 0
+    for line in path.read_text().splitlines():
+        parser.feed(line)
+        try:
+            data = json.loads(line)
+        except json.JSONDecodeError:
+            continue
+        if isinstance(data, dict) and data.get("type") == "result":
+            duration_ms = data.get("duration_ms", 0)
+
+    token_usage = parser.token_usage
+    return Replay(
+        run["id"], variant.name, token_usage["model"], duration_ms / 1000,
+        token_usage["input_tokens"], token_usage["output_tokens"], usage_cost(agent, token_usage),
+        verdict_dict(parse_verdict(parser.final_text())),
+        parser.result_text[:200] if parser.is_error else ""
+    )
+
+
+def usage_cost(agent, token_usage: dict) -> float:
+    """Cost reported by the CLI, or calculated like record_scan_tokens does."""
+    return token_usage.get("cost") or agent.calculate_cost(
+        token_usage["model"], token_usage["input_tokens"], token_usage["output_tokens"]
+    )
+
+
+def original_replays(runs: list[dict]) -> list[Replay]:
+    """The stored scans themselves, as the baseline row."""
+    replays = []
+    for run in runs:
+        seconds = run["agent_seconds"]
+        if not seconds and run["ended_at"]:
+            started = time.strptime(run["started_at"], "%Y-%m-%d %H:%M:%S")
+            ended = time.strptime(run["ended_at"], "%Y-%m-%d %H:%M:%S")
+            seconds = time.mktime(ended) - time.mktime(started)
+        replays.append(Replay(
+            run["id"], "original", run["model"], seconds, run["input_tokens"], run["output_tokens"],
+            run["cost"], json.loads(run["verdict"]) if run["verdict"] else None, ""
+        ))
+    return replays
+
+
+def summarize(name: str, replays: list[Replay], originals: dict[int, Optional[dict]]) -> dict:
+    """Build the result row for one variant."""
+    done = [r for r in replays if not r.error]
+    latencies = [r.seconds for r in done]
+    compared = [
+        agreement(originals[r.run_id], r.verdict)
+        for r in done if r.verdict and originals.get(r.run_id)
+    ]
+    models = sorted({r.model for r in done if r.model})
+
+    def share(key: str) -> float:
+        return round(sum(c[key] for c in compared) / len(compared), 2) if compared else 0.0
+
+    return {
+        "variant": name,
+        "model": ",".join(models) or "-",
+        "runs": len(replays),
+        "errors": len(replays) - len(done),
+        "no_verdict": sum(1 for r in done if not r.verdict),
+        "p50_s": round(percentile(latencies, 50), 1),
+        "p95_s": round(percentile(latencies, 95), 1),
+        "in_tokens": round(sum(r.input_tokens for r in done) / len(done)) if done else 0,
+        "out_tokens": round(sum(r.output_tokens for r in done) / len(done)) if done else 0,
+        "cost_usd": round(sum(r.cost for r in done), 4),
+        "alert_agree": share("alert"),
+        "severity_agree": share("severity"),
+        "findings_overlap": share("findings"),
+    }
+
+
+async def run(args) -> tuple[list[dict], list[Replay]]:
+    # Environment must be set before main is imported
+    os.environ["SQLITE_PATH"] = str(Path(args.db).resolve())
+    os.environ["AGENT_MAX_CONCURRENCY"] = str(args.concurrency)
+    os.environ["AGENT_INTERACTIVE_RESERVE"] = "0"
+    # Shadow runs must not post to Slack
+    os.environ["SLACK_BOT_TOKEN"] = "xoxb-shadow"
+    os.environ["SRE_ALERT_CHANNEL"] = ""
+
+    import main as agent
+    from sessions import RunStore
+
+    if not args.verbose:
+        logging.getLogger().setLevel(logging.WARNING)
+
+    run_store = RunStore()
+    await run_store.connect()
+    try:
+        runs = await run_store.get_replayable_runs(args.runs, args.namespace)
+    finally:
+        await run_store.close()
+    if not runs:
+        raise SystemExit(f"No completed scans with a stored prompt in {args.db}")
+
+    replays = original_replays(runs)
+    if args.recordings:
+        recordings = Path(args.recordings)
+        variants = [parse_variant(d.name, agent.MODEL_MAP) for d in sorted(recordings.iterdir()) if d.is_dir()]
+        for variant in variants:
+            for run_ in runs:
+                path = recordings / variant.name / f"{run_['id']}.jsonl"
+                if path.exists():
+                    replays.append(replay_recording(agent, run_, variant, path))
+    else:
+        variants = [parse_variant(spec, agent.MODEL_MAP) for spec in args.variant or ["sonnet"]]
+        replays += await asyncio.gather(*[
+            replay_live(agent, run_, variant) for variant in variants for run_ in runs
+        ])
+
+    originals = {r.run_id: r.verdict for r in replays if r.variant == "original"}
+    results = [summarize("original", [r for r in replays if r.variant == "original"], originals)]
+    for variant in variants:
+        results.append(summarize(variant.name, [r for r in replays if r.variant == variant.name], originals))
+    return results, replays
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", default="/data/lucas.db", help="lucas.db with the scans to replay")
+    parser.add_argument("--runs", type=int, default=20, help="most recent scans to replay")
+    parser.add_argument("--namespace", help="only replay scans of this namespace")
+    parser.add_argument("--variant", action="append", help="model[:prompt_file]; repeat to compare several")
+    parser.add_argument("--recordings", help="evaluate recordings/<variant>/<run_id>.jsonl instead of running the CLI")
+    parser.add_argument("--concurrency", type=int, default=2, help="live CLI runs at once")
+    parser.add_argument("--json", help="also write the summary and every replay to this JSON file")
+    parser.add_argument("--verbose", action="store_true", help="show agent INFO logs")
+    args = parser.parse_args()
+
+    results, replays = asyncio.run(run(args))
+    print_table(results)
+    if args.json:
+        Path(args.json).write_text(json.dumps(
+            {"summary": results, "replays": [r._asdict() for r in replays]}, indent=2
+        ))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""Cache of agent answers to repeated questions while cluster state is unchanged."""
+
+import hashlib
+import logging
+import re
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import NamedTuple, Optional
+
+from delta import dump_snapshot, summarize_pods
+from metrics import ANSWER_CACHE_LOOKUPS
+from prescan import collect_pod_state
+
+logger = logging.getLogger(__name__)
+
+# Adding --fresh to a message skips the cache
+FORCE_REFRESH_PATTERN = re.compile(r"(?:^|\s)--fresh\b")
+NAMESPACE_TOKEN_PATTERN = re.compile(r"[a-z0-9][a-z0-9-]*")
+QUESTION_START_PATTERN = re.compile(
+    r"^(what|why|how|which|where|when|who|is|are|was|were|does|do|did|can|could|any|show|list|check)\b"
+)
+# Words asking for a change; such messages are never answered from the cache
+MUTATION_PATTERN = re.compile(
+    r"\b(restart|rollout|roll back|rollback|delete|remove|kill|scale|patch|apply|edit|fix|drain|cordon"
+    r"|uncordon|deploy|redeploy|update|upgrade|set|create|evict|annotate|label|revert)\b"
+)
+
+
+class CachedAnswer(NamedTuple):
+    """An answer, the session that produced it, and when."""
+    text: str
+    session_id: Optional[str]
+    created_at: datetime
+    expires_at: float
+
+
+def normalize_question(question: str) -> str:
+    """Lowercase, drop punctuation and collapse whitespace."""
+    return " ".join(re.sub(r"[^\w\s-]", " ", question.lower()).split())
+
+
+def strip_force_refresh(question: str) -> tuple[str, bool]:
+    """Remove the --fresh flag. Returns (question, force_refresh)."""
+    stripped = FORCE_REFRESH_PATTERN.sub(" ", question).strip()
+    return stripped, stripped != question.strip()
+
+
+def is_read_only_question(question: str) -> bool:
+    """Whether a message asks about state rather than for a change."""
+    text = normalize_question(question)
+    if MUTATION_PATTERN.search(text):
+        return False
+    return question.strip().endswith("?") or bool(QUESTION_START_PATTERN.match(text))
+
+
+def find_namespace(question: str, namespaces: list[str]) -> Optional[str]:
+    """The first known namespace named in a question, or None."""
+    tokens = set(NAMESPACE_TOKEN_PATTERN.findall(question.lower()))
+    for namespace in namespaces:
+        if namespace in tokens:
+            return namespace
+    return None
+
+
+async def state_fingerprint(namespace: str, context: str = "") -> str:
+    """Hash of the namespace's pod state (phases, states, reasons, restarts)."""
+    pods = await collect_pod_state(namespace, context=context)
+    return hashlib.sha256(dump_snapshot(summarize_pods(pods)).encode()).hexdigest()[:16]
+
+
+class AnswerCache:
+    """
+    In-memory TTL + LRU cache of answers.
+
+    Keys are (channel, normalized question, namespace, state fingerprint),
+    so answers stay in their channel and any change in the namespace's pods
+    misses the cache. Unless read_only is set (watcher mode, where the agent
+    cannot change anything), only read-only questions are cached.
+    """
+
+    def __init__(self, ttl_seconds: int = 300, max_entries: int = 256, read_only: bool = False):
+        self.ttl = ttl_seconds
+        self.max_entries = max_entries
+        self.read_only = read_only
+        self._entries: OrderedDict[tuple, CachedAnswer] = OrderedDict()
+
+    async def key_for(self, question: str, namespaces: list[str], channel: str) -> Optional[tuple]:
+        """Build the cache key for a question, or None if it cannot be cached."""
+        if not self.read_only and not is_read_only_question(question):
+            return None
+        namespace = find_namespace(question, namespaces)
+        if not namespace:
+            return None
+        try:
+            fingerprint = await state_fingerprint(namespace)
+        except Exception as e:
+            logger.debug(f"Answer cache fingerprint failed for {namespace}: {e}")
+            return None
+        return (channel, normalize_question(question), namespace, fingerprint)
+
+    def get(self, key: tuple) -> Optional[CachedAnswer]:
+        """Return a live entry and mark it recently used."""
+        entry = self._entries.get(key)
+        if entry and entry.expires_at < time.monotonic():
+            del self._entries[key]
+            entry = None
+        if entry is None:
+            ANSWER_CACHE_LOOKUPS.labels("miss").inc()
+            return None
+        self._entries.move_to_end(key)
+        ANSWER_CACHE_LOOKUPS.labels("hit").inc()
+        return entry
+
+    def put(self, key: tuple, text: str, session_id: Optional[str] = None):
+        """Store an answer, evicting the least recently used entries."""
+        self._entries[key] = CachedAnswer(text, session_id, datetime.utcnow(), time.monotonic() + self.ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
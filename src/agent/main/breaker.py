@@ -0,0 +1,175 @@
+"""Circuit breaker that stops spawning agent processes during API outages."""
+
+import asyncio
+import logging
+import re
+import time
+from typing import Optional
+
+from metrics import AGENT_CIRCUIT_REJECTED, AGENT_CIRCUIT_STATE, AGENT_FAILURES
+
+logger = logging.getLogger(__name__)
+
+# Failure causes, checked in order against stderr and the error result
+FAILURE_PATTERNS = (
+    ("auth", re.compile(
+        r"invalid (x-)?api[ -]?key|authentication_error|unauthorized|\b401\b|oauth token has expired"
+        r"|invalid bearer token|credit balance is too low|please run /login",
+        re.IGNORECASE
+    )),
+    ("rate_limited", re.compile(r"\b429\b|rate[ _-]?limit", re.IGNORECASE)),
+    ("overloaded", re.compile(r"\b529\b|overloaded", re.IGNORECASE)),
+    ("unavailable", re.compile(
+        r"\b50[0234]\b|api_error|connection (error|refused|reset)|econnrefused|econnreset|etimedout"
+        r"|socket hang up|request timed out",
+        re.IGNORECASE
+    )),
+)
+# Causes outside the run itself; only these count towards opening the circuit
+UPSTREAM_FAILURES = {kind for kind, _ in FAILURE_PATTERNS}
+
+CLOSED = "closed"
+HALF_OPEN = "half_open"
+OPEN = "open"
+STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+def classify_failure(exit_code: int, stderr: str, result_text: str = "", is_error: bool = False) -> Optional[str]:
+    """
+    Classify a finished CLI run.
+
+    Returns:
+        None for a successful run, one of UPSTREAM_FAILURES for API and
+        credential problems, or "error" for failures of the run itself
+    """
+    if exit_code == 0 and not is_error:
+        return None
+    text = f"{stderr}\n{result_text if is_error else ''}"
+    for kind, pattern in FAILURE_PATTERNS:
+        if pattern.search(text):
+            return kind
+    return "error"
+
+
+class AgentUnavailable(Exception):
+    """The agent cannot answer because the model API is failing."""
+
+    def __init__(self, kind: str, retry_in: float, detail: str = ""):
+        self.kind = kind
+        self.retry_in = retry_in
+        self.detail = detail
+        super().__init__(f"Agent unavailable ({kind}), retry in {retry_in:.0f}s" + (f": {detail}" if detail else ""))
+
+
+class CircuitOpenError(AgentUnavailable):
+    """Raised instead of spawning the CLI while the circuit is open; nothing ran."""
+
+
+class AgentAPIError(AgentUnavailable):
+    """The CLI ran and failed for an upstream reason."""
+
+
+def friendly_error(e: AgentUnavailable) -> str:
+    """Slack text for a run refused or failed because the model API is unavailable."""
+    if e.kind == "auth":
+        return (":lock: I can't authenticate with the model API right now. "
+                "An admin needs to check the API key or credentials.")
+    minutes = max(1, round(e.retry_in / 60))
+    reason = {"rate_limited": "rate limited", "overloaded": "overloaded"}.get(e.kind, "unavailable")
+    return (f":hourglass: The model API is {reason} at the moment. "
+            f"Please try again in about {minutes} minute{'s' if minutes != 1 else ''}.")
+
+
+class CircuitBreaker:
+    """
+    Process-wide breaker for agent CLI runs.
+
+    Opens after `failure_threshold` consecutive upstream failures. While
+    open, runs are refused until the cooldown ends; then one run is let
+    through as a half-open probe. Its success closes the circuit, its
+    failure reopens it with the cooldown doubled (up to `max_cooldown`).
+    Auth failures use `max_cooldown` right away, since retrying will not
+    fix credentials. Failures of the run itself ("error") are neutral.
+    """
+
+    def __init__(self, failure_threshold: int = 3, cooldown: float = 60.0, max_cooldown: float = 900.0):
+        self.failure_threshold = max(1, failure_threshold)
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.state = CLOSED
+        self.failures = 0
+        self.last_kind = ""
+        self._next_cooldown = cooldown
+        self._retry_at = 0.0
+        self._probe_running = False
+        AGENT_CIRCUIT_STATE.set(STATE_VALUES[CLOSED])
+
+    def _set_state(self, state: str):
+        if state != self.state:
+            logger.warning(f"Agent circuit {self.state} -> {state}" + (f" ({self.last_kind})" if self.last_kind else ""))
+        self.state = state
+        AGENT_CIRCUIT_STATE.set(STATE_VALUES[state])
+
+    def retry_in(self) -> float:
+        """Seconds until the next probe may run (0 if runs are admitted)."""
+        return max(0.0, self._retry_at - time.monotonic()) if self.state != CLOSED else 0.0
+
+    def blocked(self) -> bool:
+        """Whether a new run would be refused right now."""
+        if self.state == CLOSED:
+            return False
+        return self._probe_running or time.monotonic() < self._retry_at
+
+    def acquire(self, entry_point: str = "") -> bool:
+        """
+        Admit a run or raise CircuitOpenError.
+
+        Returns:
+            True if the run is the half-open probe
+        """
+        if self.state == CLOSED:
+            return False
+        if self.blocked():
+            AGENT_CIRCUIT_REJECTED.labels(entry_point).inc()
+            raise CircuitOpenError(self.last_kind, self.retry_in() or self.cooldown)
+        self._probe_running = True
+        self._set_state(HALF_OPEN)
+        return True
+
+    def record(self, kind: Optional[str], probe: bool = False):
+        """Record the outcome of an admitted run (kind from classify_failure)."""
+        if kind:
+            AGENT_FAILURES.labels(kind).inc()
+        if probe:
+            self._probe_running = False
+
+        if kind is None:
+            self.failures = 0
+            self._next_cooldown = self.cooldown
+            self.last_kind = ""
+            self._set_state(CLOSED)
+            return
+        if kind not in UPSTREAM_FAILURES:
+            return
+
+        self.failures += 1
+        self.last_kind = kind
+        # Runs admitted before the circuit opened do not extend the cooldown
+        if probe or (self.state == CLOSED and self.failures >= self.failure_threshold):
+            self._open(kind)
+
+    def release_probe(self):
+        """Give the probe slot back after a run that ended without an outcome."""
+        self._probe_running = False
+
+    def _open(self, kind: str):
+        cooldown = self.max_cooldown if kind == "auth" else self._next_cooldown
+        self._next_cooldown = min(self._next_cooldown * 2, self.max_cooldown)
+        self._retry_at = time.monotonic() + cooldown
+        self._set_state(OPEN)
+        logger.warning(f"Agent circuit open after {self.failures} failures, next probe in {cooldown:.0f}s")
+
+    async def wait_until_available(self):
+        """Wait until a run would be admitted; used to defer scheduled scans."""
+        while self.blocked():
+            await asyncio.sleep(max(1.0, self.retry_in()))
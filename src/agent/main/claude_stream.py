@@ -0,0 +1,113 @@
+"""Incremental parser for Claude Code CLI stream-json output."""
+
+import json
+import time
+from typing import Callable, Optional
+
+
+class ClaudeStreamParser:
+    """
+    Parse CLI output one line at a time.
+
+    Tracks the final result, session ID, token usage and the start/end time
+    of every tool call, so output never has to be buffered in full.
+    If on_output is given, it receives a human-readable line for every
+    assistant text block and tool call as they arrive.
+    """
+
+    def __init__(self, model: str, session_id: str = None, on_output: Callable[[str], None] = None):
+        self.on_output = on_output
+        self.result_text = ""
+        # Set by the result message when the CLI reports the run failed
+        self.is_error = False
+        self.session_id = session_id
+        self.token_usage = {"input_tokens": 0, "output_tokens": 0, "model": model, "cost": 0.0}
+        # Completed tool calls: dicts with name, started_at, ended_at, input
+        self.tool_calls: list[dict] = []
+        self._open_tools: dict[str, dict] = {}
+        self._text_lines: list[str] = []
+
+    def feed(self, line: str, at: Optional[float] = None):
+        """Parse one output line. `at` is the wall-clock arrival time."""
+        if not line.strip():
+            return
+        at = at or time.time()
+        try:
+            data = json.loads(line)
+        except json.JSONDecodeError:
+            # Might be plain text output
+            self._text_lines.append(line)
+            if self.on_output:
+                self.on_output(line.rstrip("\n"))
+            return
+        if not isinstance(data, dict):
+            return
+
+        msg_type = data.get("type")
+        if msg_type == "assistant":
+            for block in self._content(data):
+                if block.get("type") == "tool_use":
+                    self._open_tools[block.get("id", "")] = {
+                        "name": block.get("name", "unknown"),
+                        "started_at": at,
+                        "input": block.get("input") or {},
+                    }
+                    if self.on_output:
+                        self.on_output(f"[{block.get('name', 'unknown')}] {json.dumps(block.get('input') or {})[:500]}")
+                elif block.get("type") == "text" and self.on_output:
+                    self.on_output(block.get("text", ""))
+        elif msg_type == "user":
+            for block in self._content(data):
+                if block.get("type") == "tool_result":
+                    call = self._open_tools.pop(block.get("tool_use_id", ""), None)
+                    if call:
+                        call["ended_at"] = at
+                        call["is_error"] = bool(block.get("is_error"))
+                        self.tool_calls.append(call)
+        elif msg_type == "result":
+            self._parse_result(data)
+
+        if data.get("session_id"):
+            self.session_id = data["session_id"]
+
+    @staticmethod
+    def _content(data: dict) -> list[dict]:
+        content = (data.get("message") or {}).get("content") or []
+        return [block for block in content if isinstance(block, dict)] if isinstance(content, list) else []
+
+    def _parse_result(self, data: dict):
+        """Extract result text and token usage from the final result message."""
+        token_usage = self.token_usage
+        self.result_text = data.get("result", "")
+        self.is_error = bool(data.get("is_error"))
+        if "total_cost_usd" in data:
+            token_usage["cost"] = data.get("total_cost_usd", 0)
+        # Get usage from the usage object
+        if data.get("usage"):
+            usage = data["usage"]
+            # Include cache tokens in input count for cost tracking
+            token_usage["input_tokens"] = (
+                usage.get("input_tokens", 0) +
+                usage.get("cache_creation_input_tokens", 0) +
+                usage.get("cache_read_input_tokens", 0)
+            )
+            token_usage["output_tokens"] = usage.get("output_tokens", 0)
+        # Also check modelUsage for detailed breakdown
+        if data.get("modelUsage"):
+            for model_id, model_usage in data["modelUsage"].items():
+                token_usage["model"] = model_id
+                # Use modelUsage if usage wasn't found
+                if not token_usage["input_tokens"]:
+                    token_usage["input_tokens"] = (
+                        model_usage.get("inputTokens", 0) +
+                        model_usage.get("cacheReadInputTokens", 0) +
+                        model_usage.get("cacheCreationInputTokens", 0)
+                    )
+                if not token_usage["output_tokens"]:
+                    token_usage["output_tokens"] = model_usage.get("outputTokens", 0)
+
+    def final_text(self) -> str:
+        """The result text, falling back to any plain text output."""
+        if self.result_text:
+            return self.result_text
+        return "\n".join(self._text_lines).strip() or "No response from agent"
@@ -0,0 +1,76 @@
+"""Scan targets across Kubernetes clusters (kubeconfig contexts)."""
+
+import logging
+import os
+import tempfile
+from pathlib import Path
+from typing import NamedTuple
+
+from prescan import kubectl
+
+logger = logging.getLogger(__name__)
+
+KUBECONFIG_CACHE_DIR = Path(tempfile.gettempdir()) / "lucas-kubeconfigs"
+
+# context -> path of a kubeconfig containing only that context
+_kubeconfigs: dict[str, str] = {}
+
+
+class ScanTarget(NamedTuple):
+    """A namespace in a cluster. cluster "" means the pod's own cluster."""
+    cluster: str
+    namespace: str
+
+    @property
+    def label(self) -> str:
+        return f"{self.cluster}/{self.namespace}" if self.cluster else self.namespace
+
+
+def parse_targets(value: str) -> list[ScanTarget]:
+    """
+    Parse comma-separated targets.
+
+    Each entry is "context/namespace", or a bare namespace for the local cluster.
+    """
+    targets = []
+    for entry in value.split(","):
+        entry = entry.strip()
+        if not entry:
+            continue
+        cluster, _, namespace = entry.rpartition("/")
+        targets.append(ScanTarget(cluster.strip(), namespace.strip()))
+    return targets
+
+
+def get_targets_from_env() -> list[ScanTarget]:
+    """Get targets from SCAN_TARGETS, falling back to TARGET_NAMESPACES."""
+    value = os.environ.get("SCAN_TARGETS") or os.environ.get("TARGET_NAMESPACES", "default")
+    return parse_targets(value)
+
+
+async def kubeconfig_for_context(context: str) -> str:
+    """
+    Write a minified kubeconfig for one context and return its path.
+
+    Agent processes get this file as KUBECONFIG, so every kubectl call they
+    make targets that cluster without needing --context.
+    """
+    if context in _kubeconfigs:
+        return _kubeconfigs[context]
+
+    config = await kubectl("config", "view", "--minify", "--flatten", f"--context={context}")
+    KUBECONFIG_CACHE_DIR.mkdir(mode=0o700, parents=True, exist_ok=True)
+    path = KUBECONFIG_CACHE_DIR / f"{context.replace('/', '_')}.yaml"
+    path.write_text(config)
+    path.chmod(0o600)
+
+    _kubeconfigs[context] = str(path)
+    logger.info(f"Prepared kubeconfig for context {context}")
+    return _kubeconfigs[context]
+
+
+async def kube_env(context: str) -> dict[str, str]:
+    """Environment overrides for running tools against a context."""
+    if not context:
+        return {}
+    return {"KUBECONFIG": await kubeconfig_for_context(context)}
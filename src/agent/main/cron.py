@@ -0,0 +1,301 @@
+"""
+A2W Lucas CronJob runner
+
+Runs one autonomous (or report-only) check per target namespace in a single
+job: creates the run record, renders the master prompt, streams the Claude
+CLI output into the log, parses the closing report and sends the optional
+Slack webhook notification.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import re
+import sys
+from datetime import datetime
+from pathlib import Path
+from typing import Optional, TextIO
+
+from sessions import RunStore
+from claude_stream import ClaudeStreamParser
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s [%(levelname)s] %(name)s: %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+# Environment variables
+SQLITE_PATH = os.environ.get("SQLITE_PATH", "/data/lucas.db")
+LOG_FILE = os.environ.get("LOG_PATH", "/data/lucas.log")
+SLACK_WEBHOOK_URL = os.environ.get("SLACK_WEBHOOK_URL", "")
+SLACK_NOTIFY_SCRIPT = os.environ.get("SLACK_NOTIFY_SCRIPT", "/app/slack-notify.sh")
+# CRON_CONCURRENCY: namespaces checked at once within one job
+CRON_CONCURRENCY = int(os.environ.get("CRON_CONCURRENCY", "1"))
+# RUN_LOG_LIMIT_BYTES: CLI output kept in runs.log per run
+RUN_LOG_LIMIT_BYTES = int(os.environ.get("RUN_LOG_LIMIT_BYTES", "100000"))
+
+# SRE_MODE: "autonomous" (can make changes) or "report" (report only)
+SRE_MODE = os.environ.get("SRE_MODE", "autonomous")
+if SRE_MODE == "report":
+    PROMPT_FILE = "/app/master-prompt-report.md"
+else:
+    PROMPT_FILE = "/app/master-prompt-autonomous.md"
+
+# Max size of one CLI output line (tool results can be large)
+STREAM_LINE_LIMIT = 16 * 1024 * 1024
+
+PLACEHOLDER_PATTERN = re.compile(r"\$(TARGET_NAMESPACE|SQLITE_PATH|RUN_ID|LAST_RUN_TIME)\b")
+REPORT_START = "===REPORT_START==="
+REPORT_END = "===REPORT_END==="
+VALID_STATUSES = {"ok", "fixed", "failed", "issues_found", "running"}
+
+
+def get_namespaces() -> list[str]:
+    """Namespaces to check: TARGET_NAMESPACES (comma-separated) or TARGET_NAMESPACE."""
+    value = os.environ.get("TARGET_NAMESPACES") or os.environ.get("TARGET_NAMESPACE", "default")
+    return [ns.strip() for ns in value.split(",") if ns.strip()]
+
+
+def render_prompt(template: str, values: dict[str, str]) -> str:
+    """Replace all $PLACEHOLDERS in one pass."""
+    return PLACEHOLDER_PATTERN.sub(lambda m: values[m.group(1)], template)
+
+
+class RunOutput:
+    """
+    Sink for one run's CLI output.
+
+    Every line is echoed to stdout and the shared log file, a copy of at
+    most `limit` bytes is kept for runs.log, and the closing report block
+    is picked out as it streams past.
+    """
+
+    def __init__(self, log_file: TextIO, prefix: str = "", limit: int = RUN_LOG_LIMIT_BYTES):
+        self.log_file = log_file
+        self.prefix = prefix
+        self.limit = limit
+        self.report: Optional[str] = None
+        self._parts: list[str] = []
+        self._size = 0
+        self._report_lines: Optional[list[str]] = None
+
+    def write(self, text: str):
+        for line in text.splitlines() or [""]:
+            self._write_line(line)
+
+    def _write_line(self, line: str):
+        out = f"{self.prefix}{line}\n"
+        sys.stdout.write(out)
+        self.log_file.write(out)
+        if self._size < self.limit:
+            kept = out[:self.limit - self._size]
+            self._parts.append(kept)
+            self._size += len(kept)
+
+        if REPORT_START in line:
+            self._report_lines = []
+        elif REPORT_END in line and self._report_lines is not None:
+            self.report = " ".join(part.strip() for part in self._report_lines).strip()
+            self._report_lines = None
+        elif self._report_lines is not None:
+            self._report_lines.append(line)
+
+    def value(self) -> str:
+        """The captured (possibly truncated) output."""
+        return "".join(self._parts)
+
+
+def extract_report(text: str) -> Optional[str]:
+    """Get the last report block from text, joined onto one line."""
+    start = text.rfind(REPORT_START)
+    end = text.find(REPORT_END, start)
+    if start == -1 or end == -1:
+        return None
+    lines = text[start + len(REPORT_START):end].splitlines()
+    return " ".join(line.strip() for line in lines).strip()
+
+
+def parse_report(report: Optional[str]) -> dict:
+    """
+    Parse the closing JSON report.
+
+    Falls back to extracting individual fields when the block is not
+    valid JSON, and to defaults when there is no report at all.
+    """
+    result = {"pod_count": 0, "error_count": 0, "fix_count": 0, "status": "ok", "summary": ""}
+    if not report:
+        return result
+
+    try:
+        data = json.loads(report)
+        if not isinstance(data, dict):
+            data = {}
+    except json.JSONDecodeError:
+        data = {}
+        for key in ("pod_count", "error_count", "fix_count"):
+            match = re.search(rf'"{key}"\s*:\s*(\d+)', report)
+            if match:
+                data[key] = int(match.group(1))
+        for key in ("status", "summary"):
+            match = re.search(rf'"{key}"\s*:\s*"([^"]*)"', report)
+            if match:
+                data[key] = match.group(1)
+
+    for key in ("pod_count", "error_count", "fix_count"):
+        try:
+            result[key] = int(data.get(key, 0))
+        except (TypeError, ValueError):
+            pass
+    result["summary"] = str(data.get("summary") or "")
+    status = data.get("status")
+    result["status"] = status if status in VALID_STATUSES else "ok"
+    return result
+
+
+async def notify_slack(status: str, namespace: str, run_id: int, report: dict):
+    """Send the webhook notification via slack-notify.sh (non-fatal)."""
+    try:
+        process = await asyncio.create_subprocess_exec(
+            SLACK_NOTIFY_SCRIPT, status, namespace, str(run_id),
+            str(report["pod_count"]), str(report["error_count"]), str(report["fix_count"]),
+            report["summary"]
+        )
+        await process.wait()
+        if process.returncode != 0:
+            logger.warning(f"Slack notification failed with exit code {process.returncode}")
+    except Exception as e:
+        logger.warning(f"Slack notification failed (non-fatal): {e}")
+
+
+async def run_namespace(
+    run_store: RunStore,
+    namespace: str,
+    template: Optional[str],
+    log_file: TextIO,
+    semaphore: asyncio.Semaphore,
+    prefix: str = ""
+) -> bool:
+    """
+    Run one check for a namespace and record it.
+
+    Returns:
+        True if the run completed (whatever it found), False if it failed to run
+    """
+    async with semaphore:
+        run_id = await run_store.create_run(namespace, mode=SRE_MODE)
+        logger.info(f"Created run #{run_id} for namespace {namespace}")
+
+        if template is None:
+            await run_store.update_run(run_id=run_id, status="failed", report="Prompt file not found")
+            return False
+
+        try:
+            last_run_time = await run_store.get_last_run_time(namespace, exclude_run_id=run_id)
+            logger.info(f"Last run time for {namespace}: {last_run_time or '(first run)'}")
+            prompt = render_prompt(template, {
+                "TARGET_NAMESPACE": namespace,
+                "SQLITE_PATH": SQLITE_PATH,
+                "RUN_ID": str(run_id),
+                "LAST_RUN_TIME": last_run_time,
+            })
+
+            output = RunOutput(log_file, prefix=prefix)
+            output.write(f"=== Run #{run_id} started at {datetime.now().astimezone().isoformat(timespec='seconds')} ===")
+            output.write(f"Mode: {SRE_MODE} | Namespace: {namespace}")
+            output.write("-" * 40)
+
+            # Parse streaming JSON line by line as it arrives
+            parser = ClaudeStreamParser("", on_output=output.write)
+            process = await asyncio.create_subprocess_exec(
+                "claude",
+                "--dangerously-skip-permissions",
+                "--verbose",
+                "-p", prompt,
+                "--output-format", "stream-json",
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.STDOUT,
+                limit=STREAM_LINE_LIMIT
+            )
+            async for line in process.stdout:
+                parser.feed(line.decode(errors="replace"))
+            await process.wait()
+            output.write(f"=== Run #{run_id} Complete ===")
+
+            # The report is normally in the streamed text; fall back to the final result
+            report_text = output.report or extract_report(parser.final_text())
+            report = parse_report(report_text)
+            logger.info(
+                f"Run #{run_id} final values: pods={report['pod_count']} errors={report['error_count']} "
+                f"fixes={report['fix_count']} status={report['status']}"
+            )
+
+            await run_store.update_run(
+                run_id=run_id,
+                status=report["status"],
+                pod_count=report["pod_count"],
+                error_count=report["error_count"],
+                fix_count=report["fix_count"],
+                report=report_text or "",
+                log=output.value()
+            )
+
+            token_usage = parser.token_usage
+            if token_usage.get("input_tokens") or token_usage.get("output_tokens"):
+                await run_store.record_token_usage(
+                    run_id=run_id,
+                    namespace=namespace,
+                    model=token_usage.get("model") or "unknown",
+                    input_tokens=token_usage.get("input_tokens", 0),
+                    output_tokens=token_usage.get("output_tokens", 0),
+                    cost=token_usage.get("cost", 0)
+                )
+        except Exception as e:
+            logger.error(f"Run #{run_id} for {namespace} failed: {e}", exc_info=True)
+            await run_store.update_run(run_id=run_id, status="failed", report=str(e))
+            return False
+
+        logger.info(f"Run #{run_id} completed with status: {report['status']}")
+        if SLACK_WEBHOOK_URL:
+            await notify_slack(report["status"], namespace, run_id, report)
+        return True
+
+
+async def main() -> int:
+    """Run all namespaces and return the process exit code."""
+    namespaces = get_namespaces()
+    logger.info(f"Lucas cron run: mode={SRE_MODE}, namespaces={namespaces}")
+    if not SLACK_WEBHOOK_URL:
+        logger.info("Slack notifications disabled (SLACK_WEBHOOK_URL not set)")
+
+    try:
+        template = Path(PROMPT_FILE).read_text()
+    except FileNotFoundError:
+        logger.error(f"Prompt file not found: {PROMPT_FILE}")
+        template = None
+
+    run_store = RunStore(SQLITE_PATH)
+    await run_store.connect()
+    logger.info("Database initialized")
+
+    semaphore = asyncio.Semaphore(max(1, CRON_CONCURRENCY))
+    try:
+        with open(LOG_FILE, "w", buffering=1) as log_file:
+            results = await asyncio.gather(*[
+                run_namespace(
+                    run_store, ns, template, log_file, semaphore,
+                    # Tell interleaved output apart when checking several namespaces
+                    prefix=f"[{ns}] " if len(namespaces) > 1 else ""
+                )
+                for ns in namespaces
+            ])
+    finally:
+        await run_store.close()
+
+    return 0 if all(results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,54 @@
+"""De-duplication of redelivered Slack events."""
+
+import logging
+from collections import OrderedDict
+from typing import Optional
+
+from metrics import SLACK_DUPLICATE_EVENTS
+
+logger = logging.getLogger(__name__)
+
+
+def event_key(event: dict, body: Optional[dict] = None) -> str:
+    """
+    Identify a Slack event across redeliveries.
+
+    Uses the envelope's event_id when available, otherwise the event type,
+    channel and message ts.
+    """
+    if body and body.get("event_id"):
+        return body["event_id"]
+    return f"{event.get('type', '')}:{event.get('channel', '')}:{event.get('ts', '')}"
+
+
+class EventDeduplicator:
+    """
+    Drop Slack events that were already handled.
+
+    Recent keys are kept in a bounded in-memory window; every new key is
+    also claimed in SQLite, so redeliveries after a restart are caught too.
+    """
+
+    def __init__(self, session_store, window: int = 5000):
+        self.session_store = session_store
+        self.window = window
+        self._recent: OrderedDict[str, None] = OrderedDict()
+
+    async def is_duplicate(self, event: dict, body: Optional[dict] = None) -> bool:
+        """Claim an event. Returns True if it was seen before."""
+        key = event_key(event, body)
+        duplicate = key in self._recent
+        if not duplicate:
+            self._recent[key] = None
+            while len(self._recent) > self.window:
+                self._recent.popitem(last=False)
+            try:
+                duplicate = not await self.session_store.claim_event(key)
+            except Exception as e:
+                # Handling an event twice beats dropping it
+                logger.warning(f"Failed to record Slack event {key}: {e}")
+
+        if duplicate:
+            SLACK_DUPLICATE_EVENTS.labels(event.get("type", "")).inc()
+            logger.info(f"Dropping duplicate Slack event {key}")
+        return duplicate
@@ -0,0 +1,108 @@
+"""Delta stage: compare cluster state with the previous scan of a namespace."""
+
+import json
+
+# Characters of the previous report carried into the next prompt
+PREVIOUS_REPORT_CHARS = 2000
+
+
+def summarize_pods(pods: list[dict]) -> dict[str, dict]:
+    """
+    Build a compact state summary keyed by "pod/container".
+
+    Pods without container statuses (e.g. Pending) are keyed by pod name.
+    """
+    summary = {}
+    for pod in pods:
+        if not pod["containers"]:
+            summary[pod["name"]] = {"phase": pod["phase"], "healthy": pod["phase"] == "Succeeded"}
+            continue
+        for c in pod["containers"]:
+            summary[f"{pod['name']}/{c['name']}"] = {
+                "phase": pod["phase"],
+                "state": c["state"],
+                "reason": c["reason"] or c.get("last_reason", ""),
+                "restarts": c["restarts"],
+                "healthy": c["ready"] or (pod["phase"] == "Succeeded"),
+            }
+    return summary
+
+
+def _describe(state: dict) -> str:
+    """One-line description of an item's state."""
+    parts = [state.get("phase", "")]
+    if state.get("state") and state["state"] != "running":
+        parts.append(state["state"])
+    if state.get("reason"):
+        parts.append(state["reason"])
+    if "restarts" in state:
+        parts.append(f"{state['restarts']} restarts")
+    return ", ".join(p for p in parts if p)
+
+
+def diff_snapshots(previous: dict[str, dict], current: dict[str, dict]) -> dict[str, list[str]]:
+    """
+    Compare two summaries.
+
+    Returns:
+        Dict with lists of human-readable lines under "new", "resolved" and
+        "changed". Healthy items that did not change are omitted.
+    """
+    new, resolved, changed = [], [], []
+
+    for key, cur in current.items():
+        prev = previous.get(key)
+        if not cur["healthy"]:
+            if prev is None or prev["healthy"]:
+                new.append(f"{key}: {_describe(cur)}")
+            elif prev.get("reason") != cur.get("reason"):
+                # Restart counts of an already failing container are expected to grow
+                changed.append(f"{key}: {_describe(prev)} -> {_describe(cur)}")
+        elif prev is not None and not prev["healthy"]:
+            resolved.append(f"{key}: now {_describe(cur)}")
+        elif prev is not None and cur.get("restarts", 0) > prev.get("restarts", 0):
+            changed.append(f"{key}: restarts {prev['restarts']} -> {cur['restarts']}")
+
+    for key, prev in previous.items():
+        if key not in current and not prev["healthy"]:
+            resolved.append(f"{key}: gone")
+
+    return {"new": new, "resolved": resolved, "changed": changed}
+
+
+def format_delta_prompt(previous_run: dict, delta: dict[str, list[str]]) -> str:
+    """Format the previous verdict plus changes as a prompt section."""
+    report = (previous_run.get("report") or "").strip()
+    if len(report) > PREVIOUS_REPORT_CHARS:
+        report = report[:PREVIOUS_REPORT_CHARS] + "..."
+
+    out = [
+        f"Previous scan (run #{previous_run['id']} at {previous_run['ended_at']} UTC, "
+        f"status: {previous_run['status']}) concluded:",
+        report or "(no report)",
+        "",
+    ]
+    if not any(delta.values()):
+        out.append("Pod state has not changed since that scan. Confirm the previous verdict "
+                   "still holds without re-investigating known issues in depth.")
+        return "\n".join(out)
+
+    out.append("Changes in pod state since that scan (focus on these; unchanged issues are already known):")
+    for label, key in (("New problems", "new"), ("Resolved", "resolved"), ("Changed", "changed")):
+        if delta[key]:
+            out.append(f"{label}:")
+            out.extend(f"- {line}" for line in delta[key])
+    return "\n".join(out)
+
+
+def dump_snapshot(summary: dict[str, dict]) -> str:
+    """Serialize a summary for storage in runs.snapshot."""
+    return json.dumps(summary, separators=(",", ":"), sort_keys=True)
+
+
+def load_snapshot(raw: str) -> dict[str, dict]:
+    """Deserialize a stored summary. Returns {} for missing or invalid data."""
+    try:
+        return json.loads(raw) if raw else {}
+    except json.JSONDecodeError:
+        return {}
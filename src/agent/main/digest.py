@@ -0,0 +1,78 @@
+"""Per-cycle digest of scheduled scan alerts."""
+
+import re
+from typing import NamedTuple, Optional
+
+from verdict import SEVERITIES
+
+# Slack text limit we keep each message under
+MESSAGE_CHARS = 3900
+LABEL_TOKEN_PATTERN = re.compile(r"[a-z0-9](?:[a-z0-9./-]*[a-z0-9])?")
+
+
+class ScanAlert(NamedTuple):
+    """A scan result that needs someone's attention."""
+    label: str
+    namespace: str
+    cluster: str
+    severity: str
+    summary: str
+    report: str
+    session_id: Optional[str]
+
+
+def by_severity(alerts: list[ScanAlert]) -> list[ScanAlert]:
+    """Most severe first, then by label."""
+    rank = {name: i for i, name in enumerate(SEVERITIES)}
+    return sorted(alerts, key=lambda a: (-rank.get(a.severity, 0), a.label))
+
+
+def format_digest(alerts: list[ScanAlert]) -> str:
+    """Top-level digest message: one line per namespace."""
+    out = [f"*Scheduled Scan Digest: {len(alerts)} namespaces need attention*", ""]
+    for alert in by_severity(alerts):
+        summary = alert.summary or (alert.report.strip().split("\n")[0] if alert.report.strip() else "")
+        if len(summary) > 200:
+            summary = summary[:200] + "..."
+        out.append(f"• *{alert.label}* ({alert.severity}): {summary}")
+    out.append("")
+    out.append("_Details are in this thread. Reply naming a namespace to follow up on it._")
+    return "\n".join(out)
+
+
+def format_details(sections: list[tuple[str, str]]) -> list[str]:
+    """
+    Pack (label, text) detail sections into as few thread messages as fit.
+
+    A section longer than one message is truncated.
+    """
+    messages: list[str] = []
+    current = ""
+    for label, text in sections:
+        section = f"*{label}*\n{text.strip()}"
+        if len(section) > MESSAGE_CHARS:
+            section = section[:MESSAGE_CHARS - 30] + "\n\n_(Details truncated)_"
+        if current and len(current) + len(section) + 2 > MESSAGE_CHARS:
+            messages.append(current)
+            current = ""
+        current = f"{current}\n\n{section}" if current else section
+    if current:
+        messages.append(current)
+    return messages
+
+
+def match_label(text: str, labels: list[str]) -> Optional[str]:
+    """
+    The digest namespace a reply is about.
+
+    A full label ("cluster/namespace") wins over a bare namespace; a bare
+    namespace must be unambiguous. None if nothing matches.
+    """
+    tokens = set(LABEL_TOKEN_PATTERN.findall(text.lower()))
+    exact = [label for label in labels if label.lower() in tokens]
+    if len(exact) == 1:
+        return exact[0]
+    by_namespace = [label for label in labels if label.split("/")[-1].lower() in tokens]
+    if len(by_namespace) == 1:
+        return by_namespace[0]
+    return None
@@ -0,0 +1,99 @@
+"""Admission control for agent CLI processes."""
+
+import asyncio
+import heapq
+import itertools
+import logging
+from contextlib import asynccontextmanager
+from enum import IntEnum
+
+from metrics import AGENT_QUEUED
+
+logger = logging.getLogger(__name__)
+
+
+class Priority(IntEnum):
+    """Execution priority classes; lower values run first."""
+    INTERACTIVE = 0
+    ALERT_FOLLOWUP = 1
+    SCHEDULED_SCAN = 2
+
+
+# Priority used for each run_claude_agent entry point
+ENTRY_POINT_PRIORITY = {
+    "mention": Priority.INTERACTIVE,
+    "dm": Priority.INTERACTIVE,
+    "thread": Priority.ALERT_FOLLOWUP,
+    "scan": Priority.SCHEDULED_SCAN,
+}
+
+
+class AgentExecutor:
+    """
+    Global concurrency cap for agent processes with priority admission.
+
+    Waiters are admitted strictly by priority, then arrival order.
+    Scheduled scans may only use `max_concurrency - interactive_reserve`
+    slots, so a human's request never waits behind a full sweep of scans;
+    while higher-priority work is queued, scans are deferred.
+    """
+
+    def __init__(self, max_concurrency: int = 4, interactive_reserve: int = 1):
+        self.max_concurrency = max(1, max_concurrency)
+        self.interactive_reserve = min(max(0, interactive_reserve), self.max_concurrency - 1)
+        self.running = 0
+        self._waiters: list[tuple[int, int, asyncio.Future]] = []
+        self._seq = itertools.count()
+
+    def _limit(self, priority: Priority) -> int:
+        if priority >= Priority.SCHEDULED_SCAN:
+            return self.max_concurrency - self.interactive_reserve
+        return self.max_concurrency
+
+    def _wake(self):
+        """Admit queued waiters in priority order while slots are free."""
+        while self._waiters:
+            priority, _, future = self._waiters[0]
+            if future.done():
+                heapq.heappop(self._waiters)
+                continue
+            if self.running >= self._limit(priority):
+                return
+            heapq.heappop(self._waiters)
+            self.running += 1
+            future.set_result(None)
+
+    async def acquire(self, priority: Priority):
+        """Wait for an execution slot."""
+        if not self._waiters and self.running < self._limit(priority):
+            self.running += 1
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._seq), future))
+        AGENT_QUEUED.labels(priority.name.lower()).inc()
+        # A free slot may be usable by this waiter even if lower priorities are blocked
+        self._wake()
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # Admitted just before cancellation; hand the slot back
+                self.release()
+            raise
+        finally:
+            AGENT_QUEUED.labels(priority.name.lower()).dec()
+
+    def release(self):
+        """Release a slot and admit the next waiters."""
+        self.running -= 1
+        self._wake()
+
+    @asynccontextmanager
+    async def slot(self, priority: Priority):
+        """Hold an execution slot for the duration of the block."""
+        await self.acquire(priority)
+        try:
+            yield
+        finally:
+            self.release()
@@ -0,0 +1,117 @@
+"""Fan-out stage: split a scan of many failing workloads into focused sub-investigations."""
+
+from typing import NamedTuple, Optional
+
+from verdict import Finding, Verdict
+
+# Characters of each sub-report kept in the merged report
+SUBREPORT_CHARS = 1500
+
+
+class Workload(NamedTuple):
+    """A workload with at least one unhealthy pod."""
+    name: str
+    pods: list[dict]
+
+
+class SubResult(NamedTuple):
+    """Outcome of one sub-investigation."""
+    workload: Workload
+    report: str
+    session_id: Optional[str]
+    verdict: Verdict
+
+
+def pod_healthy(pod: dict) -> bool:
+    """Same notion of health as the delta stage: every container ready, or the pod succeeded."""
+    if pod["phase"] == "Succeeded":
+        return True
+    return bool(pod["containers"]) and all(c["ready"] for c in pod["containers"])
+
+
+def find_failing_workloads(pods: list[dict]) -> list[Workload]:
+    """
+    Group unhealthy pods by owning workload.
+
+    Returns:
+        Workloads ordered by number of unhealthy pods, then name
+    """
+    by_workload: dict[str, list[dict]] = {}
+    for pod in pods:
+        if not pod_healthy(pod):
+            by_workload.setdefault(pod.get("workload") or pod["name"], []).append(pod)
+    workloads = [Workload(name, members) for name, members in by_workload.items()]
+    return sorted(workloads, key=lambda w: (-len(w.pods), w.name))
+
+
+def describe_workload(workload: Workload) -> str:
+    """One line per unhealthy pod/container for the sub-investigation prompt."""
+    lines = []
+    for pod in workload.pods:
+        if not pod["containers"]:
+            lines.append(f"- {pod['name']}: {pod['phase']}")
+            continue
+        for c in pod["containers"]:
+            if c["ready"]:
+                continue
+            reason = c["reason"] or c.get("last_reason", "")
+            details = ", ".join(p for p in (pod["phase"], c["state"], reason) if p)
+            lines.append(f"- {pod['name']}/{c['name']}: {details}, {c['restarts']} restarts")
+    return "\n".join(lines)
+
+
+def workload_logs(log_results: list[dict], workload: Workload) -> list[dict]:
+    """Log pre-scan results for the workload's pods only."""
+    names = {pod["name"] for pod in workload.pods}
+    return [r for r in log_results if r["pod"] in names]
+
+
+def workload_delta(delta: dict[str, list[str]], workload: Workload) -> dict[str, list[str]]:
+    """
+    Lines of a diff_snapshots delta that concern the workload.
+
+    Matches the workload's unhealthy pods and, for pods that are now healthy
+    or gone, pods named after the workload.
+    """
+    names = {pod["name"] for pod in workload.pods}
+
+    def ours(line: str) -> bool:
+        pod = line.split(":", 1)[0].split("/", 1)[0]
+        return pod in names or pod.startswith(f"{workload.name}-")
+
+    return {key: [line for line in lines if ours(line)] for key, lines in delta.items()}
+
+
+def format_workload_delta(delta: dict[str, list[str]], workload: Workload) -> str:
+    """Format the workload's changes since the previous scan as a prompt section, or ""."""
+    changes = workload_delta(delta, workload)
+    if not any(changes.values()):
+        return ""
+    out = ["Changes in this workload's pod state since the previous scan:"]
+    for label, key in (("New problems", "new"), ("Resolved", "resolved"), ("Changed", "changed")):
+        if changes.get(key):
+            out.append(f"{label}:")
+            out.extend(f"- {line}" for line in changes[key])
+    return "\n".join(out)
+
+
+def failed_verdict(workload: Workload, issue: str) -> Verdict:
+    """Verdict standing in for a sub-investigation that failed or gave none."""
+    finding = Finding(pod=workload.name, issue=issue, severity="medium", action="", fixed=False)
+    return Verdict("issues_found", "medium", len(workload.pods), issue, [finding])
+
+
+def merge_reports(results: list[SubResult], skipped: list[Workload]) -> str:
+    """Merge sub-reports into one report, one section per workload."""
+    out = [f"Investigated {len(results)} failing workloads separately."]
+    for r in results:
+        report = r.report.strip() or "(no report)"
+        if len(report) > SUBREPORT_CHARS:
+            report = report[:SUBREPORT_CHARS] + "..."
+        out.append(f"\n*{r.workload.name}* ({r.verdict.status}, {r.verdict.severity})\n{report}")
+    if skipped:
+        out.append(
+            f"\nNot investigated ({len(skipped)} more failing workloads): "
+            + ", ".join(w.name for w in skipped)
+        )
+    return "\n".join(out)
@@ -0,0 +1,94 @@
+"""Subsystem states behind the /healthz and /readyz endpoints."""
+
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable
+
+from aiohttp import web
+
+logger = logging.getLogger(__name__)
+
+STARTING = "starting"
+READY = "ready"
+FAILED = "failed"
+DISABLED = "disabled"
+
+
+class Health:
+    """
+    Startup and runtime state of the agent's subsystems.
+
+    The agent is ready once every required subsystem is ready. Probes are
+    called on each request for state that changes at runtime, such as the
+    Socket Mode connection or the circuit breaker.
+    """
+
+    def __init__(self):
+        self.states: dict[str, str] = {}
+        self.details: dict[str, str] = {}
+        self.required: set[str] = set()
+        self.probes: dict[str, Callable[[], Awaitable[tuple[str, str]]]] = {}
+        self.started_at = time.monotonic()
+        # Set when startup has finished; Slack events wait for it
+        self.started = asyncio.Event()
+
+    def register(self, name: str, required: bool = True):
+        """Add a subsystem in the starting state."""
+        self.set(name, STARTING)
+        if required:
+            self.required.add(name)
+
+    def set(self, name: str, state: str, detail: str = ""):
+        self.states[name] = state
+        self.details[name] = detail
+
+    def probe(self, name: str, fn: Callable[[], Awaitable[tuple[str, str]]], required: bool = True):
+        """Report a subsystem's (state, detail) from fn instead of a stored state."""
+        self.probes[name] = fn
+        if required:
+            self.required.add(name)
+
+    async def track(self, name: str, coro: Awaitable, required: bool = True):
+        """Await a startup step, recording it as ready or failed (and re-raising)."""
+        self.register(name, required)
+        start = time.monotonic()
+        try:
+            result = await coro
+        except Exception as e:
+            self.set(name, FAILED, str(e)[:200])
+            raise
+        self.set(name, READY)
+        logger.info(f"{name} ready in {time.monotonic() - start:.2f}s")
+        return result
+
+    async def snapshot(self) -> dict[str, dict]:
+        """Current state and detail of every subsystem."""
+        states = {name: {"state": state, "detail": self.details.get(name, "")} for name, state in self.states.items()}
+        for name, fn in self.probes.items():
+            try:
+                state, detail = await fn()
+            except Exception as e:
+                state, detail = FAILED, str(e)[:200]
+            states[name] = {"state": state, "detail": detail}
+        return states
+
+    async def handle_healthz(self, request: web.Request) -> web.Response:
+        """Liveness: answering at all means the event loop is running."""
+        return web.json_response({
+            "status": "ok",
+            "uptime_seconds": round(time.monotonic() - self.started_at, 1),
+            "subsystems": await self.snapshot(),
+        })
+
+    async def handle_readyz(self, request: web.Request) -> web.Response:
+        """Readiness: 200 once every required subsystem is ready, 503 before."""
+        subsystems = await self.snapshot()
+        waiting = sorted(
+            name for name in self.required
+            if subsystems.get(name, {}).get("state") not in (READY, DISABLED)
+        )
+        return web.json_response(
+            {"status": "not_ready" if waiting else "ready", "waiting": waiting, "subsystems": subsystems},
+            status=503 if waiting else 200
+        )
@@ -0,0 +1,151 @@
+"""History stage: per-container restart and status time series across scans."""
+
+from datetime import datetime, timedelta
+from typing import NamedTuple
+
+TS_FORMAT = "%Y-%m-%d %H:%M:%S"
+# Phase recorded when an item is no longer in the namespace
+GONE = "Gone"
+# Trend lines put into a prompt
+MAX_TREND_LINES = 15
+
+
+class HistoryPoint(NamedTuple):
+    """State of one pod/container from the scan at `ts` on."""
+    ts: str
+    phase: str
+    state: str
+    reason: str
+    restarts: int
+    healthy: bool
+
+
+class Trend(NamedTuple):
+    """Restart and status behaviour of one pod/container over a window."""
+    item: str
+    pattern: str  # "spike", "creeping" or "flapping"
+    restarts_last_hour: int
+    restarts: int
+    flaps: int
+    reasons: list[str]
+
+
+def _point(row: tuple) -> HistoryPoint:
+    ts, phase, state, reason, restarts, healthy = row
+    return HistoryPoint(ts, phase or "", state or "", reason or "", restarts or 0, bool(healthy))
+
+
+async def record_pod_history(run_store, scope: str, summary: dict[str, dict], now: datetime = None) -> int:
+    """
+    Append the items of a pod summary whose state changed since their last point.
+
+    Only changes are stored, so a stable namespace adds no rows. Items that
+    disappeared get one "Gone" point.
+
+    Args:
+        run_store: RunStore holding the pod_history table
+        scope: "[cluster/]namespace"
+        summary: Output of delta.summarize_pods
+
+    Returns:
+        Number of points written
+    """
+    ts = (now or datetime.utcnow()).strftime(TS_FORMAT)
+    latest = {item: _point(row) for item, row in (await run_store.get_latest_pod_points(scope)).items()}
+
+    points: dict[str, HistoryPoint] = {}
+    for item, state in summary.items():
+        point = HistoryPoint(
+            ts, state["phase"], state.get("state", ""), state.get("reason", ""),
+            state.get("restarts", 0), state["healthy"]
+        )
+        previous = latest.get(item)
+        if previous is None or previous[1:] != point[1:]:
+            points[item] = point
+    for item, previous in latest.items():
+        if item not in summary and previous.phase != GONE:
+            points[item] = HistoryPoint(ts, GONE, "", "", previous.restarts, previous.healthy)
+
+    await run_store.append_pod_history(scope, points)
+    return len(points)
+
+
+def compute_trends(history: dict[str, list[HistoryPoint]], now: datetime, window_hours: int = 24) -> list[Trend]:
+    """
+    Summarize restarts and health changes per item within the window.
+
+    `history` holds each item's points in time order, starting with the last
+    point before the window (the baseline). Restarts are counted from
+    restart count increases between points; a drop means the container was
+    recreated. Items without restarts or repeated health changes are left out.
+
+    Returns:
+        Trends, spikes first, then by restarts in the window
+    """
+    since = (now - timedelta(hours=window_hours)).strftime(TS_FORMAT)
+    hour_ago = (now - timedelta(hours=1)).strftime(TS_FORMAT)
+
+    trends = []
+    for item, points in history.items():
+        restarts = last_hour = flaps = 0
+        reasons: list[str] = []
+        for previous, current in zip(points, points[1:]):
+            if current.ts < since or current.phase == GONE:
+                continue
+            increase = current.restarts - previous.restarts
+            if increase < 0:
+                increase = current.restarts
+            restarts += increase
+            if current.ts >= hour_ago:
+                last_hour += increase
+            if previous.phase != GONE and previous.healthy != current.healthy:
+                flaps += 1
+            if not current.healthy and current.reason and current.reason not in reasons:
+                reasons.append(current.reason)
+
+        if restarts:
+            pattern = "spike" if last_hour >= 3 and last_hour * 2 >= restarts else "creeping"
+        elif flaps >= 2:
+            pattern = "flapping"
+        else:
+            continue
+        trends.append(Trend(item, pattern, last_hour, restarts, flaps, reasons))
+
+    return sorted(trends, key=lambda t: (t.pattern != "spike", -t.restarts, t.item))
+
+
+async def load_trends(run_store, scope: str, window_hours: int = 24, now: datetime = None) -> list[Trend]:
+    """Query a scope's history for the window and compute trends."""
+    now = now or datetime.utcnow()
+    since = (now - timedelta(hours=window_hours)).strftime(TS_FORMAT)
+    rows = await run_store.get_pod_history(scope, since)
+    history = {item: [_point(row) for row in item_rows] for item, item_rows in rows.items()}
+    return compute_trends(history, now, window_hours)
+
+
+def format_history_prompt(trends: list[Trend], window_hours: int = 24) -> str:
+    """Format trends as a prompt section. Returns "" if there are none."""
+    if not trends:
+        return ""
+    out = [f"Restart and status history from earlier scans (last {window_hours}h):"]
+    for t in trends[:MAX_TREND_LINES]:
+        if t.pattern == "flapping":
+            line = f"- {t.item}: flapping, changed between healthy and unhealthy {t.flaps} times"
+        elif t.pattern == "spike":
+            line = f"- {t.item}: spike, {t.restarts_last_hour} restarts in the last hour ({t.restarts} in {window_hours}h)"
+        else:
+            line = (
+                f"- {t.item}: creeping, {t.restarts} restarts in {window_hours}h "
+                f"({t.restarts / window_hours:.1f}/h), {t.restarts_last_hour} in the last hour"
+            )
+        if t.reasons:
+            line += f"; reasons: {', '.join(t.reasons)}"
+        out.append(line)
+    if len(trends) > MAX_TREND_LINES:
+        out.append(f"- ... and {len(trends) - MAX_TREND_LINES} more")
+    return "\n".join(out)
+
+
+def trends_for_pods(trends: list[Trend], pod_names: set[str]) -> list[Trend]:
+    """Trends of the given pods' containers."""
+    return [t for t in trends if t.item.split("/")[0] in pod_names]
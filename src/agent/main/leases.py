@@ -0,0 +1,293 @@
+"""SQLite leases that shard scan targets and Slack threads across agent replicas."""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import socket
+import time
+from typing import Awaitable, Callable, Optional
+
+import aiosqlite
+
+from metrics import observe_store_write
+
+logger = logging.getLogger(__name__)
+
+# Thread leases stop being renewed after this long (matches session retention)
+THREAD_LEASE_SECONDS = 7 * 86400
+# A routed event whose handler failed this often is dropped
+MAX_ROUTED_ATTEMPTS = 3
+
+
+def _rendezvous(label: str, replicas: list[str]) -> str:
+    """Pick a replica for a label; only labels of a departed replica move."""
+    return max(replicas, key=lambda r: hashlib.sha1(f"{label}|{r}".encode()).hexdigest())
+
+
+class LeaseManager:
+    """
+    Replica heartbeats plus leases on scan targets and Slack threads.
+
+    Every replica heartbeats into the shared database. Scan targets are
+    spread over live replicas by rendezvous hashing, and each replica
+    leases the targets assigned to it; a lease a dead replica stops
+    renewing expires after `ttl` and is taken over. Threads are leased by
+    the replica that first handles them. Events that arrive at another
+    replica are queued in `routed_events` for the owner to pick up; a row
+    is deleted only after its handler finished, and rows of a dead replica
+    are adopted by a live one.
+    """
+
+    def __init__(
+        self,
+        db_path: str = None,
+        replica_id: str = None,
+        ttl: float = 30.0,
+        heartbeat_interval: float = 10.0,
+        poll_interval: float = 2.0
+    ):
+        self.db_path = db_path or os.environ.get("SQLITE_PATH", "/data/lucas.db")
+        self.replica_id = replica_id or socket.gethostname()
+        self.ttl = ttl
+        self.heartbeat_interval = heartbeat_interval
+        self.poll_interval = poll_interval
+        # Labels of all scan targets; set by the scheduler's owner
+        self.targets: list[str] = []
+        # Called with (kind, event) for events other replicas routed here
+        self.on_routed_event: Optional[Callable[[str, dict], Awaitable[None]]] = None
+        self._owned_targets: set[str] = set()
+        # Routed event rows being handled, and their tasks (referenced so they are not collected)
+        self._in_flight: set[int] = set()
+        self._handler_tasks: set[asyncio.Task] = set()
+        self._db: Optional[aiosqlite.Connection] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def connect(self):
+        """Initialize database connection and create tables."""
+        self._db = await aiosqlite.connect(self.db_path)
+        await self._db.execute("""
+            CREATE TABLE IF NOT EXISTS replicas (
+                replica_id TEXT PRIMARY KEY,
+                started_at REAL NOT NULL,
+                heartbeat_at REAL NOT NULL
+            )
+        """)
+        await self._db.execute("""
+            CREATE TABLE IF NOT EXISTS leases (
+                resource TEXT PRIMARY KEY,
+                owner TEXT NOT NULL,
+                claimed_at REAL NOT NULL,
+                expires_at REAL NOT NULL
+            )
+        """)
+        await self._db.execute("""
+            CREATE TABLE IF NOT EXISTS routed_events (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                owner TEXT NOT NULL,
+                kind TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                claimed_at REAL,
+                attempts INTEGER NOT NULL DEFAULT 0
+            )
+        """)
+        # Add delivery tracking columns if missing (migration)
+        for column in ("claimed_at REAL", "attempts INTEGER NOT NULL DEFAULT 0"):
+            try:
+                await self._db.execute(f"ALTER TABLE routed_events ADD COLUMN {column}")
+            except aiosqlite.OperationalError:
+                pass
+        await self._db.execute(
+            "CREATE INDEX IF NOT EXISTS idx_routed_events_owner ON routed_events(owner)"
+        )
+        await self._db.commit()
+
+    async def close(self):
+        """Close database connection."""
+        if self._db:
+            await self._db.close()
+
+    async def start(self):
+        """Heartbeat once, then keep heartbeating and delivering routed events."""
+        await self.heartbeat()
+        self._task = asyncio.create_task(self._run_loop())
+        logger.info(f"Replica {self.replica_id} started, owns {sorted(self._owned_targets)}")
+
+    async def stop(self):
+        """Stop and hand leases back so other replicas take over immediately."""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        try:
+            await self._db.execute("DELETE FROM leases WHERE owner = ?", (self.replica_id,))
+            await self._db.execute("DELETE FROM replicas WHERE replica_id = ?", (self.replica_id,))
+            await self._db.commit()
+        except Exception as e:
+            logger.warning(f"Failed to release leases: {e}")
+
+    async def _run_loop(self):
+        next_heartbeat = time.monotonic() + self.heartbeat_interval
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            try:
+                if time.monotonic() >= next_heartbeat:
+                    await self.heartbeat()
+                    next_heartbeat = time.monotonic() + self.heartbeat_interval
+                await self._deliver_routed_events()
+            except Exception as e:
+                logger.error(f"Lease loop error: {e}", exc_info=True)
+
+    @observe_store_write("leases")
+    async def heartbeat(self):
+        """Record liveness, renew our leases and rebalance scan targets."""
+        now = time.time()
+        await self._db.execute("""
+            INSERT INTO replicas (replica_id, started_at, heartbeat_at) VALUES (?, ?, ?)
+            ON CONFLICT(replica_id) DO UPDATE SET heartbeat_at = excluded.heartbeat_at
+        """, (self.replica_id, now, now))
+        await self._db.execute("""
+            UPDATE leases SET expires_at = ?
+            WHERE owner = ? AND (resource NOT LIKE 'thread:%' OR claimed_at > ?)
+        """, (now + self.ttl, self.replica_id, now - THREAD_LEASE_SECONDS))
+        # Forget replicas and leases long gone
+        await self._db.execute("DELETE FROM replicas WHERE heartbeat_at < ?", (now - 10 * self.ttl,))
+        await self._db.execute("DELETE FROM leases WHERE expires_at < ?", (now - 10 * self.ttl,))
+        await self._db.commit()
+
+        async with self._db.execute(
+            "SELECT replica_id FROM replicas WHERE heartbeat_at >= ?", (now - self.ttl,)
+        ) as cursor:
+            live = [row[0] for row in await cursor.fetchall()]
+        live = live or [self.replica_id]
+        # Events queued for a replica that died are handled here instead
+        cursor = await self._db.execute(
+            f"UPDATE routed_events SET owner = ? WHERE owner NOT IN ({','.join('?' * len(live))})",
+            (self.replica_id, *live)
+        )
+        await self._db.commit()
+        if cursor.rowcount:
+            logger.warning(f"Replica {self.replica_id} adopted {cursor.rowcount} events routed to dead replicas")
+        await self._rebalance(live)
+
+    async def _rebalance(self, live: list[str]):
+        owned = set()
+        for label in self.targets:
+            resource = f"target:{label}"
+            if _rendezvous(label, live) == self.replica_id:
+                if await self.claim(resource):
+                    owned.add(label)
+            elif label in self._owned_targets:
+                await self.release(resource)
+        if owned != self._owned_targets:
+            logger.info(f"Replica {self.replica_id} now owns targets {sorted(owned)} of {len(live)} replicas")
+        self._owned_targets = owned
+
+    def owns_target(self, label: str) -> bool:
+        """Whether this replica should scan a target."""
+        return label in self._owned_targets
+
+    @observe_store_write("leases")
+    async def claim(self, resource: str) -> bool:
+        """Take or renew a lease. Fails while another live owner holds it."""
+        now = time.time()
+        cursor = await self._db.execute("""
+            INSERT INTO leases (resource, owner, claimed_at, expires_at) VALUES (?, ?, ?, ?)
+            ON CONFLICT(resource) DO UPDATE SET
+                owner = excluded.owner,
+                claimed_at = CASE WHEN leases.owner = excluded.owner THEN leases.claimed_at
+                                  ELSE excluded.claimed_at END,
+                expires_at = excluded.expires_at
+            WHERE leases.owner = excluded.owner OR leases.expires_at < ?
+        """, (resource, self.replica_id, now, now + self.ttl, now))
+        await self._db.commit()
+        return cursor.rowcount == 1
+
+    @observe_store_write("leases")
+    async def release(self, resource: str):
+        """Give up a lease we hold."""
+        await self._db.execute(
+            "DELETE FROM leases WHERE resource = ? AND owner = ?",
+            (resource, self.replica_id)
+        )
+        await self._db.commit()
+
+    async def owner_of(self, resource: str) -> Optional[str]:
+        """The live owner of a lease, if any."""
+        async with self._db.execute(
+            "SELECT owner FROM leases WHERE resource = ? AND expires_at >= ?",
+            (resource, time.time())
+        ) as cursor:
+            row = await cursor.fetchone()
+            return row[0] if row else None
+
+    async def acquire_thread(self, thread_key: str) -> Optional[str]:
+        """
+        Claim a Slack thread for this replica.
+
+        Returns:
+            None if this replica owns the thread now, otherwise the owner's ID
+        """
+        resource = f"thread:{thread_key}"
+        if await self.claim(resource):
+            return None
+        owner = await self.owner_of(resource)
+        # The lease may have expired between the two queries
+        if owner is None and await self.claim(resource):
+            return None
+        return owner
+
+    @observe_store_write("leases")
+    async def route(self, owner: str, kind: str, event: dict):
+        """Queue an event for the replica that owns its thread."""
+        await self._db.execute(
+            "INSERT INTO routed_events (owner, kind, payload, created_at) VALUES (?, ?, ?, ?)",
+            (owner, kind, json.dumps(event), time.time())
+        )
+        await self._db.commit()
+
+    async def _deliver_routed_events(self):
+        """Hand events routed to this replica to on_routed_event, one task each."""
+        if not self.on_routed_event:
+            return
+        async with self._db.execute(
+            "SELECT id, kind, payload, attempts FROM routed_events WHERE owner = ? ORDER BY id",
+            (self.replica_id,)
+        ) as cursor:
+            rows = [row for row in await cursor.fetchall() if row[0] not in self._in_flight]
+
+        for row_id, kind, payload, attempts in rows:
+            if attempts >= MAX_ROUTED_ATTEMPTS:
+                logger.error(f"Dropping routed {kind} event {row_id} after {attempts} attempts: {payload[:200]}")
+                await self._delete_routed_event(row_id)
+                continue
+            await self._db.execute(
+                "UPDATE routed_events SET claimed_at = ?, attempts = attempts + 1 WHERE id = ?",
+                (time.time(), row_id)
+            )
+            await self._db.commit()
+            self._in_flight.add(row_id)
+            # Handle concurrently, like events arriving from Slack
+            task = asyncio.create_task(self._handle_routed_event(row_id, kind, json.loads(payload)))
+            self._handler_tasks.add(task)
+            task.add_done_callback(self._handler_tasks.discard)
+
+    async def _handle_routed_event(self, row_id: int, kind: str, event: dict):
+        """Run the handler; the row is kept for another attempt if it raises."""
+        try:
+            await self.on_routed_event(kind, event)
+        except Exception as e:
+            logger.error(f"Handling routed {kind} event {row_id} failed: {e}", exc_info=True)
+        else:
+            await self._delete_routed_event(row_id)
+        finally:
+            self._in_flight.discard(row_id)
+
+    @observe_store_write("leases")
+    async def _delete_routed_event(self, row_id: int):
+        await self._db.execute("DELETE FROM routed_events WHERE id = ?", (row_id,))
+        await self._db.commit()
@@ -0,0 +1,88 @@
+"""Event loop stall detector."""
+
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+from typing import Optional
+
+from metrics import LOOP_LAG_SECONDS, LOOP_STALLS
+
+logger = logging.getLogger(__name__)
+
+
+class LoopLagMonitor:
+    """
+    Measure how late the event loop runs a sleeping task.
+
+    A task sleeps for `interval` seconds and records how much later than
+    that it actually woke up. Lag above `threshold` is logged and counted
+    as a stall. With capture_stacks, a watchdog thread grabs the loop
+    thread's stack while it is blocked, so the log shows the offending code.
+    """
+
+    def __init__(self, interval: float = 0.5, threshold: float = 0.25, capture_stacks: bool = False):
+        self.interval = interval
+        self.threshold = threshold
+        self.capture_stacks = capture_stacks
+        self._task: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._running = False
+        self._heartbeat = 0.0
+        self._loop_thread_id: Optional[int] = None
+        self._blocked_stack: Optional[str] = None
+
+    async def start(self):
+        """Start sampling on the running loop."""
+        self._running = True
+        self._heartbeat = time.monotonic()
+        self._loop_thread_id = threading.get_ident()
+        self._task = asyncio.create_task(self._sample_loop())
+        if self.capture_stacks:
+            self._watchdog = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+            self._watchdog.start()
+        logger.info(
+            f"Loop monitor started: interval {self.interval}s, stall threshold {self.threshold * 1000:.0f}ms"
+        )
+
+    async def stop(self):
+        """Stop sampling."""
+        self._running = False
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    async def _sample_loop(self):
+        while self._running:
+            start = time.monotonic()
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            self._heartbeat = now
+
+            lag = max(0.0, now - start - self.interval)
+            LOOP_LAG_SECONDS.observe(lag)
+            if lag > self.threshold:
+                LOOP_STALLS.inc()
+                stack, self._blocked_stack = self._blocked_stack, None
+                if stack:
+                    logger.warning(f"Event loop stalled for {lag * 1000:.0f}ms, blocked in:\n{stack}")
+                else:
+                    logger.warning(f"Event loop stalled for {lag * 1000:.0f}ms")
+
+    def _watch(self):
+        """Capture the loop thread's stack once per stall (runs in a thread)."""
+        captured_for = None
+        while self._running:
+            time.sleep(self.threshold / 2)
+            heartbeat = self._heartbeat
+            overdue = time.monotonic() - heartbeat - self.interval
+            if overdue > self.threshold and captured_for != heartbeat:
+                frame = sys._current_frames().get(self._loop_thread_id)
+                if frame is not None:
+                    self._blocked_stack = "".join(traceback.format_stack(frame))
+                    captured_for = heartbeat
@@ -8,20 +8,51 @@ A Slack-integrated Claude agent that:
 """
 
 import asyncio
+import functools
 import logging
 import os
 import re
 import subprocess
-import json
+import time
 from pathlib import Path
 
+import aiohttp
 from slack_bolt.async_app import AsyncApp
 from slack_bolt.adapter.socket_mode.async_handler import AsyncSocketModeHandler
 from slack_sdk.web.async_client import AsyncWebClient
 
 from sessions import SessionStore, RunStore
-from tools import SlackTools, resolve_pending_reply
+from tools import SlackTools
 from scheduler import SREScheduler
+from prescan import collect_pod_state, collect_new_logs, format_log_summary, save_log_cursors
+from delta import summarize_pods, diff_snapshots, format_delta_prompt, dump_snapshot, load_snapshot
+from claude_stream import ClaudeStreamParser
+from spans import SpanRecorder
+from loopmon import LoopLagMonitor
+from clusters import kube_env, get_targets_from_env
+from answercache import AnswerCache, strip_force_refresh
+from dedup import EventDeduplicator
+from leases import LeaseManager
+from runbooks import RunbookIndex
+from verdict import (
+    VERDICT_INSTRUCTIONS, SEVERITIES, parse_verdict, strip_verdict, severity_at_least, merge_verdicts
+)
+from history import record_pod_history, load_trends, format_history_prompt, trends_for_pods
+from digest import ScanAlert, by_severity, format_digest, format_details, match_label
+from fanout import (
+    SubResult, find_failing_workloads, describe_workload, workload_logs, format_workload_delta,
+    failed_verdict, merge_reports
+)
+from execution import AgentExecutor, Priority, ENTRY_POINT_PRIORITY
+from health import Health, READY, STARTING, FAILED, DISABLED
+from breaker import (
+    CLOSED, CircuitBreaker, AgentUnavailable, AgentAPIError,
+    UPSTREAM_FAILURES, classify_failure, friendly_error
+)
+from metrics import (
+    AGENT_RUN_SECONDS, AGENT_QUEUE_WAIT_SECONDS, AGENT_INFLIGHT, PENDING_REPLIES,
+    record_token_metrics, slack_trace_config, start_metrics_server
+)
 
 # Configure logging
 logging.basicConfig(
@@ -36,6 +67,62 @@ SLACK_APP_TOKEN = os.environ.get("SLACK_APP_TOKEN")
 SLACK_BOT_USER_ID = os.environ.get("SLACK_BOT_USER_ID", "")
 SRE_ALERT_CHANNEL = os.environ.get("SRE_ALERT_CHANNEL", "")
 SCAN_INTERVAL = int(os.environ.get("SCAN_INTERVAL_SECONDS", "300"))
+# LOG_PRESCAN: fetch only new log lines per container before each scheduled scan
+LOG_PRESCAN = os.environ.get("LOG_PRESCAN", "true").lower() == "true"
+# DELTA_PROMPTS: give scheduled scans the previous verdict plus only what changed
+DELTA_PROMPTS = os.environ.get("DELTA_PROMPTS", "true").lower() == "true"
+# POD_HISTORY: record restart/status changes at each scan and give scans the trends
+POD_HISTORY = os.environ.get("POD_HISTORY", "true").lower() == "true"
+POD_HISTORY_WINDOW_HOURS = int(os.environ.get("POD_HISTORY_WINDOW_HOURS", "24"))
+POD_HISTORY_RETENTION_DAYS = int(os.environ.get("POD_HISTORY_RETENTION_DAYS", "14"))
+# RUNBOOK_INJECTION: put runbook excerpts matching pod state or the question into the prompt
+RUNBOOK_INJECTION = os.environ.get("RUNBOOK_INJECTION", "true").lower() == "true"
+RUNBOOKS_DIR = os.environ.get("RUNBOOKS_DIR", "/runbooks")
+RUNBOOK_MAX_CHARS = int(os.environ.get("RUNBOOK_MAX_CHARS", "6000"))
+# ANSWER_CACHE: reuse answers to repeated fresh-session questions while pod state is unchanged
+ANSWER_CACHE = os.environ.get("ANSWER_CACHE", "true").lower() == "true"
+ANSWER_CACHE_TTL_SECONDS = int(os.environ.get("ANSWER_CACHE_TTL_SECONDS", "300"))
+ANSWER_CACHE_MAX_ENTRIES = int(os.environ.get("ANSWER_CACHE_MAX_ENTRIES", "256"))
+# SLACK_EVENT_DEDUP_WINDOW: recent Slack event IDs kept in memory to drop redeliveries
+SLACK_EVENT_DEDUP_WINDOW = int(os.environ.get("SLACK_EVENT_DEDUP_WINDOW", "5000"))
+# SCAN_ALERT_SEVERITY: lowest verdict severity that posts a scheduled scan alert
+SCAN_ALERT_SEVERITY = os.environ.get("SCAN_ALERT_SEVERITY", "low").lower()
+# SCAN_FANOUT_MIN_WORKLOADS: failing workloads that split a scan into one sub-investigation each (0 disables)
+SCAN_FANOUT_MIN_WORKLOADS = int(os.environ.get("SCAN_FANOUT_MIN_WORKLOADS", "4"))
+SCAN_FANOUT_MAX_WORKLOADS = int(os.environ.get("SCAN_FANOUT_MAX_WORKLOADS", "10"))
+SCAN_FANOUT_CONCURRENCY = int(os.environ.get("SCAN_FANOUT_CONCURRENCY", "3"))
+# SCAN_DIGEST: post a cycle's scan alerts as one digest once there are SCAN_DIGEST_MIN_ALERTS of them
+SCAN_DIGEST = os.environ.get("SCAN_DIGEST", "true").lower() == "true"
+SCAN_DIGEST_MIN_ALERTS = int(os.environ.get("SCAN_DIGEST_MIN_ALERTS", "2"))
+# METRICS_PORT: port for the Prometheus /metrics endpoint (0 disables it)
+METRICS_PORT = int(os.environ.get("METRICS_PORT", "9090"))
+
+# LOOP_MONITOR: log and export event loop stalls above LOOP_STALL_THRESHOLD_MS
+LOOP_MONITOR = os.environ.get("LOOP_MONITOR", "true").lower() == "true"
+LOOP_STALL_THRESHOLD_MS = int(os.environ.get("LOOP_STALL_THRESHOLD_MS", "250"))
+# LOOP_STALL_STACKS: also log the stack of the code blocking the loop
+LOOP_STALL_STACKS = os.environ.get("LOOP_STALL_STACKS", "false").lower() == "true"
+
+# AGENT_MAX_CONCURRENCY: agent processes running at once across all entry points
+AGENT_MAX_CONCURRENCY = int(os.environ.get("AGENT_MAX_CONCURRENCY", "4"))
+# AGENT_INTERACTIVE_RESERVE: slots scheduled scans may never use
+AGENT_INTERACTIVE_RESERVE = int(os.environ.get("AGENT_INTERACTIVE_RESERVE", "1"))
+
+# LEASES_ENABLED: shard scan targets and Slack threads across replicas sharing the database
+LEASES_ENABLED = os.environ.get("LEASES_ENABLED", "false").lower() == "true"
+# LEASE_TTL_SECONDS: a replica that has not heartbeated this long loses its leases
+LEASE_TTL_SECONDS = int(os.environ.get("LEASE_TTL_SECONDS", "30"))
+
+# AGENT_CIRCUIT_FAILURES: consecutive API/credential failures that stop new agent runs
+AGENT_CIRCUIT_FAILURES = int(os.environ.get("AGENT_CIRCUIT_FAILURES", "3"))
+AGENT_CIRCUIT_COOLDOWN_SECONDS = int(os.environ.get("AGENT_CIRCUIT_COOLDOWN_SECONDS", "60"))
+AGENT_CIRCUIT_MAX_COOLDOWN_SECONDS = int(os.environ.get("AGENT_CIRCUIT_MAX_COOLDOWN_SECONDS", "900"))
+
+# PENDING_QUESTION_TTL_HOURS: drop slack_ask questions nobody answered after this long
+PENDING_QUESTION_TTL_HOURS = int(os.environ.get("PENDING_QUESTION_TTL_HOURS", "24"))
+
+# Max size of one CLI output line (tool results can be large)
+STREAM_LINE_LIMIT = 16 * 1024 * 1024
 
 # SRE_MODE: "autonomous" (can make changes) or "watcher" (read-only, report only)
 SRE_MODE = os.environ.get("SRE_MODE", "autonomous")
@@ -73,20 +160,46 @@ def calculate_cost(model: str, input_tokens: int, output_tokens: int) -> float:
 # Initialize Slack app
 app = AsyncApp(token=SLACK_BOT_TOKEN)
 
+# Admission control for agent processes
+executor = AgentExecutor(AGENT_MAX_CONCURRENCY, AGENT_INTERACTIVE_RESERVE)
+# Stops spawning agent processes while the model API or credentials are failing
+circuit = CircuitBreaker(AGENT_CIRCUIT_FAILURES, AGENT_CIRCUIT_COOLDOWN_SECONDS, AGENT_CIRCUIT_MAX_COOLDOWN_SECONDS)
+# Subsystem states served on /healthz and /readyz
+health = Health()
+
+# Answers to repeated questions, keyed by question, namespace and pod state
+answer_cache = AnswerCache(
+    ANSWER_CACHE_TTL_SECONDS, ANSWER_CACHE_MAX_ENTRIES, read_only=SRE_MODE == "watcher"
+) if ANSWER_CACHE else None
+# Namespaces a question can be fingerprinted against (local cluster only)
+CACHE_NAMESPACES = [t.namespace for t in get_targets_from_env() if not t.cluster]
+
 # Global instances (initialized in main)
 session_store: SessionStore = None
 run_store: RunStore = None
+slack_client: AsyncWebClient = None
 slack_tools: SlackTools = None
 scheduler: SREScheduler = None
+runbook_index: RunbookIndex = None
+event_dedup: EventDeduplicator = None
+leases: LeaseManager = None
 
 
-def load_system_prompt(namespace: str = None, thread_ts: str = None, channel: str = None) -> str:
-    """Load and customize the system prompt."""
+@functools.lru_cache(maxsize=None)
+def read_prompt_template(path: str) -> str:
+    """Read a prompt file once; prompt files are baked into the image."""
     try:
-        prompt = Path(PROMPT_FILE).read_text()
+        return Path(path).read_text()
     except FileNotFoundError:
-        logger.error(f"Prompt file not found: {PROMPT_FILE}")
-        prompt = "You are Lucas, an agent. Help monitor and fix Kubernetes issues."
+        logger.error(f"Prompt file not found: {path}")
+        return "You are Lucas, an agent. Help monitor and fix Kubernetes issues."
+
+
+def load_system_prompt(
+    namespace: str = None, thread_ts: str = None, channel: str = None, prompt_file: str = None
+) -> str:
+    """Load and customize the system prompt (PROMPT_FILE unless prompt_file is given)."""
+    prompt = read_prompt_template(prompt_file or PROMPT_FILE)
 
     # Replace placeholders
     replacements = {
@@ -100,56 +213,135 @@ def load_system_prompt(namespace: str = None, thread_ts: str = None, channel: st
     return prompt
 
 
+def with_runbooks(prompt: str, excerpts: list) -> str:
+    """Append matched runbook excerpts to a prompt."""
+    if not excerpts:
+        return prompt
+    logger.info(f"Injecting runbooks: {[e.runbook.name for e in excerpts]}")
+    return (
+        f"{prompt}\n\nRunbooks matching this request "
+        f"(already loaded, no need to search /runbooks for these):\n\n"
+        f"{runbook_index.format_excerpts(excerpts)}\n"
+    )
+
+
+def match_question_runbooks(text: str) -> list:
+    """Runbooks a user's question is about."""
+    if not runbook_index:
+        return []
+    return runbook_index.match_text(text)
+
+
 async def run_claude_agent(
     prompt: str,
     session_id: str = None,
     namespace: str = None,
     thread_ts: str = None,
     channel: str = None,
+    entry_point: str = "mention",
+    spans: SpanRecorder = None,
+    cluster: str = "",
+    priority: Priority = None,
+    model: str = None,
+    prompt_file: str = None,
+    fork_session: bool = False,
     _retry: bool = False
 ) -> tuple[str, str, dict]:
     """
     Run Claude agent with the given prompt.
 
     Uses Claude Code CLI in headless mode with --resume for session continuity.
+    entry_point ("mention", "dm", "thread" or "scan") labels the run's metrics.
+    Phase and tool-call timings are added to `spans` if given.
+    cluster selects the kubeconfig context the agent's kubectl calls use.
+    The process waits for an executor slot; priority defaults from entry_point.
+    model and prompt_file override CLAUDE_MODEL and PROMPT_FILE (used by shadow evaluation).
+    fork_session resumes session_id into a new session, leaving the original unchanged.
+
+    Raises:
+        CircuitOpenError: The circuit breaker is open; no process was started
+        AgentAPIError: The run failed because of the model API or credentials
 
     Returns:
         Tuple of (response_text, session_id, token_usage)
         token_usage is a dict with keys: input_tokens, output_tokens, model
     """
-    system_prompt = load_system_prompt(namespace, thread_ts, channel)
+    called_at = time.monotonic()
+    model = model or CLAUDE_MODEL
+    system_prompt = load_system_prompt(namespace, thread_ts, channel, prompt_file)
 
     # Build the command
     cmd = [
         "claude",
-        "--model", CLAUDE_MODEL,
+        "--model", model,
         "--dangerously-skip-permissions",
         "-p", prompt,
-        "--output-format", "json",
+        "--output-format", "stream-json",
+        "--verbose",
         "--append-system-prompt", system_prompt,
         "--allowedTools", "Bash(kubectl:*),Bash(sqlite3:*),Read,Grep,Glob,Edit,WebFetch"
     ]
 
     if session_id:
         cmd.extend(["--resume", session_id])
+        if fork_session:
+            cmd.append("--fork-session")
 
     # Set environment for Claude to know about Slack context
     env = os.environ.copy()
     env["SLACK_THREAD_TS"] = thread_ts or ""
     env["SLACK_CHANNEL"] = channel or ""
 
-    logger.info(f"Running Claude: session={session_id}, namespace={namespace}")
+    logger.info(f"Running Claude: session={session_id}, namespace={namespace}, cluster={cluster or 'local'}")
+
+    spans = spans if spans is not None else SpanRecorder()
+    if priority is None:
+        priority = ENTRY_POINT_PRIORITY.get(entry_point, Priority.INTERACTIVE)
+    probe = circuit.acquire(entry_point)
 
     try:
-        # Run Claude CLI
-        process = await asyncio.create_subprocess_exec(
-            *cmd,
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE,
-            env=env
-        )
+        env.update(await kube_env(cluster))
+
+        # Parse streaming JSON line by line as it arrives
+        parser = ClaudeStreamParser(model, session_id)
 
-        stdout, stderr = await process.communicate()
+        with spans.span("agent.queue", priority=priority.name.lower()):
+            await executor.acquire(priority)
+        try:
+            # Run Claude CLI
+            with spans.span("agent.spawn", entry_point=entry_point):
+                process = await asyncio.create_subprocess_exec(
+                    *cmd,
+                    stdout=asyncio.subprocess.PIPE,
+                    stderr=asyncio.subprocess.PIPE,
+                    env=env,
+                    limit=STREAM_LINE_LIMIT
+                )
+            AGENT_QUEUE_WAIT_SECONDS.labels(entry_point).observe(time.monotonic() - called_at)
+
+            async def read_stdout():
+                async for line in process.stdout:
+                    parser.feed(line.decode(errors="replace"))
+
+            AGENT_INFLIGHT.inc()
+            try:
+                with spans.span("agent.process", entry_point=entry_point) as attributes:
+                    try:
+                        _, stderr = await asyncio.gather(read_stdout(), process.stderr.read())
+                        await process.wait()
+                    except BaseException:
+                        # An unread process can block on a full pipe forever
+                        if process.returncode is None:
+                            process.kill()
+                            await process.wait()
+                        raise
+                    attributes["exit_code"] = process.returncode
+                    attributes["tool_calls"] = len(parser.tool_calls)
+            finally:
+                AGENT_INFLIGHT.dec()
+        finally:
+            executor.release()
+        spans.add_tool_calls(parser.tool_calls)
 
         stderr_text = stderr.decode() if stderr else ""
         if stderr_text:
@@ -158,117 +350,234 @@ async def run_claude_agent(
         # Check for stale session error and retry without session
         if session_id and "No conversation found with session ID" in stderr_text and not _retry:
             logger.info(f"Session {session_id} is stale, retrying without session")
+            if probe:
+                circuit.release_probe()
             return await run_claude_agent(
                 prompt=prompt,
                 session_id=None,  # Start fresh
                 namespace=namespace,
                 thread_ts=thread_ts,
                 channel=channel,
+                entry_point=entry_point,
+                spans=spans,
+                cluster=cluster,
+                priority=priority,
+                model=model,
+                prompt_file=prompt_file,
                 _retry=True
             )
 
-        # Parse JSON output
-        output = stdout.decode().strip()
+        failure = classify_failure(process.returncode, stderr_text, parser.result_text, parser.is_error)
+        circuit.record(failure, probe)
+        if failure in UPSTREAM_FAILURES:
+            detail = (stderr_text.strip() or parser.result_text.strip()).split("\n")[0][:200]
+            raise AgentAPIError(failure, circuit.retry_in(), detail)
 
-        # Handle streaming JSON (multiple lines)
-        lines = output.split('\n')
-        result_text = ""
-        new_session_id = session_id
-        token_usage = {"input_tokens": 0, "output_tokens": 0, "model": CLAUDE_MODEL, "cost": 0.0}
+        result_text = parser.final_text()
+        new_session_id = parser.session_id
+        token_usage = parser.token_usage
 
-        for line in lines:
-            if not line.strip():
-                continue
-            try:
-                data = json.loads(line)
-                if data.get("type") == "result":
-                    result_text = data.get("result", "")
-                    # Extract token usage from result message
-                    if "total_cost_usd" in data:
-                        token_usage["cost"] = data.get("total_cost_usd", 0)
-                    # Get usage from the usage object
-                    if data.get("usage"):
-                        usage = data["usage"]
-                        # Include cache tokens in input count for cost tracking
-                        token_usage["input_tokens"] = (
-                            usage.get("input_tokens", 0) +
-                            usage.get("cache_creation_input_tokens", 0) +
-                            usage.get("cache_read_input_tokens", 0)
-                        )
-                        token_usage["output_tokens"] = usage.get("output_tokens", 0)
-                    # Also check modelUsage for detailed breakdown
-                    if data.get("modelUsage"):
-                        for model_id, model_usage in data["modelUsage"].items():
-                            token_usage["model"] = model_id
-                            # Use modelUsage if usage wasn't found
-                            if not token_usage["input_tokens"]:
-                                token_usage["input_tokens"] = (
-                                    model_usage.get("inputTokens", 0) +
-                                    model_usage.get("cacheReadInputTokens", 0) +
-                                    model_usage.get("cacheCreationInputTokens", 0)
-                                )
-                            if not token_usage["output_tokens"]:
-                                token_usage["output_tokens"] = model_usage.get("outputTokens", 0)
-                if data.get("session_id"):
-                    new_session_id = data["session_id"]
-            except json.JSONDecodeError:
-                # Might be plain text output
-                result_text = line
-
-        # If we couldn't parse JSON, use raw output
-        if not result_text:
-            result_text = output or "No response from agent"
+        AGENT_RUN_SECONDS.labels(entry_point, token_usage["model"]).observe(time.monotonic() - called_at)
+        record_token_metrics(entry_point, token_usage)
 
         return result_text, new_session_id, token_usage
 
+    except AgentUnavailable:
+        raise
     except Exception as e:
         logger.error(f"Error running Claude: {e}", exc_info=True)
-        return f"Error running agent: {str(e)}", session_id, {"input_tokens": 0, "output_tokens": 0, "model": CLAUDE_MODEL}
+        return f"Error running agent: {str(e)}", session_id, {"input_tokens": 0, "output_tokens": 0, "model": model}
+    finally:
+        if probe:
+            circuit.release_probe()
+
+
+# Claude asks humans questions with a marker in its response: [SLACK_ASK: question]
+SLACK_ASK_PATTERN = re.compile(r'\[SLACK_ASK:\s*(.+?)\]', re.DOTALL)
 
+# Token usage "namespace" per entry point for interactive runs
+INTERACTIVE_USAGE_NAMESPACE = {"mention": "interactive", "dm": "dm"}
 
-async def handle_slack_ask_in_prompt(
+
+async def refresh_pending_gauge():
+    """Update the pending question gauge from the store."""
+    try:
+        PENDING_REPLIES.set(await session_store.get_pending_question_count())
+    except Exception as e:
+        logger.debug(f"Failed to count pending questions: {e}")
+
+
+async def suspend_for_slack_ask(
     response_text: str,
+    session_id: str,
     channel: str,
-    thread_ts: str
-) -> tuple[str, bool]:
+    thread_ts: str,
+    origin: str,
+    namespace: str = None,
+    cluster: str = ""
+) -> bool:
     """
-    Check if Claude's response contains a slack_ask request and handle it.
+    Post a [SLACK_ASK: ...] question from Claude's response and persist it.
 
-    This is a workaround for custom tools - we detect special markers in the response.
+    The agent invocation ends here instead of waiting for the answer;
+    handle_message resumes the session when the reply arrives, so waiting
+    on a human holds no execution slot and survives restarts.
 
     Returns:
-        Tuple of (final_response, had_interaction)
+        True if the response asked a question
     """
-    # Look for slack_ask pattern in response
-    # Claude might output something like: [SLACK_ASK: question here]
-    ask_pattern = r'\[SLACK_ASK:\s*(.+?)\]'
-    match = re.search(ask_pattern, response_text, re.DOTALL)
-
-    if match:
-        question = match.group(1).strip()
-        logger.info(f"Detected slack_ask request: {question[:100]}...")
-
-        # Ask via Slack and wait for reply
-        reply = await slack_tools.slack_ask(
-            message=question,
-            channel=channel,
-            thread_ts=thread_ts,
-            timeout=300
+    match = SLACK_ASK_PATTERN.search(response_text)
+    if not match:
+        return False
+    if not session_id:
+        logger.warning("Response asked a question but has no session to resume")
+        return False
+
+    question = match.group(1).strip()
+    logger.info(f"Detected slack_ask request: {question[:100]}...")
+
+    wait_ts = await slack_tools.post_question(question, channel=channel, thread_ts=thread_ts)
+    await session_store.save_pending_question(
+        wait_ts, session_id, channel, question, origin,
+        namespace=namespace, cluster=cluster
+    )
+    await refresh_pending_gauge()
+    logger.info(f"Suspended session {session_id} until a reply in thread {wait_ts}")
+    return True
+
+
+async def record_interactive_usage(token_usage: dict, entry_point: str):
+    """Record token usage of an interactive run (without run_id)."""
+    if not (token_usage.get("input_tokens") or token_usage.get("output_tokens")):
+        return
+    try:
+        await run_store.record_token_usage(
+            run_id=0,  # No run_id for interactive messages
+            namespace=INTERACTIVE_USAGE_NAMESPACE.get(entry_point, "thread"),
+            model=token_usage.get("model", CLAUDE_MODEL),
+            input_tokens=token_usage.get("input_tokens", 0),
+            output_tokens=token_usage.get("output_tokens", 0),
+            cost=token_usage.get("cost", 0)
         )
+    except Exception as e:
+        logger.warning(f"Failed to record token usage: {e}")
+
+
+async def lookup_cached_answer(question: str, session_id: str, force_refresh: bool, channel: str):
+    """
+    Check the answer cache for a question that would start a fresh session.
+
+    Returns:
+        Tuple of (cache_key, cached_answer); the key is None if the
+        question cannot be cached, the answer is None on a miss or refresh
+    """
+    if not answer_cache or session_id:
+        return None, None
+    key = await answer_cache.key_for(question, CACHE_NAMESPACES, channel)
+    if not key or force_refresh:
+        return key, None
+    return key, answer_cache.get(key)
+
+
+def format_cached_answer(cached) -> str:
+    """Label a cached answer so nobody mistakes it for a fresh investigation."""
+    return (
+        f"{cached.text}\n\n_:recycle: Cached answer from {cached.created_at.strftime('%H:%M')} UTC; "
+        f"pod state has not changed since. Add `--fresh` to your message to re-run._"
+    )
+
 
-        # Return the reply for Claude to continue
-        return reply, True
+def cache_answer(key, response: str, session_id: str):
+    """Cache a finished answer unless it errored or asked a question."""
+    if key and not response.startswith("Error running agent") and not SLACK_ASK_PATTERN.search(response):
+        answer_cache.put(key, response, session_id)
 
-    return response_text, False
+
+async def save_spans(spans: SpanRecorder, run_id: int, trace_key: str = None):
+    """Persist collected spans, logging instead of raising on failure."""
+    try:
+        await run_store.record_spans(run_id, spans.spans, trace_key=trace_key)
+    except Exception as e:
+        logger.warning(f"Failed to record spans: {e}")
 
 
 # ============================================================
 # SLACK EVENT HANDLERS
 # ============================================================
 
+async def route_to_owner(thread_key: str, kind: str, event: dict, claim: bool) -> bool:
+    """
+    Hand an event to the replica that owns its thread.
+
+    Args:
+        thread_key: Session key of the thread (thread_ts or dm_<channel>)
+        kind: "mention" or "message"
+        event: The Slack event
+        claim: Claim the thread for this replica if nobody live owns it
+
+    Returns:
+        True if another replica owns the thread and the event was queued for it
+    """
+    if not leases:
+        return False
+    try:
+        if claim:
+            owner = await leases.acquire_thread(thread_key)
+        else:
+            owner = await leases.owner_of(f"thread:{thread_key}")
+            if owner == leases.replica_id:
+                owner = None
+        if owner is None:
+            return False
+        await leases.route(owner, kind, event)
+    except Exception as e:
+        # Answering on the wrong replica beats not answering
+        logger.warning(f"Failed to route {kind} in {thread_key}: {e}")
+        return False
+    logger.info(f"Routed {kind} in {thread_key} to replica {owner}")
+    return True
+
+
+async def claim_thread(thread_key: str):
+    """Make this replica the owner of a thread it just saved a session for."""
+    if not leases:
+        return
+    try:
+        await leases.claim(f"thread:{thread_key}")
+    except Exception as e:
+        logger.warning(f"Failed to claim thread {thread_key}: {e}")
+
+
+def channel_say(channel: str):
+    """A `say` for events routed from another replica, posting to their channel."""
+    async def say(text: str, thread_ts: str = None):
+        return await slack_client.chat_postMessage(channel=channel, text=text, thread_ts=thread_ts)
+    return say
+
+
+async def handle_routed_event(kind: str, event: dict):
+    """Handle an event another replica received for a thread this replica owns."""
+    say = channel_say(event["channel"])
+    if kind == "mention":
+        await process_mention(event, say)
+    else:
+        await process_message(event, say)
+
+
 @app.event("app_mention")
-async def handle_mention(event: dict, say):
+async def handle_mention(event: dict, say, body: dict = None):
     """Handle @mentions of the bot."""
+    # Events from the early socket connection are acked already and wait here for startup
+    await health.started.wait()
+    if event_dedup and await event_dedup.is_duplicate(event, body):
+        return
+    if await route_to_owner(event.get("thread_ts", event["ts"]), "mention", event, claim=True):
+        return
+    await process_mention(event, say)
+
+
+async def process_mention(event: dict, say):
+    """Answer a mention on the replica that owns its thread."""
     channel = event["channel"]
     thread_ts = event.get("thread_ts", event["ts"])
     user_message = event.get("text", "")
@@ -285,77 +594,146 @@ async def handle_mention(event: dict, say):
         return
 
     logger.info(f"Mention from {user_id} in {channel}: {user_message[:100]}...")
+    spans = SpanRecorder()
+    user_message, force_refresh = strip_force_refresh(user_message)
 
     # Check for existing session
-    session_id = await session_store.get_session(thread_ts)
+    with spans.span("mention.session_lookup"):
+        session_id = await session_store.get_session(thread_ts)
+        cluster = await session_store.get_cluster(thread_ts) if session_id else ""
+        fork_session = await session_store.is_shared(thread_ts) if session_id else False
+
+    # Repeated questions with unchanged pod state get the previous answer
+    with spans.span("mention.cache_lookup"):
+        cache_key, cached = await lookup_cached_answer(user_message, session_id, force_refresh, channel)
+    if cached:
+        logger.info(f"Answer cache hit for mention in {channel}")
+        await say(text=format_cached_answer(cached), thread_ts=thread_ts)
+        # Follow-ups in this thread continue a fork of the session that produced the answer
+        if cached.session_id:
+            await session_store.save_session(thread_ts, cached.session_id, channel, shared=True)
+            await claim_thread(thread_ts)
+        await save_spans(spans, run_id=0, trace_key=thread_ts)
+        return
 
     # Send typing indicator
-    await say(text=":robot_face: Investigating...", thread_ts=thread_ts)
+    with spans.span("mention.slack_ack"):
+        await say(text=":robot_face: Investigating...", thread_ts=thread_ts)
 
     try:
         # Run Claude agent
-        response, new_session_id, token_usage = await run_claude_agent(
-            prompt=user_message,
-            session_id=session_id,
-            channel=channel,
-            thread_ts=thread_ts
-        )
+        with spans.span("mention.agent"):
+            response, new_session_id, token_usage = await run_claude_agent(
+                # New sessions get the runbooks the question is about
+                prompt=user_message if session_id else with_runbooks(
+                    user_message, match_question_runbooks(user_message)
+                ),
+                session_id=session_id,
+                channel=channel,
+                thread_ts=thread_ts,
+                entry_point="mention",
+                spans=spans,
+                cluster=cluster,
+                fork_session=fork_session
+            )
 
         # Save session mapping
         if new_session_id:
-            await session_store.save_session(thread_ts, new_session_id, channel)
+            with spans.span("mention.session_save"):
+                await session_store.save_session(thread_ts, new_session_id, channel, cluster=cluster)
 
-        # Check for slack_ask requests and handle them
-        while True:
-            reply, had_interaction = await handle_slack_ask_in_prompt(
-                response, channel, thread_ts
-            )
-            if not had_interaction:
-                break
+        # Record token usage for interactive messages (without run_id)
+        with spans.span("mention.token_record"):
+            await record_interactive_usage(token_usage, "mention")
 
-            # Continue the conversation with the user's reply
-            response, new_session_id, more_tokens = await run_claude_agent(
-                prompt=f"User replied: {reply}",
-                session_id=new_session_id,
-                channel=channel,
-                thread_ts=thread_ts
-            )
-            # Accumulate token usage
-            token_usage["input_tokens"] += more_tokens.get("input_tokens", 0)
-            token_usage["output_tokens"] += more_tokens.get("output_tokens", 0)
-            token_usage["cost"] = token_usage.get("cost", 0) + more_tokens.get("cost", 0)
+        # If Claude asked a question, post it and stop; the reply resumes the session
+        with spans.span("mention.slack_ask"):
+            if await suspend_for_slack_ask(
+                response, new_session_id, channel, thread_ts, "mention", cluster=cluster
+            ):
+                return
 
-        # Record token usage for interactive messages (without run_id)
-        if token_usage.get("input_tokens") or token_usage.get("output_tokens"):
-            try:
-                await run_store.record_token_usage(
-                    run_id=0,  # No run_id for interactive messages
-                    namespace="interactive",
-                    model=token_usage.get("model", CLAUDE_MODEL),
-                    input_tokens=token_usage.get("input_tokens", 0),
-                    output_tokens=token_usage.get("output_tokens", 0),
-                    cost=token_usage.get("cost", 0)
-                )
-            except Exception as e:
-                logger.warning(f"Failed to record token usage: {e}")
+        cache_answer(cache_key, response, new_session_id)
 
         # Send final response
         # Truncate if too long for Slack
         if len(response) > 3900:
             response = response[:3900] + "\n\n_(Response truncated)_"
 
-        await say(text=response, thread_ts=thread_ts)
+        with spans.span("mention.slack_reply"):
+            await say(text=response, thread_ts=thread_ts)
 
+    except AgentUnavailable as e:
+        logger.warning(f"Mention not answered: {e}")
+        await say(text=friendly_error(e), thread_ts=thread_ts)
     except Exception as e:
         logger.error(f"Error handling mention: {e}", exc_info=True)
         await say(
             text=f":x: Error: {str(e)}",
             thread_ts=thread_ts
         )
+    finally:
+        await save_spans(spans, run_id=0, trace_key=thread_ts)
+
+
+async def resume_after_reply(question: dict, text: str, say):
+    """Resume the session that asked a pending question with the human's reply."""
+    thread_ts = question["thread_ts"]
+    channel = question["channel"]
+    cluster = question["cluster"]
+    # Answers to a mention keep interactive priority; the rest are follow-ups
+    entry_point = "mention" if question["origin"] == "mention" else "thread"
+    logger.info(f"Reply to pending question in {thread_ts}, resuming session {question['session_id']}")
+    spans = SpanRecorder()
+
+    try:
+        with spans.span("resume.agent", origin=question["origin"]):
+            response, new_session_id, token_usage = await run_claude_agent(
+                prompt=f"User replied: {text}",
+                session_id=question["session_id"],
+                namespace=question["namespace"],
+                channel=channel,
+                thread_ts=thread_ts,
+                entry_point=entry_point,
+                spans=spans,
+                cluster=cluster
+            )
+
+        if new_session_id:
+            await session_store.save_session(
+                thread_ts, new_session_id, channel, question["namespace"], cluster=cluster
+            )
+            await claim_thread(thread_ts)
+        await record_interactive_usage(token_usage, entry_point)
+
+        if await suspend_for_slack_ask(
+            response, new_session_id, channel, thread_ts, question["origin"],
+            namespace=question["namespace"], cluster=cluster
+        ):
+            return
+
+        if len(response) > 3900:
+            response = response[:3900] + "\n\n_(Response truncated)_"
+        await say(text=response, thread_ts=thread_ts)
+
+    except AgentUnavailable as e:
+        logger.warning(f"Resume of {question['session_id']} not run: {e}")
+        # Keep the question open so a later reply can still resume the session
+        await session_store.save_pending_question(
+            thread_ts, question["session_id"], channel, question["question"], question["origin"],
+            namespace=question["namespace"], cluster=cluster
+        )
+        await refresh_pending_gauge()
+        await say(text=f"{friendly_error(e)} Reply here again then and I'll pick it up.", thread_ts=thread_ts)
+    except Exception as e:
+        logger.error(f"Error resuming session: {e}", exc_info=True)
+        await say(text=f":x: Error: {str(e)}", thread_ts=thread_ts)
+    finally:
+        await save_spans(spans, run_id=0, trace_key=thread_ts)
 
 
 @app.event("message")
-async def handle_message(event: dict, say):
+async def handle_message(event: dict, say, body: dict = None):
     """Handle messages - thread replies and direct messages."""
     # Ignore bot messages
     if event.get("bot_id") or event.get("subtype"):
@@ -363,13 +741,34 @@ async def handle_message(event: dict, say):
 
     thread_ts = event.get("thread_ts")
     channel = event["channel"]
-    text = event.get("text", "")
     channel_type = event.get("channel_type", "")
 
-    # Check if this is a reply to a pending slack_ask
-    if thread_ts and resolve_pending_reply(thread_ts, text):
-        logger.info(f"Resolved pending reply for thread {thread_ts}")
+    # Only thread replies and DMs are handled (mentions are handled separately)
+    if not thread_ts and channel_type != "im":
+        return
+    # Events from the early socket connection are acked already and wait here for startup
+    await health.started.wait()
+    if event_dedup and await event_dedup.is_duplicate(event, body):
         return
+    if await route_to_owner(thread_ts or f"dm_{channel}", "message", event, claim=False):
+        return
+    await process_message(event, say)
+
+
+async def process_message(event: dict, say):
+    """Handle a thread reply or DM on the replica that owns its thread."""
+    thread_ts = event.get("thread_ts")
+    channel = event["channel"]
+    text = event.get("text", "")
+    channel_type = event.get("channel_type", "")
+
+    # Check if this answers a question a suspended session is waiting on
+    if thread_ts:
+        question = await session_store.pop_pending_question(thread_ts)
+        if question:
+            await refresh_pending_gauge()
+            await resume_after_reply(question, text, say)
+            return
 
     # Handle direct messages (DMs)
     if channel_type == "im":
@@ -378,54 +777,61 @@ async def handle_message(event: dict, say):
         # Use channel as thread_ts for DM session tracking
         dm_session_key = f"dm_{channel}"
         session_id = await session_store.get_session(dm_session_key)
+        text, force_refresh = strip_force_refresh(text)
+
+        cache_key, cached = await lookup_cached_answer(text, session_id, force_refresh, channel)
+        if cached:
+            logger.info(f"Answer cache hit for DM in {channel}")
+            await say(text=format_cached_answer(cached))
+            # Follow-up DMs continue a fork of the session that produced the answer
+            if cached.session_id:
+                await session_store.save_session(dm_session_key, cached.session_id, channel, shared=True)
+                await claim_thread(dm_session_key)
+            return
 
         try:
             response, new_session_id, token_usage = await run_claude_agent(
-                prompt=text,
+                prompt=text if session_id else with_runbooks(text, match_question_runbooks(text)),
                 session_id=session_id,
-                channel=channel
+                channel=channel,
+                entry_point="dm",
+                fork_session=await session_store.is_shared(dm_session_key) if session_id else False
             )
 
             # Save session for DM continuity
             if new_session_id:
                 await session_store.save_session(dm_session_key, new_session_id, channel)
+                await claim_thread(dm_session_key)
 
             # Record token usage for DMs
-            if token_usage.get("input_tokens") or token_usage.get("output_tokens"):
-                try:
-                    await run_store.record_token_usage(
-                        run_id=0,
-                        namespace="dm",
-                        model=token_usage.get("model", CLAUDE_MODEL),
-                        input_tokens=token_usage.get("input_tokens", 0),
-                        output_tokens=token_usage.get("output_tokens", 0),
-                        cost=token_usage.get("cost", 0)
-                    )
-                except Exception as e:
-                    logger.warning(f"Failed to record token usage: {e}")
+            await record_interactive_usage(token_usage, "dm")
+            cache_answer(cache_key, response, new_session_id)
 
             if len(response) > 3900:
                 response = response[:3900] + "\n\n_(Response truncated)_"
 
             await say(text=response)
 
+        except AgentUnavailable as e:
+            logger.warning(f"DM not answered: {e}")
+            await say(text=friendly_error(e))
         except Exception as e:
             logger.error(f"Error handling DM: {e}", exc_info=True)
             await say(text=f"Error: {str(e)}")
         return
 
-    # Handle thread replies in channels
-    if not thread_ts:
-        # Not a thread reply and not a DM, ignore (mentions are handled separately)
-        return
-
-    # Check if this thread has an active session
+    # Handle thread replies in channels that have an active session
     session_id = await session_store.get_session(thread_ts)
     if not session_id:
-        # No session for this thread, ignore
+        digest_sessions = await session_store.get_digest_sessions(thread_ts)
+        if digest_sessions:
+            await continue_digest_thread(digest_sessions, text, channel, thread_ts, say)
+        # Otherwise no session for this thread, ignore
         return
 
     logger.info(f"Thread reply in session {session_id}: {text[:100]}...")
+    cluster = await session_store.get_cluster(thread_ts)
+    fork_session = await session_store.is_shared(thread_ts)
 
     try:
         # Continue the conversation
@@ -433,26 +839,24 @@ async def handle_message(event: dict, say):
             prompt=text,
             session_id=session_id,
             channel=channel,
-            thread_ts=thread_ts
+            thread_ts=thread_ts,
+            entry_point="thread",
+            cluster=cluster,
+            fork_session=fork_session
         )
 
         # Update session if changed
         if new_session_id and new_session_id != session_id:
-            await session_store.save_session(thread_ts, new_session_id, channel)
+            await session_store.save_session(thread_ts, new_session_id, channel, cluster=cluster)
+        await claim_thread(thread_ts)
 
         # Record token usage for thread replies
-        if token_usage.get("input_tokens") or token_usage.get("output_tokens"):
-            try:
-                await run_store.record_token_usage(
-                    run_id=0,
-                    namespace="thread",
-                    model=token_usage.get("model", CLAUDE_MODEL),
-                    input_tokens=token_usage.get("input_tokens", 0),
-                    output_tokens=token_usage.get("output_tokens", 0),
-                    cost=token_usage.get("cost", 0)
-                )
-            except Exception as e:
-                logger.warning(f"Failed to record token usage: {e}")
+        await record_interactive_usage(token_usage, "thread")
+
+        if await suspend_for_slack_ask(
+            response, new_session_id, channel, thread_ts, "thread", cluster=cluster
+        ):
+            return
 
         # Truncate if needed
         if len(response) > 3900:
@@ -460,143 +864,505 @@ async def handle_message(event: dict, say):
 
         await say(text=response, thread_ts=thread_ts)
 
+    except AgentUnavailable as e:
+        logger.warning(f"Thread reply not answered: {e}")
+        await say(text=friendly_error(e), thread_ts=thread_ts)
     except Exception as e:
         logger.error(f"Error handling thread reply: {e}", exc_info=True)
         await say(text=f"Error: {str(e)}", thread_ts=thread_ts)
 
 
-# ============================================================
-# SCHEDULED SCAN CALLBACK
-# ============================================================
-
-async def run_scheduled_scan(namespace: str):
+async def continue_digest_thread(digest_sessions: list[dict], text: str, channel: str, thread_ts: str, say):
     """
-    Run a scheduled scan for a namespace.
+    Continue the session of the namespace a digest thread reply is about.
 
-    This is called by the scheduler and can result in alerts being posted to Slack.
+    The namespace is the one the reply names, the only one with a session,
+    or the one the thread's conversation is already about; if none of these
+    applies, ask which.
     """
-    if not SRE_ALERT_CHANNEL:
-        logger.warning("SRE_ALERT_CHANNEL not set, skipping scheduled scan")
+    by_label = {entry["label"]: entry for entry in digest_sessions}
+    label = match_label(text, list(by_label))
+    if not label and len(digest_sessions) == 1:
+        label = digest_sessions[0]["label"]
+    if not label:
+        # digest_sessions is ordered by last use; a session used since creation is the conversation
+        latest = digest_sessions[0]
+        if latest["updated_at"] != latest["created_at"]:
+            label = latest["label"]
+    if not label:
+        names = ", ".join(f"`{entry['label']}`" for entry in digest_sessions)
+        await say(text=f"This digest covers several namespaces. Name the one you mean: {names}", thread_ts=thread_ts)
         return
 
-    logger.info(f"Running scheduled scan for namespace: {namespace}")
+    entry = by_label[label]
+    logger.info(f"Digest reply about {label} in session {entry['session_id']}: {text[:100]}...")
+    try:
+        response, new_session_id, token_usage = await run_claude_agent(
+            prompt=text,
+            session_id=entry["session_id"],
+            namespace=entry["namespace"],
+            channel=channel,
+            thread_ts=thread_ts,
+            entry_point="thread",
+            cluster=entry["cluster"]
+        )
+        await session_store.save_digest_session(
+            thread_ts, label, new_session_id or entry["session_id"], channel,
+            entry["namespace"], cluster=entry["cluster"]
+        )
+        await record_interactive_usage(token_usage, "thread")
+
+        # A question here is answered like any other digest follow-up
+        response = SLACK_ASK_PATTERN.sub(lambda m: f"*Question:* {m.group(1).strip()}", response)
+        if len(response) > 3900:
+            response = response[:3900] + "\n\n_(Response truncated)_"
+        await say(text=f"*{label}*\n{response}", thread_ts=thread_ts)
+
+    except AgentUnavailable as e:
+        logger.warning(f"Digest reply not answered: {e}")
+        await say(text=friendly_error(e), thread_ts=thread_ts)
+    except Exception as e:
+        logger.error(f"Error handling digest reply: {e}", exc_info=True)
+        await say(text=f"Error: {str(e)}", thread_ts=thread_ts)
 
-    # Create run record in database
-    run_id = await run_store.create_run(namespace, mode=SRE_MODE)
-    logger.info(f"Created run #{run_id} for namespace {namespace}")
 
-    prompt = f"""Run a health check on namespace '{namespace}'.
+# ============================================================
+# SCHEDULED SCAN CALLBACK
+# ============================================================
+
+async def record_scan_tokens(
+    run_id: int,
+    namespace: str,
+    cluster: str,
+    token_usage: dict,
+    spans: SpanRecorder,
+    workload: str = ""
+):
+    """Record a scan's token usage, or a sub-investigation's under its workload."""
+    if not (token_usage.get("input_tokens") or token_usage.get("output_tokens")):
+        return
+    # Use cost from Claude CLI if available, otherwise calculate
+    cost = token_usage.get("cost", 0.0)
+    if not cost:
+        cost = calculate_cost(
+            token_usage.get("model", CLAUDE_MODEL),
+            token_usage.get("input_tokens", 0),
+            token_usage.get("output_tokens", 0)
+        )
+    with spans.span("scan.token_record"):
+        await run_store.record_token_usage(
+            run_id=run_id,
+            namespace=namespace,
+            model=token_usage.get("model", CLAUDE_MODEL),
+            input_tokens=token_usage.get("input_tokens", 0),
+            output_tokens=token_usage.get("output_tokens", 0),
+            cost=cost,
+            cluster=cluster,
+            workload=workload
+        )
+    scope = f" for {workload}" if workload else ""
+    logger.info(f"Recorded token usage{scope}: {token_usage.get('input_tokens', 0)} in, {token_usage.get('output_tokens', 0)} out, ${cost:.4f}")
+
+
+def build_scan_prompt(
+    namespace: str,
+    cluster: str,
+    log_summary: str,
+    delta_section: str,
+    history_trends: list,
+    pods: list[dict] = None
+) -> str:
+    """Build the prompt of a scan investigated in one agent run."""
+    if log_summary:
+        log_check = "Errors in the new log lines collected below (only fetch more logs if you need context)"
+    else:
+        log_check = "Recent errors in pod logs"
+
+    cluster_note = f" in cluster '{cluster}' (kubectl is already configured for it)" if cluster else ""
+    prompt = f"""Run a health check on namespace '{namespace}'{cluster_note}.
 
 Check for:
 1. Pods in error states (CrashLoopBackOff, Error, ImagePullBackOff)
 2. Pods with high restart counts
-3. Recent errors in pod logs
+3. {log_check}
 
 If you find issues that need human attention or decision, use [SLACK_ASK: your question here] to ask.
 If everything is healthy, just confirm briefly.
 If you find critical issues, report them clearly.
 
-At the end, provide a brief summary with counts: how many pods checked, how many had errors.
+{VERDICT_INSTRUCTIONS}
 """
+    if log_summary:
+        prompt += f"\nLog pre-scan:\n{log_summary}\n"
+    if delta_section:
+        prompt += f"\n{delta_section}\n"
+    history_section = format_history_prompt(history_trends, POD_HISTORY_WINDOW_HOURS)
+    if history_section:
+        prompt += f"\n{history_section}\n"
+    if runbook_index and pods:
+        prompt = with_runbooks(prompt, runbook_index.match_pods(pods))
+    return prompt
+
+
+async def run_fanout_scan(
+    run_id: int,
+    namespace: str,
+    cluster: str,
+    workloads: list,
+    log_results: list[dict],
+    spans: SpanRecorder,
+    history_trends: list = None,
+    delta: dict = None
+):
+    """
+    Investigate failing workloads in separate, concurrent agent runs.
 
+    Each workload gets a focused prompt with only its pods, logs, history,
+    changes since the previous scan (delta, from diff_snapshots) and
+    runbooks. At most SCAN_FANOUT_CONCURRENCY run at once and only the
+    first SCAN_FANOUT_MAX_WORKLOADS are investigated.
+
+    Returns:
+        Tuple of (merged report, session ID to follow up in, merged verdict)
+    """
+    investigated = workloads[:SCAN_FANOUT_MAX_WORKLOADS]
+    skipped = workloads[SCAN_FANOUT_MAX_WORKLOADS:]
+    cluster_note = f" in cluster '{cluster}' (kubectl is already configured for it)" if cluster else ""
+    semaphore = asyncio.Semaphore(SCAN_FANOUT_CONCURRENCY)
+    logger.info(f"Fanning out scan of {namespace} into {len(investigated)} sub-investigations")
+
+    async def investigate(workload) -> SubResult:
+        prompt = f"""Investigate workload '{workload.name}' in namespace '{namespace}'{cluster_note}.
+It is one of {len(workloads)} failing workloads in this namespace. The others are investigated separately, so stay on this one.
+
+Unhealthy pods:
+{describe_workload(workload)}
+
+Find the root cause.
+If you need a human decision, use [SLACK_ASK: your question here] to ask.
+
+{VERDICT_INSTRUCTIONS}
+"""
+        logs = workload_logs(log_results, workload)
+        if logs:
+            prompt += f"\nLog pre-scan:\n{format_log_summary(logs)}\n"
+        delta_section = format_workload_delta(delta, workload) if delta else ""
+        if delta_section:
+            prompt += f"\n{delta_section}\n"
+        history_section = format_history_prompt(
+            trends_for_pods(history_trends or [], {pod["name"] for pod in workload.pods}),
+            POD_HISTORY_WINDOW_HOURS
+        )
+        if history_section:
+            prompt += f"\n{history_section}\n"
+        if runbook_index:
+            prompt = with_runbooks(prompt, runbook_index.match_pods(workload.pods))
+
+        async with semaphore:
+            try:
+                with spans.span("scan.subrun", workload=workload.name):
+                    response, session_id, token_usage = await run_claude_agent(
+                        prompt=prompt,
+                        namespace=namespace,
+                        channel=SRE_ALERT_CHANNEL,
+                        entry_point="scan",
+                        spans=spans,
+                        cluster=cluster
+                    )
+            except AgentUnavailable:
+                # The model API is failing; the whole scan is deferred, not reported
+                raise
+            except Exception as e:
+                logger.error(f"Sub-investigation of {workload.name} failed: {e}", exc_info=True)
+                return SubResult(workload, "", None, failed_verdict(workload, f"Investigation failed: {e}"))
+
+        await record_scan_tokens(run_id, namespace, cluster, token_usage, spans, workload=workload.name)
+        verdict = parse_verdict(response)
+        if not verdict:
+            logger.warning(f"Sub-investigation of {workload.name} returned no valid verdict block")
+            verdict = failed_verdict(workload, "Investigation returned no verdict")
+        return SubResult(workload, strip_verdict(response), session_id, verdict)
+
+    tasks = [asyncio.create_task(investigate(w)) for w in investigated]
     try:
-        response, session_id, token_usage = await run_claude_agent(
-            prompt=prompt,
-            namespace=namespace,
-            channel=SRE_ALERT_CHANNEL
+        results = await asyncio.gather(*tasks)
+    except BaseException:
+        # Stop the other sub-runs instead of paying for results that are discarded
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+
+    # Follow-ups resume the sub-run that asked a question, else the most severe one
+    asking = [r for r in results if r.session_id and SLACK_ASK_PATTERN.search(r.report)]
+    candidates = asking or sorted(
+        (r for r in results if r.session_id),
+        key=lambda r: SEVERITIES.index(r.verdict.severity),
+        reverse=True
+    )
+    follow_up = candidates[0] if candidates else None
+    # Only the followed-up session can take an answer; other questions become plain text
+    results = [
+        r if r is follow_up else r._replace(report=SLACK_ASK_PATTERN.sub(r"Open question: \1", r.report))
+        for r in results
+    ]
+
+    verdict = merge_verdicts(
+        [r.verdict for r in results] + [failed_verdict(w, "Not investigated (fan-out limit)") for w in skipped],
+        pod_count=sum(len(w.pods) for w in workloads),
+        summary=f"{len(workloads)} failing workloads: " + "; ".join(
+            f"{r.workload.name}: {r.verdict.summary}" for r in results if r.verdict.summary
+        )
+    )
+    return merge_reports(results, skipped), follow_up.session_id if follow_up else None, verdict
+
+
+async def post_scan_alert(alert: ScanAlert, spans: SpanRecorder = None):
+    """Post one namespace's alert as its own message with a follow-up thread."""
+    spans = spans if spans is not None else SpanRecorder()
+    with spans.span("scan.slack_post"):
+        # The question is posted separately in the alert thread
+        alert_text = SLACK_ASK_PATTERN.sub("", alert.report).strip()
+        result = await slack_client.chat_postMessage(
+            channel=SRE_ALERT_CHANNEL,
+            text=f"*Scheduled Scan: {alert.label}*\n\n{alert_text}\n\n_Reply to this thread for follow-up_"
         )
 
-        # Record token usage for this run
-        if token_usage.get("input_tokens") or token_usage.get("output_tokens"):
-            # Use cost from Claude CLI if available, otherwise calculate
-            cost = token_usage.get("cost", 0.0)
-            if not cost:
-                cost = calculate_cost(
-                    token_usage.get("model", CLAUDE_MODEL),
-                    token_usage.get("input_tokens", 0),
-                    token_usage.get("output_tokens", 0)
-                )
-            await run_store.record_token_usage(
-                run_id=run_id,
-                namespace=namespace,
-                model=token_usage.get("model", CLAUDE_MODEL),
-                input_tokens=token_usage.get("input_tokens", 0),
-                output_tokens=token_usage.get("output_tokens", 0),
-                cost=cost
+    # Save session for potential follow-up
+    if alert.session_id:
+        with spans.span("scan.session_save"):
+            await session_store.save_session(
+                result["ts"],
+                alert.session_id,
+                SRE_ALERT_CHANNEL,
+                alert.namespace,
+                cluster=alert.cluster
             )
-            logger.info(f"Recorded token usage: {token_usage.get('input_tokens', 0)} in, {token_usage.get('output_tokens', 0)} out, ${cost:.4f}")
+            await claim_thread(result["ts"])
 
-        # Determine status from response
-        # Look for positive problem indicators, not just keywords
-        # (avoid false positives from "no errors", "zero restarts", etc.)
-        response_lower = response.lower()
+        with spans.span("scan.slack_ask"):
+            await suspend_for_slack_ask(
+                alert.report, alert.session_id, SRE_ALERT_CHANNEL, result["ts"], "scan",
+                namespace=alert.namespace, cluster=alert.cluster
+            )
 
-        # Negative patterns that indicate NO issues
-        healthy_patterns = [
-            "all good", "everything healthy", "no issues", "no errors",
-            "zero restarts", "no problems", "looks healthy", "running healthy",
-            "nothing to report", "nothing to worry"
-        ]
+    logger.info(f"Posted alert for {alert.label}, thread_ts={result['ts']}")
 
-        # If any healthy pattern is found, assume no issues
-        is_healthy = any(pattern in response_lower for pattern in healthy_patterns)
 
-        # Positive problem indicators (actual issues, not negations)
-        problem_patterns = [
-            "crashloopbackoff", "oomkilled", "imagepullbackoff",
-            "error state", "found issue", "found problem", "has error",
-            "is failing", "is crashed", "urgent", "critical"
-        ]
+async def post_scan_alerts_separately(alerts: list[ScanAlert]):
+    """Post alerts one by one; a failed post does not stop the others."""
+    for alert in alerts:
+        try:
+            await post_scan_alert(alert)
+        except Exception as e:
+            logger.error(f"Failed to post alert for {alert.label}: {e}", exc_info=True)
 
-        has_issues = not is_healthy and any(pattern in response_lower for pattern in problem_patterns)
 
-        # Try to extract pod count from response (simple heuristic)
-        pod_match = re.search(r'(\d+)\s*pods?', response.lower())
-        pod_count = int(pod_match.group(1)) if pod_match else 0
+async def post_scan_digest(alerts: list[ScanAlert]):
+    """
+    Post the alerts of one scheduler cycle.
 
-        error_count = 1 if has_issues else 0
-        status = "issues_found" if has_issues else "ok"
+    Below SCAN_DIGEST_MIN_ALERTS each alert is posted on its own. Otherwise
+    one digest message lists every namespace, and the full reports go into
+    its thread in as few messages as fit. Each namespace's session is kept
+    in digest_sessions, so a reply naming the namespace continues it.
+    """
+    if len(alerts) < SCAN_DIGEST_MIN_ALERTS:
+        await post_scan_alerts_separately(alerts)
+        return
 
-        # Update run record
-        await run_store.update_run(
-            run_id=run_id,
-            status=status,
-            pod_count=pod_count,
-            error_count=error_count,
-            fix_count=0,
-            report=response[:5000] if response else None,
-            log=response[:10000] if response else None
+    alerts = by_severity(alerts)
+    try:
+        result = await slack_client.chat_postMessage(channel=SRE_ALERT_CHANNEL, text=format_digest(alerts))
+    except Exception as e:
+        # Without the digest each alert is posted on its own, so one failure does not drop them all
+        logger.error(f"Failed to post scan digest, posting {len(alerts)} alerts separately: {e}", exc_info=True)
+        await post_scan_alerts_separately(alerts)
+        return
+    digest_ts = result["ts"]
+
+    sections = []
+    for alert in alerts:
+        # Questions are answered by replying with the namespace's name
+        text = SLACK_ASK_PATTERN.sub(lambda m: f"*Question:* {m.group(1).strip()}", alert.report)
+        sections.append((alert.label, text))
+        if alert.session_id:
+            await session_store.save_digest_session(
+                digest_ts, alert.label, alert.session_id, SRE_ALERT_CHANNEL,
+                alert.namespace, cluster=alert.cluster
+            )
+    await claim_thread(digest_ts)
+
+    details = format_details(sections)
+    for message in details:
+        await slack_client.chat_postMessage(channel=SRE_ALERT_CHANNEL, text=message, thread_ts=digest_ts)
+    logger.info(f"Posted digest of {len(alerts)} alerts in {1 + len(details)} messages, thread_ts={digest_ts}")
+
+
+async def run_scheduled_scan(namespace: str, cluster: str = ""):
+    """
+    Run a scheduled scan for a namespace.
+
+    This is called by the scheduler and can result in alerts being posted to Slack.
+    cluster is the kubeconfig context to scan ("" for the agent's own cluster).
+    With SCAN_DIGEST the alert is returned for the cycle's digest instead of posted.
+    """
+    if not SRE_ALERT_CHANNEL:
+        logger.warning("SRE_ALERT_CHANNEL not set, skipping scheduled scan")
+        return
+
+    label = f"{cluster}/{namespace}" if cluster else namespace
+    if circuit.blocked():
+        logger.info(f"Agent circuit {circuit.state}, deferring scan of {label}")
+        return
+    logger.info(f"Running scheduled scan for namespace: {label}")
+    spans = SpanRecorder()
+
+    # Create run record in database
+    with spans.span("scan.create_run"):
+        run_id = await run_store.create_run(namespace, mode=SRE_MODE, cluster=cluster)
+    logger.info(f"Created run #{run_id} for namespace {label}")
+
+    pods = None
+    if LOG_PRESCAN or DELTA_PROMPTS or POD_HISTORY or runbook_index:
+        try:
+            with spans.span("scan.pod_state"):
+                pods = await collect_pod_state(namespace, context=cluster)
+        except Exception as e:
+            logger.warning(f"Pod state collection failed for {label}: {e}")
+
+    log_summary = ""
+    log_results = []
+    cursor_update = None
+    if LOG_PRESCAN and pods is not None:
+        try:
+            with spans.span("scan.log_prescan"):
+                log_results, cursor_update = await collect_new_logs(namespace, pods, run_store, context=cluster)
+            log_summary = format_log_summary(log_results)
+        except Exception as e:
+            logger.warning(f"Log pre-scan failed for {label}: {e}")
+
+    history_trends = []
+    if POD_HISTORY and pods is not None:
+        try:
+            with spans.span("scan.history"):
+                await record_pod_history(run_store, label, summarize_pods(pods))
+                history_trends = await load_trends(run_store, label, POD_HISTORY_WINDOW_HOURS)
+        except Exception as e:
+            logger.warning(f"Pod history failed for {label}: {e}")
+
+    snapshot = None
+    delta = None
+    delta_section = ""
+    if DELTA_PROMPTS and pods is not None:
+        try:
+            with spans.span("scan.delta"):
+                current = summarize_pods(pods)
+                snapshot = dump_snapshot(current)
+                previous_run = await run_store.get_last_completed_run(namespace, cluster)
+                if previous_run:
+                    delta = diff_snapshots(load_snapshot(previous_run["snapshot"]), current)
+                    delta_section = format_delta_prompt(previous_run, delta)
+        except Exception as e:
+            logger.warning(f"Delta stage failed for {label}: {e}")
+            delta, delta_section = None, ""
+
+    try:
+        # Many failing workloads are investigated one per agent run
+        workloads = find_failing_workloads(pods) if SCAN_FANOUT_MIN_WORKLOADS and pods else []
+        fan_out = len(workloads) >= SCAN_FANOUT_MIN_WORKLOADS > 0
+        # Fan-out runs build one focused prompt per workload instead
+        prompt = None if fan_out else build_scan_prompt(
+            namespace, cluster, log_summary, delta_section, history_trends, pods
         )
 
-        if has_issues:
-            # Post alert to Slack
-            slack_client = AsyncWebClient(token=SLACK_BOT_TOKEN)
-            result = await slack_client.chat_postMessage(
-                channel=SRE_ALERT_CHANNEL,
-                text=f"*Scheduled Scan: {namespace}*\n\n{response}\n\n_Reply to this thread for follow-up_"
+        if fan_out:
+            response, session_id, verdict = await run_fanout_scan(
+                run_id, namespace, cluster, workloads, log_results, spans, history_trends, delta
             )
-
-            # Save session for potential follow-up
-            if session_id:
-                await session_store.save_session(
-                    result["ts"],
-                    session_id,
-                    SRE_ALERT_CHANNEL,
-                    namespace
+        else:
+            with spans.span("scan.agent"):
+                response, session_id, token_usage = await run_claude_agent(
+                    prompt=prompt,
+                    namespace=namespace,
+                    channel=SRE_ALERT_CHANNEL,
+                    entry_point="scan",
+                    spans=spans,
+                    cluster=cluster
                 )
+            await record_scan_tokens(run_id, namespace, cluster, token_usage, spans)
+            # Determine status from the structured verdict block
+            verdict = parse_verdict(response)
+        report = strip_verdict(response)
+        if verdict:
+            status = verdict.status
+            # Prefer the pod count we collected over the model's
+            pod_count = len(pods) if pods is not None else verdict.pod_count
+            error_count = verdict.error_count
+            fix_count = verdict.fix_count
+            has_issues = status != "ok" and severity_at_least(verdict.severity, SCAN_ALERT_SEVERITY)
+        else:
+            # Without a verdict we cannot tell; alert rather than miss a problem
+            logger.warning(f"Scan of {label} returned no valid verdict block")
+            status = "issues_found"
+            pod_count = len(pods) if pods is not None else 0
+            error_count = 0
+            fix_count = 0
+            has_issues = True
+
+        # A question for a human always needs someone's attention
+        question_match = SLACK_ASK_PATTERN.search(report)
+        has_issues = has_issues or bool(question_match and session_id)
+
+        # Update run record
+        with spans.span("scan.update_run"):
+            await run_store.update_run(
+                run_id=run_id,
+                status=status,
+                pod_count=pod_count,
+                error_count=error_count,
+                fix_count=fix_count,
+                report=report[:5000] if report else None,
+                log=response[:10000] if response else None,
+                snapshot=snapshot,
+                verdict=verdict.to_json() if verdict else None,
+                # Fan-out runs have no single prompt to replay
+                prompt=prompt
+            )
+            # Only a completed scan consumes the log lines it was given
+            if cursor_update and not response.startswith("Error running agent"):
+                await save_log_cursors(run_store, cursor_update)
 
-            logger.info(f"Posted alert for {namespace}, thread_ts={result['ts']}")
+        if has_issues:
+            alert = ScanAlert(
+                label=label,
+                namespace=namespace,
+                cluster=cluster,
+                severity=verdict.severity if verdict else "medium",
+                summary=verdict.summary if verdict else "",
+                report=report,
+                session_id=session_id
+            )
+            if SCAN_DIGEST:
+                return alert
+            await post_scan_alert(alert, spans)
         else:
-            logger.info(f"Scan of {namespace} completed, no issues found")
+            logger.info(f"Scan of {label} completed, no issues found")
 
+    except AgentUnavailable as e:
+        # The circuit is open or the model API failed; the next cycle scans again
+        logger.info(f"Scan of {label} deferred: {e}")
+        await run_store.update_run(run_id=run_id, status="deferred", report=str(e))
     except Exception as e:
-        logger.error(f"Error in scheduled scan for {namespace}: {e}", exc_info=True)
+        logger.error(f"Error in scheduled scan for {label}: {e}", exc_info=True)
         # Update run as failed
         await run_store.update_run(
             run_id=run_id,
             status="failed",
             report=str(e)
         )
+    finally:
+        await save_spans(spans, run_id)
 
 
 # ============================================================
@@ -605,7 +1371,7 @@ At the end, provide a brief summary with counts: how many pods checked, how many
 
 async def main():
     """Main entry point."""
-    global session_store, run_store, slack_tools, scheduler
+    global session_store, run_store, slack_client, slack_tools, scheduler, event_dedup, leases
 
     logger.info("Starting A2W Lucas Interactive Agent...")
     logger.info(f"Using model: {CLAUDE_MODEL}")
@@ -617,38 +1383,106 @@ async def main():
     if not SLACK_APP_TOKEN:
         raise ValueError("SLACK_APP_TOKEN is required")
 
-    # Initialize session store
-    session_store = SessionStore()
-    await session_store.connect()
-    logger.info("Session store initialized")
+    # Start metrics endpoint (also serves /healthz and /readyz)
+    metrics_runner = None
+    if METRICS_PORT:
+        metrics_runner = await start_metrics_server(METRICS_PORT, health)
+
+    # Start event loop stall detector
+    loop_monitor = None
+    if LOOP_MONITOR:
+        loop_monitor = LoopLagMonitor(
+            threshold=LOOP_STALL_THRESHOLD_MS / 1000,
+            capture_stacks=LOOP_STALL_STACKS
+        )
+        await loop_monitor.start()
 
-    # Initialize run store (for dashboard)
+    session_store = SessionStore()
     run_store = RunStore()
-    await run_store.connect()
-    logger.info("Run store initialized")
+
+    # Share one HTTP session between our client and Bolt's per-request clients
+    # so Slack API latency is recorded for every call
+    slack_session = aiohttp.ClientSession(trace_configs=[slack_trace_config()])
+    app.client.session = slack_session
 
     # Initialize Slack tools
-    slack_client = AsyncWebClient(token=SLACK_BOT_TOKEN)
+    slack_client = AsyncWebClient(token=SLACK_BOT_TOKEN, session=slack_session)
     slack_tools = SlackTools(slack_client, default_channel=SRE_ALERT_CHANNEL)
 
-    # Get bot user ID if not set
-    global SLACK_BOT_USER_ID
-    if not SLACK_BOT_USER_ID:
-        auth_response = await slack_client.auth_test()
-        SLACK_BOT_USER_ID = auth_response["user_id"]
-        logger.info(f"Bot user ID: {SLACK_BOT_USER_ID}")
+    # Slack handler; events it receives wait in wait_for_startup until startup finishes
+    handler = AsyncSocketModeHandler(app, SLACK_APP_TOKEN)
+
+    async def socket_state() -> tuple[str, str]:
+        if handler.client.current_session is None:
+            return STARTING, ""
+        if await handler.client.is_connected():
+            return READY, ""
+        return FAILED, "disconnected, reconnecting"
+
+    async def circuit_state() -> tuple[str, str]:
+        return (READY if circuit.state == CLOSED else FAILED), circuit.state
+
+    health.probe("socket_mode", socket_state)
+    health.probe("agent_circuit", circuit_state, required=False)
+
+    async def fetch_bot_user_id():
+        global SLACK_BOT_USER_ID
+        if not SLACK_BOT_USER_ID:
+            auth_response = await slack_client.auth_test()
+            SLACK_BOT_USER_ID = auth_response["user_id"]
+            logger.info(f"Bot user ID: {SLACK_BOT_USER_ID}")
+
+    async def load_runbooks():
+        global runbook_index
+        # Index runbooks so prompts can include only the ones that apply
+        runbook_index = await asyncio.to_thread(RunbookIndex.load, RUNBOOKS_DIR, RUNBOOK_MAX_CHARS)
+
+    # Independent startup steps run concurrently; the socket connects as early as possible
+    steps = [
+        health.track("session_store", session_store.connect()),
+        health.track("run_store", run_store.connect()),
+        health.track("slack_auth", fetch_bot_user_id()),
+        handler.connect_async(),
+    ]
+    if RUNBOOK_INJECTION:
+        steps.append(health.track("runbooks", load_runbooks(), required=False))
+
+    # Replicas sharing the database split scan targets and threads
+    if LEASES_ENABLED:
+        leases = LeaseManager(
+            replica_id=os.environ.get("POD_NAME") or None,
+            ttl=LEASE_TTL_SECONDS,
+            heartbeat_interval=max(1, LEASE_TTL_SECONDS // 3)
+        )
+        leases.on_routed_event = handle_routed_event
+        steps.append(health.track("leases", leases.connect()))
+
+    startup_began = time.monotonic()
+    await asyncio.gather(*steps)
+    logger.info(f"Stores, Slack auth and socket ready in {time.monotonic() - startup_began:.2f}s")
+
+    await refresh_pending_gauge()
+    event_dedup = EventDeduplicator(session_store, window=SLACK_EVENT_DEDUP_WINDOW)
 
     # Initialize scheduler for periodic scans
     scheduler = SREScheduler(
         scan_callback=run_scheduled_scan,
-        interval_seconds=SCAN_INTERVAL
+        interval_seconds=SCAN_INTERVAL,
+        leases=leases,
+        circuit=circuit,
+        alert_callback=post_scan_digest if SCAN_DIGEST else None,
+        run_store=run_store
     )
+    if leases:
+        await leases.start()
 
     # Start scheduler if alert channel is configured
     if SRE_ALERT_CHANNEL:
         await scheduler.start()
+        health.set("scheduler", READY)
         logger.info("Scheduler started")
     else:
+        health.set("scheduler", DISABLED)
         logger.warning("SRE_ALERT_CHANNEL not set, scheduled scans disabled")
 
     # Start session cleanup task (runs daily, cleans sessions older than 7 days)
@@ -659,23 +1493,39 @@ async def main():
                 deleted = await session_store.cleanup_old_sessions(days=7)
                 count = await session_store.get_session_count()
                 logger.info(f"Session cleanup: deleted {deleted}, remaining {count}")
+                expired = await session_store.cleanup_pending_questions(hours=PENDING_QUESTION_TTL_HOURS)
+                if expired:
+                    logger.info(f"Dropped {expired} unanswered questions")
+                await refresh_pending_gauge()
+                await session_store.cleanup_events(hours=24)
+                thinned = await run_store.downsample_pod_history(
+                    full_resolution_hours=POD_HISTORY_WINDOW_HOURS, retention_days=POD_HISTORY_RETENTION_DAYS
+                )
+                logger.info(f"Pod history downsampling removed {thinned} points")
             except Exception as e:
                 logger.error(f"Session cleanup failed: {e}")
 
     asyncio.create_task(cleanup_loop())
     logger.info("Session cleanup task started (daily, 7-day retention)")
 
-    # Start Slack handler
-    handler = AsyncSocketModeHandler(app, SLACK_APP_TOKEN)
-
+    health.started.set()
     logger.info("Lucas Agent ready! Listening for Slack events...")
 
     try:
-        await handler.start_async()
+        await asyncio.sleep(float("inf"))
     finally:
+        await handler.close_async()
         await scheduler.stop()
+        if leases:
+            await leases.stop()
+            await leases.close()
         await session_store.close()
         await run_store.close()
+        await slack_session.close()
+        if loop_monitor:
+            await loop_monitor.stop()
+        if metrics_runner:
+            await metrics_runner.cleanup()
 
 
 if __name__ == "__main__":
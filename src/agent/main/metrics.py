@@ -0,0 +1,176 @@
+"""Prometheus metrics for the Lucas agent."""
+
+import functools
+import logging
+import time
+from types import SimpleNamespace
+
+import aiohttp
+from aiohttp import web
+from prometheus_client import Counter, Gauge, Histogram, CONTENT_TYPE_LATEST, generate_latest
+
+logger = logging.getLogger(__name__)
+
+# Agent runs take seconds to many minutes
+AGENT_BUCKETS = (1, 2.5, 5, 10, 20, 30, 60, 120, 300, 600, 1200)
+# Slack and SQLite calls take milliseconds to seconds
+FAST_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+AGENT_RUN_SECONDS = Histogram(
+    "lucas_agent_run_seconds",
+    "Duration of run_claude_agent calls",
+    ["entry_point", "model"],
+    buckets=AGENT_BUCKETS
+)
+AGENT_QUEUE_WAIT_SECONDS = Histogram(
+    "lucas_agent_queue_wait_seconds",
+    "Time from run_claude_agent call until the CLI subprocess is spawned, including slot wait",
+    ["entry_point"],
+    buckets=FAST_BUCKETS + (30, 60, 120, 300)
+)
+AGENT_QUEUED = Gauge(
+    "lucas_agent_queued",
+    "Agent runs waiting for an execution slot",
+    ["priority"]
+)
+AGENT_INFLIGHT = Gauge(
+    "lucas_agent_inflight",
+    "Agent CLI processes currently running"
+)
+AGENT_TOKENS = Counter(
+    "lucas_agent_tokens_total",
+    "Tokens used by agent runs",
+    ["entry_point", "model", "direction"]
+)
+AGENT_COST = Counter(
+    "lucas_agent_cost_usd_total",
+    "Cost of agent runs in USD",
+    ["entry_point", "model"]
+)
+AGENT_FAILURES = Counter(
+    "lucas_agent_failures_total",
+    "Failed agent CLI runs by classified cause",
+    ["kind"]
+)
+AGENT_CIRCUIT_STATE = Gauge(
+    "lucas_agent_circuit_state",
+    "Agent circuit breaker state: 0 closed, 1 half-open, 2 open"
+)
+AGENT_CIRCUIT_REJECTED = Counter(
+    "lucas_agent_circuit_rejected_total",
+    "Agent runs refused while the circuit breaker was open",
+    ["entry_point"]
+)
+SLACK_API_SECONDS = Histogram(
+    "lucas_slack_api_seconds",
+    "Slack Web API request latency",
+    ["method", "status"],
+    buckets=FAST_BUCKETS
+)
+STORE_WRITE_SECONDS = Histogram(
+    "lucas_store_write_seconds",
+    "RunStore and SessionStore write latency",
+    ["store", "operation"],
+    buckets=FAST_BUCKETS
+)
+PENDING_REPLIES = Gauge(
+    "lucas_pending_replies",
+    "slack_ask questions waiting for a human reply"
+)
+SLACK_DUPLICATE_EVENTS = Counter(
+    "lucas_slack_duplicate_events_total",
+    "Redelivered Slack events dropped before handling",
+    ["event_type"]
+)
+ANSWER_CACHE_LOOKUPS = Counter(
+    "lucas_answer_cache_lookups_total",
+    "Answer cache lookups for fresh-session questions",
+    ["result"]
+)
+SCHEDULER_LAG_SECONDS = Gauge(
+    "lucas_scheduler_lag_seconds",
+    "Delay between a namespace scan's planned and actual start",
+    ["cluster", "namespace"]
+)
+LOOP_LAG_SECONDS = Histogram(
+    "lucas_event_loop_lag_seconds",
+    "Event loop scheduling delay measured by the loop monitor",
+    buckets=FAST_BUCKETS
+)
+LOOP_STALLS = Counter(
+    "lucas_event_loop_stalls_total",
+    "Event loop stalls longer than the configured threshold"
+)
+
+
+def observe_store_write(store: str):
+    """Decorator recording the latency of an async store write method."""
+    def decorator(func):
+        histogram = STORE_WRITE_SECONDS.labels(store=store, operation=func.__name__)
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                histogram.observe(time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+
+def record_token_metrics(entry_point: str, token_usage: dict):
+    """Add a run's token usage to the token and cost counters."""
+    model = token_usage.get("model", "unknown")
+    AGENT_TOKENS.labels(entry_point, model, "input").inc(token_usage.get("input_tokens", 0))
+    AGENT_TOKENS.labels(entry_point, model, "output").inc(token_usage.get("output_tokens", 0))
+    AGENT_COST.labels(entry_point, model).inc(token_usage.get("cost", 0) or 0)
+
+
+def slack_trace_config() -> aiohttp.TraceConfig:
+    """
+    Build an aiohttp trace config that times Slack Web API requests.
+
+    Attach it to the ClientSession shared by the Slack clients so that
+    per-request clients created by Bolt (used by say()) are covered too.
+    """
+    async def on_request_start(session, ctx: SimpleNamespace, params):
+        ctx.start = time.perf_counter()
+
+    async def on_request_end(session, ctx: SimpleNamespace, params):
+        method = params.url.path.rsplit("/", 1)[-1]
+        SLACK_API_SECONDS.labels(method, str(params.response.status)).observe(
+            time.perf_counter() - ctx.start
+        )
+
+    async def on_request_exception(session, ctx: SimpleNamespace, params):
+        method = params.url.path.rsplit("/", 1)[-1]
+        SLACK_API_SECONDS.labels(method, "error").observe(time.perf_counter() - ctx.start)
+
+    trace_config = aiohttp.TraceConfig()
+    trace_config.on_request_start.append(on_request_start)
+    trace_config.on_request_end.append(on_request_end)
+    trace_config.on_request_exception.append(on_request_exception)
+    return trace_config
+
+
+async def handle_metrics(request: web.Request) -> web.Response:
+    """Serve metrics in the Prometheus text format."""
+    response = web.Response(body=generate_latest())
+    response.content_type = CONTENT_TYPE_LATEST.split(";")[0]
+    return response
+
+
+async def start_metrics_server(port: int, health=None) -> web.AppRunner:
+    """Start the HTTP server exposing /metrics, and /healthz and /readyz if a Health is given."""
+    http_app = web.Application()
+    http_app.router.add_get("/metrics", handle_metrics)
+    if health:
+        http_app.router.add_get("/healthz", health.handle_healthz)
+        http_app.router.add_get("/readyz", health.handle_readyz)
+
+    runner = web.AppRunner(http_app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, "0.0.0.0", port).start()
+    logger.info(f"Metrics server listening on :{port}/metrics")
+    return runner
@@ -0,0 +1,215 @@
+"""Pre-scan stage: collect pod state and new log lines before a scheduled scan."""
+
+import asyncio
+import json
+import logging
+import os
+import re
+from typing import NamedTuple, Optional
+
+logger = logging.getLogger(__name__)
+
+# How far back to read logs for a container we have never seen before
+LOG_INITIAL_SINCE = os.environ.get("LOG_PRESCAN_INITIAL_SINCE", "1h")
+# Upper bound on bytes fetched per container per scan
+LOG_LIMIT_BYTES = int(os.environ.get("LOG_PRESCAN_LIMIT_BYTES", "1000000"))
+# Error-like sample lines reported per container
+LOG_MAX_SAMPLES = int(os.environ.get("LOG_PRESCAN_MAX_SAMPLES", "5"))
+# Concurrent kubectl logs calls
+LOG_CONCURRENCY = int(os.environ.get("LOG_PRESCAN_CONCURRENCY", "5"))
+KUBECTL_TIMEOUT = int(os.environ.get("KUBECTL_TIMEOUT_SECONDS", "60"))
+
+ERROR_PATTERN = re.compile(
+    r"\b(error|exception|fatal|panic|traceback|fail(ed|ure)?|oom|killed|refused|timed? ?out)\b",
+    re.IGNORECASE
+)
+
+
+async def kubectl(*args: str, timeout: int = KUBECTL_TIMEOUT) -> str:
+    """Run kubectl and return stdout. Raises RuntimeError on failure."""
+    process = await asyncio.create_subprocess_exec(
+        "kubectl", *args,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE
+    )
+    try:
+        stdout, stderr = await asyncio.wait_for(process.communicate(), timeout=timeout)
+    except asyncio.TimeoutError:
+        process.kill()
+        await process.wait()
+        raise RuntimeError(f"kubectl {args[0]} timed out after {timeout}s")
+
+    if process.returncode != 0:
+        raise RuntimeError(f"kubectl {args[0]} failed: {stderr.decode().strip()}")
+    return stdout.decode(errors="replace")
+
+
+def _context_args(context: str) -> list[str]:
+    return [f"--context={context}"] if context else []
+
+
+def _workload_name(metadata: dict) -> str:
+    """Name of the workload owning a pod, without the ReplicaSet template hash."""
+    refs = metadata.get("ownerReferences") or []
+    if not refs:
+        return metadata["name"]
+    owner = refs[0].get("name", metadata["name"])
+    template_hash = (metadata.get("labels") or {}).get("pod-template-hash")
+    if refs[0].get("kind") == "ReplicaSet" and template_hash and owner.endswith(f"-{template_hash}"):
+        return owner[:-len(template_hash) - 1]
+    return owner
+
+
+async def collect_pod_state(namespace: str, context: str = "") -> list[dict]:
+    """
+    Collect a compact per-pod summary of the namespace.
+
+    context selects a kubeconfig context ("" uses the current one).
+
+    Returns:
+        List of dicts with keys: name, workload, phase, containers. Each container has
+        name, ready, restarts, state and reason.
+    """
+    output = await kubectl("get", "pods", "-n", namespace, "-o", "json", *_context_args(context))
+    pods = []
+    for item in json.loads(output).get("items", []):
+        status = item.get("status", {})
+        containers = []
+        for cs in status.get("containerStatuses", []) or []:
+            state_name, state = next(iter((cs.get("state") or {"unknown": {}}).items()))
+            last_terminated = (cs.get("lastState") or {}).get("terminated") or {}
+            containers.append({
+                "name": cs.get("name", ""),
+                "ready": bool(cs.get("ready")),
+                "restarts": cs.get("restartCount", 0),
+                "state": state_name,
+                "reason": state.get("reason", ""),
+                "last_reason": last_terminated.get("reason", ""),
+            })
+        pods.append({
+            "name": item["metadata"]["name"],
+            "workload": _workload_name(item["metadata"]),
+            "phase": status.get("phase", "Unknown"),
+            "containers": containers,
+        })
+    return pods
+
+
+def _filter_new_lines(output: str, cursor: Optional[str]) -> tuple[list[str], Optional[str]]:
+    """
+    Split timestamped kubectl output into new lines and the newest timestamp.
+
+    --since-time only has second granularity, so lines at or before the
+    cursor are dropped here.
+    """
+    lines = []
+    newest = cursor
+    for raw in output.splitlines():
+        ts, _, text = raw.partition(" ")
+        if cursor and ts <= cursor:
+            continue
+        lines.append(text)
+        if not newest or ts > newest:
+            newest = ts
+    return lines, newest
+
+
+async def _scan_container(
+    namespace: str,
+    pod: str,
+    container: str,
+    cursor: Optional[str],
+    semaphore: asyncio.Semaphore,
+    context: str = ""
+) -> Optional[dict]:
+    """Fetch and filter new log lines for one container."""
+    args = [
+        "logs", pod, "-n", namespace, "-c", container,
+        "--timestamps", f"--limit-bytes={LOG_LIMIT_BYTES}", *_context_args(context),
+    ]
+    args.append(f"--since-time={cursor}" if cursor else f"--since={LOG_INITIAL_SINCE}")
+
+    async with semaphore:
+        try:
+            output = await kubectl(*args)
+        except RuntimeError as e:
+            logger.debug(f"Skipping logs for {pod}/{container}: {e}")
+            return None
+
+    lines, newest = _filter_new_lines(output, cursor)
+    errors = [line for line in lines if ERROR_PATTERN.search(line)]
+    return {
+        "pod": pod,
+        "container": container,
+        "new_lines": len(lines),
+        "error_lines": len(errors),
+        "samples": [line[:300] for line in errors[-LOG_MAX_SAMPLES:]],
+        "cursor": newest,
+    }
+
+
+class CursorUpdate(NamedTuple):
+    """Log cursors to save once the scan that read the lines has completed."""
+    scope: str
+    cursors: dict[tuple[str, str], str]
+    keep_pods: list[str]
+
+
+async def collect_new_logs(
+    namespace: str, pods: list[dict], run_store, context: str = ""
+) -> tuple[list[dict], CursorUpdate]:
+    """
+    Read only log lines written since the previous scan for every container.
+
+    Cursors are loaded from the run store. The advanced cursors are returned,
+    not saved, so lines of a scan that fails or is deferred are read again
+    by the next one; save them with save_log_cursors after the scan completed.
+    Cursors of pods that no longer exist are pruned then.
+
+    Returns:
+        Tuple of (results, cursor_update)
+    """
+    # Cursors of other clusters are kept apart by prefixing the context
+    scope = f"{context}/{namespace}" if context else namespace
+    cursors = await run_store.get_log_cursors(scope)
+    semaphore = asyncio.Semaphore(LOG_CONCURRENCY)
+
+    tasks = [
+        _scan_container(
+            namespace, pod["name"], c["name"],
+            cursors.get((pod["name"], c["name"])), semaphore, context
+        )
+        for pod in pods
+        for c in pod["containers"]
+    ]
+    results = [r for r in await asyncio.gather(*tasks) if r]
+
+    cursor_update = CursorUpdate(
+        scope,
+        {(r["pod"], r["container"]): r["cursor"] for r in results if r["cursor"]},
+        [pod["name"] for pod in pods]
+    )
+    return results, cursor_update
+
+
+async def save_log_cursors(run_store, cursor_update: CursorUpdate):
+    """Save the cursors collect_new_logs advanced."""
+    await run_store.save_log_cursors(
+        cursor_update.scope, cursor_update.cursors, keep_pods=cursor_update.keep_pods
+    )
+
+
+def format_log_summary(results: list[dict]) -> str:
+    """Format log scan results as a prompt section."""
+    total_lines = sum(r["new_lines"] for r in results)
+    noisy = [r for r in results if r["error_lines"]]
+
+    out = [
+        f"New log lines since last scan: {total_lines} across {len(results)} containers, "
+        f"{sum(r['error_lines'] for r in noisy)} error-like."
+    ]
+    for r in sorted(noisy, key=lambda r: r["error_lines"], reverse=True):
+        out.append(f"- {r['pod']}/{r['container']}: {r['error_lines']} error-like of {r['new_lines']} new lines")
+        for sample in r["samples"]:
+            out.append(f"    {sample}")
+    return "\n".join(out)
@@ -0,0 +1,224 @@
+"""Runbook index: match pod state or questions to runbook excerpts."""
+
+import logging
+import re
+from pathlib import Path
+from typing import NamedTuple
+
+logger = logging.getLogger(__name__)
+
+# Sections already implied by a match, left out of excerpts
+SKIP_SECTIONS = {"symptoms"}
+
+# Backticked identifiers like `CrashLoopBackOff` or `ErrImagePull`
+REASON_PATTERN = re.compile(r"`([A-Z][A-Za-z]+)`")
+# Reason-like words in subsection headings, like "OOMKilled causing crash loop"
+CAMEL_PATTERN = re.compile(r"\b([A-Z][a-z]*[A-Z][A-Za-z]*)\b")
+WORD_PATTERN = re.compile(r"[a-z0-9]+")
+STOPWORDS = {"the", "and", "for", "with", "not"}
+
+
+class Section(NamedTuple):
+    """A "## " section, or one "### " subsection of it, with its match keys."""
+    heading: str
+    # "" for the text of the "## " section before its first "### "
+    subheading: str
+    body: str
+    reasons: frozenset[str]
+    keywords: frozenset[str]
+
+
+class Runbook(NamedTuple):
+    """A parsed runbook file."""
+    name: str
+    title: str
+    reasons: frozenset[str]
+    keywords: frozenset[str]
+    # File name words that start one of its reasons, like "oom" for OOMKilled
+    stems: frozenset[str]
+    sections: list[Section]
+
+    def select(self, reasons: set[str], words: set[str] = frozenset()) -> list[Section]:
+        """
+        Sections to inject for a match.
+
+        Every section except the ones a match already implies, and of each
+        section's subsections only those about the matched reasons (or two
+        of the question's words); all of them if none is.
+        """
+        # Words that only name the matched reason ("crash loop") do not pick a subsection
+        words = {w for w in words if not any(w in reason for reason in reasons)}
+        chosen = []
+        for heading in dict.fromkeys(s.heading for s in self.sections):
+            if heading.lower() in SKIP_SECTIONS:
+                continue
+            group = [s for s in self.sections if s.heading == heading]
+            subsections = [s for s in group if s.subheading]
+            hits = [s for s in subsections if s.reasons & reasons or len(s.keywords & words) >= 2]
+            chosen += [s for s in group if not s.subheading or s in (hits or subsections)]
+        return chosen
+
+
+class Excerpt(NamedTuple):
+    """The sections of a matched runbook that go into a prompt."""
+    runbook: Runbook
+    sections: list[Section]
+
+    def text(self) -> str:
+        parts = [f"### {self.runbook.name}: {self.runbook.title}"]
+        heading = None
+        for section in self.sections:
+            if section.subheading:
+                if section.heading != heading:
+                    parts.append(f"{section.heading}:")
+                parts.append(f"#### {section.subheading}\n{section.body}")
+            else:
+                parts.append(f"{section.heading}:\n{section.body}")
+            heading = section.heading
+        return "\n\n".join(parts)
+
+
+def _words(text: str) -> set[str]:
+    return {w for w in WORD_PATTERN.findall(text.lower()) if len(w) >= 3 and w not in STOPWORDS}
+
+
+def _section(heading: str, subheading: str, lines: list[str]) -> Section:
+    body = "\n".join(lines).strip()
+    reasons = set(REASON_PATTERN.findall(body)) | set(CAMEL_PATTERN.findall(subheading))
+    return Section(
+        heading=heading,
+        subheading=subheading,
+        body=body,
+        reasons=frozenset(r.lower() for r in reasons),
+        keywords=frozenset(_words(subheading or heading)),
+    )
+
+
+def parse_runbook(path: Path) -> Runbook:
+    """
+    Parse a runbook into "## " sections and their "### " subsections.
+
+    Reasons are the backticked Kubernetes reasons it mentions (matched
+    against pod state); keywords come from the file name and title
+    (matched against free text). Each section is keyed the same way by the
+    reasons it mentions and the words of its heading.
+    """
+    text = path.read_text()
+    title = path.stem
+    sections = []
+    heading, subheading, lines = None, "", []
+    for line in text.splitlines():
+        if line.startswith("# ") and heading is None and not sections:
+            title = line[2:].strip()
+        elif line.startswith("## "):
+            if heading:
+                sections.append(_section(heading, subheading, lines))
+            heading, subheading, lines = line[3:].strip(), "", []
+        elif line.startswith("### ") and heading:
+            if subheading or "\n".join(lines).strip():
+                sections.append(_section(heading, subheading, lines))
+            subheading, lines = line[4:].strip(), []
+        elif heading:
+            lines.append(line)
+    if heading:
+        sections.append(_section(heading, subheading, lines))
+
+    # Reasons describing the problem itself, not ones it refers elsewhere
+    symptoms = next(
+        (s.body for s in sections if s.heading.lower() == "symptoms" and not s.subheading), text
+    )
+    reasons = {
+        r.lower() for r in
+        set(REASON_PATTERN.findall(symptoms)) | set(REASON_PATTERN.findall(f"`{title.split()[0]}`"))
+    }
+    name_words = _words(path.stem.replace("-", " "))
+
+    return Runbook(
+        name=path.name,
+        title=title,
+        reasons=frozenset(reasons),
+        keywords=frozenset(name_words | _words(title)),
+        stems=frozenset(w for w in name_words if any(r.startswith(w) for r in reasons)),
+        sections=sections,
+    )
+
+
+class RunbookIndex:
+    """Runbooks indexed by error reason and keyword."""
+
+    def __init__(self, runbooks: list[Runbook], max_chars: int = 6000):
+        self.runbooks = runbooks
+        self.max_chars = max_chars
+        self._by_reason: dict[str, list[Runbook]] = {}
+        for runbook in runbooks:
+            for reason in runbook.reasons:
+                self._by_reason.setdefault(reason, []).append(runbook)
+
+    @classmethod
+    def load(cls, directory: str, max_chars: int = 6000) -> "RunbookIndex":
+        """Parse every *.md file in a directory (missing directory gives an empty index)."""
+        runbooks = []
+        for path in sorted(Path(directory).glob("*.md")):
+            try:
+                runbooks.append(parse_runbook(path))
+            except Exception as e:
+                logger.warning(f"Failed to parse runbook {path}: {e}")
+        logger.info(f"Indexed {len(runbooks)} runbooks from {directory}")
+        return cls(runbooks, max_chars=max_chars)
+
+    def match_pods(self, pods: list[dict]) -> list[Excerpt]:
+        """Runbooks for the current and last termination reasons of containers."""
+        reasons = []
+        for pod in pods:
+            for c in pod["containers"]:
+                for reason in (c.get("reason"), c.get("last_reason")):
+                    if reason and reason.lower() not in reasons:
+                        reasons.append(reason.lower())
+        matches = []
+        for reason in reasons:
+            for runbook in self._by_reason.get(reason, []):
+                if runbook not in matches:
+                    matches.append(runbook)
+        return [Excerpt(runbook, runbook.select(set(reasons))) for runbook in matches]
+
+    def match_text(self, text: str) -> list[Excerpt]:
+        """
+        Runbooks a question is about.
+
+        A runbook matches if one of its reasons is named (spaces and
+        dashes ignored; two adjacent words may abbreviate it, so "crash
+        loop" finds CrashLoopBackOff), one of its stems is a word of the
+        question ("oom" finds OOMKilled), or at least two of its keywords appear.
+        """
+        lowered = text.lower()
+        squashed = re.sub(r"[\s\-_]+", "", lowered)
+        tokens = WORD_PATTERN.findall(lowered)
+        bigrams = {a + b for a, b in zip(tokens, tokens[1:]) if len(a + b) >= 7}
+        words = _words(lowered)
+        matches = []
+        named = set()
+        for runbook in self.runbooks:
+            stems = runbook.stems & set(tokens)
+            reasons = {
+                reason for reason in runbook.reasons
+                if reason in squashed
+                or any(reason.startswith(b) for b in bigrams)
+                or any(reason.startswith(stem) for stem in stems)
+            }
+            named |= reasons
+            if reasons or len(runbook.keywords & words) >= 2:
+                matches.append(runbook)
+        return [Excerpt(runbook, runbook.select(named, words)) for runbook in matches]
+
+    def format_excerpts(self, excerpts: list[Excerpt]) -> str:
+        """Format matched runbook sections as a prompt section, capped at max_chars."""
+        out, used = [], 0
+        for excerpt in excerpts:
+            text = excerpt.text()
+            runbook = excerpt.runbook
+            if used + len(text) > self.max_chars:
+                out.append(f"### {runbook.name}: {runbook.title}\n(omitted for length, read /runbooks/{runbook.name})")
+                continue
+            out.append(text)
+            used += len(text)
+        return "\n\n".join(out)
@@ -3,8 +3,14 @@
 import asyncio
 import logging
 import os
+import time
+from collections import defaultdict
 from datetime import datetime
-from typing import Callable, Awaitable
+from typing import Any, Callable, Awaitable
+
+from breaker import CLOSED
+from clusters import ScanTarget, get_targets_from_env
+from metrics import SCHEDULER_LAG_SECONDS
 
 logger = logging.getLogger(__name__)
 
@@ -14,28 +20,55 @@ class SREScheduler:
 
     def __init__(
         self,
-        scan_callback: Callable[[str], Awaitable[None]],
+        scan_callback: Callable[[str, str], Awaitable[Any]],
         interval_seconds: int = 300,
-        namespaces: list[str] = None
+        namespaces: list[str] = None,
+        targets: list[ScanTarget] = None,
+        cluster_concurrency: int = None,
+        leases=None,
+        circuit=None,
+        alert_callback: Callable[[list], Awaitable[None]] = None,
+        run_store=None
     ):
         """
         Initialize the scheduler.
 
         Args:
-            scan_callback: Async function to call for each namespace scan
+            scan_callback: Async function called with (namespace, cluster) for each scan
             interval_seconds: Seconds between scans (default 5 minutes)
-            namespaces: List of namespaces to scan
+            namespaces: List of namespaces to scan in the local cluster
+            targets: (cluster, namespace) targets; defaults to SCAN_TARGETS/TARGET_NAMESPACES
+            cluster_concurrency: Concurrent scans per cluster (default CLUSTER_SCAN_CONCURRENCY or 1)
+            leases: Optional LeaseManager; scheduled scans then cover only the targets this replica owns
+            circuit: Optional CircuitBreaker; scans wait while it refuses agent runs
+            alert_callback: Optional async function called once per cycle with the
+                non-None results of scan_callback
+            run_store: Optional RunStore; the first cycle then waits until a target is due
+                by its last run instead of starting right away
         """
         self.scan_callback = scan_callback
         self.interval = interval_seconds
-        self.namespaces = namespaces or self._get_namespaces_from_env()
+        if targets is None:
+            targets = [ScanTarget("", ns) for ns in namespaces] if namespaces else get_targets_from_env()
+        self.targets = targets
+        self.cluster_concurrency = cluster_concurrency or int(
+            os.environ.get("CLUSTER_SCAN_CONCURRENCY", "1")
+        )
+        self.leases = leases
+        self.circuit = circuit
+        self.alert_callback = alert_callback
+        self.run_store = run_store
+        self._circuit_lock = asyncio.Lock()
+        if leases:
+            leases.targets = [t.label for t in self.targets]
         self._running = False
         self._task: asyncio.Task = None
+        self._cycle_due: float = None
 
-    def _get_namespaces_from_env(self) -> list[str]:
-        """Get namespaces from environment variable."""
-        ns_env = os.environ.get("TARGET_NAMESPACES", "default")
-        return [ns.strip() for ns in ns_env.split(",") if ns.strip()]
+    @property
+    def namespaces(self) -> list[str]:
+        """Namespaces of all targets."""
+        return [t.namespace for t in self.targets]
 
     async def start(self):
         """Start the scheduler."""
@@ -46,7 +79,7 @@ class SREScheduler:
         self._running = True
         self._task = asyncio.create_task(self._run_loop())
         logger.info(
-            f"Scheduler started: scanning {self.namespaces} every {self.interval}s"
+            f"Scheduler started: scanning {[t.label for t in self.targets]} every {self.interval}s"
         )
 
     async def stop(self):
@@ -62,33 +95,115 @@ class SREScheduler:
 
     async def _run_loop(self):
         """Main scheduler loop."""
-        # Initial delay to let the service start up
-        await asyncio.sleep(10)
+        # Continue the previous process's schedule, so restarts do not rescan everything
+        delay = await self._first_cycle_delay()
+        if delay:
+            logger.info(f"First scan cycle in {delay:.0f}s")
+            await asyncio.sleep(delay)
+        next_due = time.monotonic()
 
         while self._running:
+            self._cycle_due = next_due
             try:
                 await self._run_scans()
             except Exception as e:
                 logger.error(f"Error in scheduled scan: {e}", exc_info=True)
 
             # Wait for next interval
+            next_due = time.monotonic() + self.interval
             await asyncio.sleep(self.interval)
 
+    def _owned_targets(self) -> list[ScanTarget]:
+        """Targets this replica scans."""
+        if not self.leases:
+            return self.targets
+        return [t for t in self.targets if self.leases.owns_target(t.label)]
+
+    async def _first_cycle_delay(self) -> float:
+        """
+        Seconds until the first cycle is due.
+
+        The cycle is due when its most overdue target is, judged by the last
+        finished run in `runs`. A target that was never scanned is due now.
+        """
+        if not self.run_store:
+            return 0.0
+        try:
+            last_runs = await self.run_store.get_last_scan_times()
+        except Exception as e:
+            logger.warning(f"Could not read last scan times, scanning now: {e}")
+            return 0.0
+
+        now = datetime.utcnow()
+        oldest = 0.0
+        for target in self._owned_targets():
+            ended_at = last_runs.get((target.cluster, target.namespace))
+            if not ended_at:
+                return 0.0
+            oldest = max(oldest, (now - datetime.strptime(ended_at, "%Y-%m-%d %H:%M:%S")).total_seconds())
+        return max(0.0, self.interval - oldest)
+
     async def _run_scans(self):
-        """Run scans for all configured namespaces."""
+        """Run scans for all targets, clusters concurrently."""
         logger.info(f"Starting scheduled scans at {datetime.utcnow().isoformat()}")
+        targets = self._owned_targets()
+        if self.leases:
+            logger.info(f"Replica {self.leases.replica_id} owns {len(targets)} of {len(self.targets)} targets")
+        await self._report(await self._scan_targets(targets))
+        logger.info("Scheduled scans complete")
 
-        for namespace in self.namespaces:
+    async def _report(self, results: list):
+        """Hand a cycle's results to alert_callback."""
+        if self.alert_callback and results:
             try:
-                logger.info(f"Scanning namespace: {namespace}")
-                await self.scan_callback(namespace)
+                await self.alert_callback(results)
             except Exception as e:
-                logger.error(f"Error scanning {namespace}: {e}", exc_info=True)
+                logger.error(f"Error reporting {len(results)} scan results: {e}", exc_info=True)
 
-        logger.info("Scheduled scans complete")
+    async def _scan_targets(self, targets: list[ScanTarget]) -> list:
+        """
+        Scan targets with a separate concurrency limit per cluster.
+
+        Returns:
+            The non-None results of scan_callback
+        """
+        by_cluster: dict[str, list[ScanTarget]] = defaultdict(list)
+        for target in targets:
+            by_cluster[target.cluster].append(target)
+
+        async def scan_cluster(cluster_targets: list[ScanTarget]):
+            semaphore = asyncio.Semaphore(self.cluster_concurrency)
+            return await asyncio.gather(*[self._scan_one(t, semaphore) for t in cluster_targets])
+
+        per_cluster = await asyncio.gather(*[scan_cluster(t) for t in by_cluster.values()])
+        return [result for results in per_cluster for result in results if result is not None]
+
+    async def _scan_one(self, target: ScanTarget, semaphore: asyncio.Semaphore):
+        """Scan a single target once a slot for its cluster is free."""
+        if self.circuit and self.circuit.state != CLOSED:
+            # Until the circuit closes, scans go one at a time so only one probes
+            async with self._circuit_lock:
+                if self.circuit.blocked():
+                    logger.info(f"Agent circuit {self.circuit.state}, deferring scan of {target.label}")
+                    await self.circuit.wait_until_available()
+                if self.circuit.state != CLOSED:
+                    return await self._scan(target, semaphore)
+        return await self._scan(target, semaphore)
+
+    async def _scan(self, target: ScanTarget, semaphore: asyncio.Semaphore):
+        async with semaphore:
+            try:
+                logger.info(f"Scanning namespace: {target.label}")
+                if self._cycle_due is not None:
+                    SCHEDULER_LAG_SECONDS.labels(target.cluster, target.namespace).set(
+                        time.monotonic() - self._cycle_due
+                    )
+                return await self.scan_callback(target.namespace, target.cluster)
+            except Exception as e:
+                logger.error(f"Error scanning {target.label}: {e}", exc_info=True)
+                return None
 
     async def run_once(self, namespace: str = None):
         """Run a single scan immediately (for testing or manual triggers)."""
-        namespaces = [namespace] if namespace else self.namespaces
-        for ns in namespaces:
-            await self.scan_callback(ns)
+        targets = [t for t in self.targets if t.namespace == namespace] if namespace else self.targets
+        await self._report(await self._scan_targets(targets))
@@ -2,9 +2,11 @@
 
 import aiosqlite
 import os
-from datetime import datetime
+from datetime import datetime, timedelta
 from typing import Optional
 
+from metrics import observe_store_write
+
 
 class RunStore:
     """Store for recording Lucas runs to the dashboard database."""
@@ -32,6 +34,26 @@ class RunStore:
                 log TEXT
             )
         """)
+        # Add snapshot column if missing (migration)
+        try:
+            await self._db.execute("ALTER TABLE runs ADD COLUMN snapshot TEXT")
+        except aiosqlite.OperationalError:
+            pass
+        # Add verdict column if missing (migration); JSON from verdict.Verdict.to_json
+        try:
+            await self._db.execute("ALTER TABLE runs ADD COLUMN verdict TEXT")
+        except aiosqlite.OperationalError:
+            pass
+        # Add cluster column if missing (migration); '' is the agent's own cluster
+        try:
+            await self._db.execute("ALTER TABLE runs ADD COLUMN cluster TEXT NOT NULL DEFAULT ''")
+        except aiosqlite.OperationalError:
+            pass
+        # Add prompt column if missing (migration); the scan prompt, replayed by bench/shadow_eval.py
+        try:
+            await self._db.execute("ALTER TABLE runs ADD COLUMN prompt TEXT")
+        except aiosqlite.OperationalError:
+            pass
         await self._db.execute("""
             CREATE TABLE IF NOT EXISTS fixes (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -46,6 +68,11 @@ class RunStore:
                 FOREIGN KEY (run_id) REFERENCES runs(id)
             )
         """)
+        # Add run_id column if missing (migration for databases created by old CronJobs)
+        try:
+            await self._db.execute("ALTER TABLE fixes ADD COLUMN run_id INTEGER")
+        except aiosqlite.OperationalError:
+            pass
         await self._db.execute("""
             CREATE TABLE IF NOT EXISTS token_usage (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -60,6 +87,53 @@ class RunStore:
                 FOREIGN KEY (run_id) REFERENCES runs(id)
             )
         """)
+        try:
+            await self._db.execute("ALTER TABLE token_usage ADD COLUMN cluster TEXT NOT NULL DEFAULT ''")
+        except aiosqlite.OperationalError:
+            pass
+        try:
+            # Set for fan-out sub-investigations of a scan
+            await self._db.execute("ALTER TABLE token_usage ADD COLUMN workload TEXT NOT NULL DEFAULT ''")
+        except aiosqlite.OperationalError:
+            pass
+        await self._db.execute("""
+            CREATE TABLE IF NOT EXISTS log_cursors (
+                namespace TEXT NOT NULL,
+                pod_name TEXT NOT NULL,
+                container TEXT NOT NULL,
+                last_timestamp TEXT NOT NULL,
+                updated_at TEXT NOT NULL,
+                PRIMARY KEY (namespace, pod_name, container)
+            )
+        """)
+        await self._db.execute("""
+            CREATE TABLE IF NOT EXISTS run_spans (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                run_id INTEGER,
+                trace_key TEXT,
+                name TEXT NOT NULL,
+                started_at TEXT NOT NULL,
+                duration_ms REAL NOT NULL,
+                attributes TEXT
+            )
+        """)
+        await self._db.execute(
+            "CREATE INDEX IF NOT EXISTS idx_run_spans_run_id ON run_spans(run_id)"
+        )
+        # Change points of per-container state; scope is "[cluster/]namespace"
+        await self._db.execute("""
+            CREATE TABLE IF NOT EXISTS pod_history (
+                scope TEXT NOT NULL,
+                item TEXT NOT NULL,
+                ts TEXT NOT NULL,
+                phase TEXT NOT NULL,
+                state TEXT NOT NULL DEFAULT '',
+                reason TEXT NOT NULL DEFAULT '',
+                restarts INTEGER NOT NULL DEFAULT 0,
+                healthy INTEGER NOT NULL,
+                PRIMARY KEY (scope, item, ts)
+            ) WITHOUT ROWID
+        """)
         await self._db.commit()
 
     async def close(self):
@@ -67,17 +141,19 @@ class RunStore:
         if self._db:
             await self._db.close()
 
-    async def create_run(self, namespace: str, mode: str = "autonomous") -> int:
+    @observe_store_write("runs")
+    async def create_run(self, namespace: str, mode: str = "autonomous", cluster: str = "") -> int:
         """Create a new run record and return its ID."""
         now = datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
         cursor = await self._db.execute(
-            """INSERT INTO runs (started_at, namespace, mode, status)
-               VALUES (?, ?, ?, 'running')""",
-            (now, namespace, mode)
+            """INSERT INTO runs (started_at, namespace, mode, status, cluster)
+               VALUES (?, ?, ?, 'running', ?)""",
+            (now, namespace, mode, cluster)
         )
         await self._db.commit()
         return cursor.lastrowid
 
+    @observe_store_write("runs")
     async def update_run(
         self,
         run_id: int,
@@ -86,7 +162,10 @@ class RunStore:
         error_count: int = 0,
         fix_count: int = 0,
         report: str = None,
-        log: str = None
+        log: str = None,
+        snapshot: str = None,
+        verdict: str = None,
+        prompt: str = None
     ):
         """Update a run record with results."""
         now = datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
@@ -98,12 +177,96 @@ class RunStore:
                error_count = ?,
                fix_count = ?,
                report = ?,
-               log = ?
+               log = ?,
+               snapshot = ?,
+               verdict = ?,
+               prompt = ?
                WHERE id = ?""",
-            (now, status, pod_count, error_count, fix_count, report, log, run_id)
+            (now, status, pod_count, error_count, fix_count, report, log, snapshot, verdict, prompt, run_id)
         )
         await self._db.commit()
 
+    async def get_last_completed_run(self, namespace: str, cluster: str = "") -> Optional[dict]:
+        """Get the most recent completed run with a stored snapshot for a namespace."""
+        async with self._db.execute(
+            """SELECT id, ended_at, status, report, snapshot FROM runs
+               WHERE namespace = ? AND cluster = ? AND status IN ('ok', 'issues_found', 'fixed')
+               AND snapshot IS NOT NULL
+               ORDER BY id DESC LIMIT 1""",
+            (namespace, cluster)
+        ) as cursor:
+            row = await cursor.fetchone()
+            if not row:
+                return None
+            return {
+                "id": row[0],
+                "ended_at": row[1],
+                "status": row[2],
+                "report": row[3],
+                "snapshot": row[4],
+            }
+
+    async def get_replayable_runs(self, limit: int = 50, namespace: str = None) -> list[dict]:
+        """
+        Get recent completed scans with a stored prompt, newest first.
+
+        Token counts, cost and model come from the run's token_usage rows,
+        agent_seconds from its agent.process spans (0 if none were recorded).
+        """
+        query = """SELECT r.id, r.namespace, r.cluster, r.started_at, r.ended_at, r.status, r.prompt, r.verdict,
+                          COALESCE(SUM(t.input_tokens), 0), COALESCE(SUM(t.output_tokens), 0),
+                          COALESCE(SUM(t.cost), 0), COALESCE(MAX(t.model), ''),
+                          (SELECT COALESCE(SUM(duration_ms), 0) FROM run_spans
+                           WHERE run_id = r.id AND name = 'agent.process') / 1000.0
+                   FROM runs r LEFT JOIN token_usage t ON t.run_id = r.id
+                   WHERE r.prompt IS NOT NULL AND r.status IN ('ok', 'issues_found', 'fixed')"""
+        params: list = []
+        if namespace:
+            query += " AND r.namespace = ?"
+            params.append(namespace)
+        query += " GROUP BY r.id ORDER BY r.id DESC LIMIT ?"
+        params.append(limit)
+        async with self._db.execute(query, params) as cursor:
+            rows = await cursor.fetchall()
+        return [
+            {
+                "id": row[0],
+                "namespace": row[1],
+                "cluster": row[2],
+                "started_at": row[3],
+                "ended_at": row[4],
+                "status": row[5],
+                "prompt": row[6],
+                "verdict": row[7],
+                "input_tokens": row[8],
+                "output_tokens": row[9],
+                "cost": row[10],
+                "model": row[11],
+                "agent_seconds": row[12],
+            }
+            for row in rows
+        ]
+
+    async def get_last_scan_times(self) -> dict[tuple[str, str], str]:
+        """Get when the last finished run ended per (cluster, namespace); deferred scans do not count."""
+        async with self._db.execute(
+            """SELECT cluster, namespace, MAX(ended_at) FROM runs
+               WHERE status NOT IN ('running', 'deferred') AND ended_at IS NOT NULL
+               GROUP BY cluster, namespace"""
+        ) as cursor:
+            return {(row[0], row[1]): row[2] for row in await cursor.fetchall()}
+
+    async def get_last_run_time(self, namespace: str, exclude_run_id: int = None) -> str:
+        """Get when the last finished run for a namespace ended ("" if none)."""
+        async with self._db.execute(
+            """SELECT COALESCE(MAX(ended_at), '') FROM runs
+               WHERE namespace = ? AND status != 'running' AND id != ?""",
+            (namespace, exclude_run_id or 0)
+        ) as cursor:
+            row = await cursor.fetchone()
+            return row[0] if row else ""
+
+    @observe_store_write("runs")
     async def record_fix(
         self,
         run_id: int,
@@ -123,6 +286,7 @@ class RunStore:
         )
         await self._db.commit()
 
+    @observe_store_write("runs")
     async def record_token_usage(
         self,
         run_id: int,
@@ -130,18 +294,158 @@ class RunStore:
         model: str,
         input_tokens: int,
         output_tokens: int,
-        cost: float
+        cost: float,
+        cluster: str = "",
+        workload: str = ""
     ):
-        """Record token usage for a run."""
+        """Record token usage for a run (or one workload's sub-investigation of it)."""
         now = datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
         total_tokens = input_tokens + output_tokens
         await self._db.execute(
-            """INSERT INTO token_usage (run_id, namespace, model, input_tokens, output_tokens, total_tokens, cost, created_at)
+            """INSERT INTO token_usage (run_id, namespace, model, input_tokens, output_tokens, total_tokens, cost, created_at, cluster, workload)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+            (run_id, namespace, model, input_tokens, output_tokens, total_tokens, cost, now, cluster, workload)
+        )
+        await self._db.commit()
+
+    @observe_store_write("runs")
+    async def record_spans(self, run_id: int, spans: list[dict], trace_key: str = None):
+        """
+        Record timing spans for a run.
+
+        Interactive messages have no run, so they use run_id 0 and the
+        Slack thread as trace_key.
+        """
+        if not spans:
+            return
+        await self._db.executemany(
+            """INSERT INTO run_spans (run_id, trace_key, name, started_at, duration_ms, attributes)
+               VALUES (?, ?, ?, ?, ?, ?)""",
+            [
+                (run_id, trace_key, s["name"], s["started_at"], s["duration_ms"], s["attributes"])
+                for s in spans
+            ]
+        )
+        await self._db.commit()
+
+    async def get_log_cursors(self, namespace: str) -> dict[tuple[str, str], str]:
+        """Get log cursors for a namespace, keyed by (pod_name, container)."""
+        async with self._db.execute(
+            "SELECT pod_name, container, last_timestamp FROM log_cursors WHERE namespace = ?",
+            (namespace,)
+        ) as cursor:
+            rows = await cursor.fetchall()
+            return {(pod, container): ts for pod, container, ts in rows}
+
+    @observe_store_write("runs")
+    async def save_log_cursors(
+        self,
+        namespace: str,
+        cursors: dict[tuple[str, str], str],
+        keep_pods: list[str] = None
+    ):
+        """
+        Save log cursors for a namespace in one transaction.
+
+        If keep_pods is given, cursors for pods not in the list are removed.
+        """
+        now = datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
+        await self._db.executemany(
+            """INSERT INTO log_cursors (namespace, pod_name, container, last_timestamp, updated_at)
+               VALUES (?, ?, ?, ?, ?)
+               ON CONFLICT(namespace, pod_name, container) DO UPDATE SET
+                   last_timestamp = excluded.last_timestamp,
+                   updated_at = excluded.updated_at""",
+            [(namespace, pod, container, ts, now) for (pod, container), ts in cursors.items()]
+        )
+        if keep_pods is not None:
+            placeholders = ",".join("?" * len(keep_pods))
+            await self._db.execute(
+                f"DELETE FROM log_cursors WHERE namespace = ? AND pod_name NOT IN ({placeholders})",
+                (namespace, *keep_pods)
+            )
+        await self._db.commit()
+
+    async def get_latest_pod_points(self, scope: str) -> dict[str, tuple]:
+        """
+        Get the newest history point of every item in a scope.
+
+        Returns:
+            Dict of item to (ts, phase, state, reason, restarts, healthy)
+        """
+        # SQLite takes the bare columns from the row with MAX(ts)
+        async with self._db.execute(
+            """SELECT item, MAX(ts), phase, state, reason, restarts, healthy
+               FROM pod_history WHERE scope = ? GROUP BY item""",
+            (scope,)
+        ) as cursor:
+            rows = await cursor.fetchall()
+            return {row[0]: row[1:] for row in rows}
+
+    async def get_pod_history(self, scope: str, since: str) -> dict[str, list[tuple]]:
+        """
+        Get each item's points since a time, preceded by its last point before it.
+
+        Returns:
+            Dict of item to (ts, phase, state, reason, restarts, healthy) tuples in time order
+        """
+        async with self._db.execute(
+            """SELECT item, ts, phase, state, reason, restarts, healthy
+               FROM pod_history WHERE scope = ? AND ts >= ?
+               UNION ALL
+               SELECT item, MAX(ts), phase, state, reason, restarts, healthy
+               FROM pod_history WHERE scope = ? AND ts < ? GROUP BY item
+               ORDER BY 1, 2""",
+            (scope, since, scope, since)
+        ) as cursor:
+            rows = await cursor.fetchall()
+        history: dict[str, list[tuple]] = {}
+        for row in rows:
+            history.setdefault(row[0], []).append(row[1:])
+        return history
+
+    @observe_store_write("runs")
+    async def append_pod_history(self, scope: str, points: dict[str, tuple]):
+        """Append history points, keyed by item, as (ts, phase, state, reason, restarts, healthy)."""
+        if not points:
+            return
+        await self._db.executemany(
+            """INSERT OR REPLACE INTO pod_history (scope, item, ts, phase, state, reason, restarts, healthy)
                VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
-            (run_id, namespace, model, input_tokens, output_tokens, total_tokens, cost, now)
+            [
+                (scope, item, ts, phase, state, reason, restarts, int(healthy))
+                for item, (ts, phase, state, reason, restarts, healthy) in points.items()
+            ]
         )
         await self._db.commit()
 
+    @observe_store_write("runs")
+    async def downsample_pod_history(self, full_resolution_hours: int = 24, retention_days: int = 14) -> int:
+        """
+        Thin out old history.
+
+        Points older than full_resolution_hours are reduced to the last one
+        per item and hour; restart counts are absolute, so increases over
+        the hour are kept. Points older than retention_days are deleted.
+
+        Returns:
+            Number of points removed
+        """
+        now = datetime.utcnow()
+        cutoff = (now - timedelta(hours=full_resolution_hours)).strftime("%Y-%m-%d %H:%M:%S")
+        expiry = (now - timedelta(days=retention_days)).strftime("%Y-%m-%d %H:%M:%S")
+        expired = await self._db.execute("DELETE FROM pod_history WHERE ts < ?", (expiry,))
+        thinned = await self._db.execute(
+            """DELETE FROM pod_history WHERE ts < ? AND EXISTS (
+                   SELECT 1 FROM pod_history later
+                   WHERE later.scope = pod_history.scope AND later.item = pod_history.item
+                   AND later.ts > pod_history.ts AND substr(later.ts, 1, 13) = substr(pod_history.ts, 1, 13)
+               )""",
+            (cutoff,)
+        )
+        await self._db.commit()
+        return expired.rowcount + thinned.rowcount
+
 
 class SessionStore:
     """SQLite-based session store."""
@@ -163,6 +467,50 @@ class SessionStore:
                 updated_at TEXT NOT NULL
             )
         """)
+        # Add cluster column if missing (migration)
+        try:
+            await self._db.execute("ALTER TABLE slack_sessions ADD COLUMN cluster TEXT NOT NULL DEFAULT ''")
+        except aiosqlite.OperationalError:
+            pass
+        # Add shared column if missing (migration); set when the session belongs to another thread
+        try:
+            await self._db.execute("ALTER TABLE slack_sessions ADD COLUMN shared INTEGER NOT NULL DEFAULT 0")
+        except aiosqlite.OperationalError:
+            pass
+        # Follow-up sessions of the namespaces in a scan digest thread
+        await self._db.execute("""
+            CREATE TABLE IF NOT EXISTS digest_sessions (
+                thread_ts TEXT NOT NULL,
+                label TEXT NOT NULL,
+                session_id TEXT NOT NULL,
+                channel TEXT NOT NULL,
+                namespace TEXT NOT NULL,
+                cluster TEXT NOT NULL DEFAULT '',
+                created_at TEXT NOT NULL,
+                updated_at TEXT NOT NULL,
+                PRIMARY KEY (thread_ts, label)
+            )
+        """)
+        # slack_ask questions waiting for a human; keyed by the thread the reply will arrive in
+        await self._db.execute("""
+            CREATE TABLE IF NOT EXISTS pending_questions (
+                thread_ts TEXT PRIMARY KEY,
+                session_id TEXT NOT NULL,
+                channel TEXT NOT NULL,
+                question TEXT NOT NULL,
+                origin TEXT NOT NULL,
+                namespace TEXT,
+                cluster TEXT NOT NULL DEFAULT '',
+                created_at TEXT NOT NULL
+            )
+        """)
+        # Slack events already handled, so redeliveries are dropped across restarts
+        await self._db.execute("""
+            CREATE TABLE IF NOT EXISTS slack_events (
+                event_key TEXT PRIMARY KEY,
+                seen_at TEXT NOT NULL
+            )
+        """)
         await self._db.commit()
 
     async def close(self):
@@ -170,22 +518,51 @@ class SessionStore:
         if self._db:
             await self._db.close()
 
+    @observe_store_write("sessions")
+    async def claim_event(self, event_key: str) -> bool:
+        """Record a Slack event. Returns False if it was already recorded."""
+        cursor = await self._db.execute(
+            "INSERT OR IGNORE INTO slack_events (event_key, seen_at) VALUES (?, ?)",
+            (event_key, datetime.utcnow().isoformat())
+        )
+        await self._db.commit()
+        return cursor.rowcount == 1
+
+    @observe_store_write("sessions")
+    async def cleanup_events(self, hours: int = 24) -> int:
+        """Forget handled events older than the given hours. Returns count deleted."""
+        cursor = await self._db.execute("""
+            DELETE FROM slack_events
+            WHERE datetime(seen_at) < datetime('now', ?)
+        """, (f"-{hours} hours",))
+        await self._db.commit()
+        return cursor.rowcount
+
+    @observe_store_write("sessions")
     async def save_session(
         self,
         thread_ts: str,
         session_id: str,
         channel: str,
-        namespace: str = None
+        namespace: str = None,
+        cluster: str = "",
+        shared: bool = False
     ):
-        """Save or update a session mapping."""
+        """
+        Save or update a session mapping.
+
+        shared marks a session that also belongs to another thread; the
+        thread's first run forks it instead of appending to it.
+        """
         now = datetime.utcnow().isoformat()
         await self._db.execute("""
-            INSERT INTO slack_sessions (thread_ts, session_id, channel, namespace, created_at, updated_at)
-            VALUES (?, ?, ?, ?, ?, ?)
+            INSERT INTO slack_sessions (thread_ts, session_id, channel, namespace, created_at, updated_at, cluster, shared)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
             ON CONFLICT(thread_ts) DO UPDATE SET
                 session_id = excluded.session_id,
-                updated_at = excluded.updated_at
-        """, (thread_ts, session_id, channel, namespace, now, now))
+                updated_at = excluded.updated_at,
+                shared = excluded.shared
+        """, (thread_ts, session_id, channel, namespace, now, now, cluster, int(shared)))
         await self._db.commit()
 
     async def get_session(self, thread_ts: str) -> Optional[str]:
@@ -206,10 +583,29 @@ class SessionStore:
             row = await cursor.fetchone()
             return row[0] if row else None
 
+    async def get_cluster(self, thread_ts: str) -> str:
+        """Get the cluster (kubeconfig context) a thread's session works on."""
+        async with self._db.execute(
+            "SELECT cluster FROM slack_sessions WHERE thread_ts = ?",
+            (thread_ts,)
+        ) as cursor:
+            row = await cursor.fetchone()
+            return row[0] if row else ""
+
+    async def is_shared(self, thread_ts: str) -> bool:
+        """Check if a thread's session must be forked before it is resumed."""
+        async with self._db.execute(
+            "SELECT shared FROM slack_sessions WHERE thread_ts = ?",
+            (thread_ts,)
+        ) as cursor:
+            row = await cursor.fetchone()
+            return bool(row and row[0])
+
     async def has_session(self, thread_ts: str) -> bool:
         """Check if a thread has an associated session."""
         return await self.get_session(thread_ts) is not None
 
+    @observe_store_write("sessions")
     async def delete_session(self, thread_ts: str):
         """Delete a session mapping."""
         await self._db.execute(
@@ -218,17 +614,141 @@ class SessionStore:
         )
         await self._db.commit()
 
+    @observe_store_write("sessions")
     async def cleanup_old_sessions(self, days: int = 7) -> int:
         """Remove sessions older than specified days. Returns count deleted."""
         cursor = await self._db.execute("""
             DELETE FROM slack_sessions
             WHERE datetime(updated_at) < datetime('now', ?)
         """, (f"-{days} days",))
+        digest_cursor = await self._db.execute("""
+            DELETE FROM digest_sessions
+            WHERE datetime(updated_at) < datetime('now', ?)
+        """, (f"-{days} days",))
         await self._db.commit()
-        return cursor.rowcount
+        return cursor.rowcount + digest_cursor.rowcount
+
+    @observe_store_write("sessions")
+    async def save_digest_session(
+        self,
+        thread_ts: str,
+        label: str,
+        session_id: str,
+        channel: str,
+        namespace: str,
+        cluster: str = ""
+    ):
+        """Save or update the follow-up session of one namespace in a digest thread."""
+        now = datetime.utcnow().isoformat()
+        await self._db.execute("""
+            INSERT INTO digest_sessions (thread_ts, label, session_id, channel, namespace, cluster, created_at, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(thread_ts, label) DO UPDATE SET
+                session_id = excluded.session_id,
+                updated_at = excluded.updated_at
+        """, (thread_ts, label, session_id, channel, namespace, cluster, now, now))
+        await self._db.commit()
+
+    async def get_digest_sessions(self, thread_ts: str) -> list[dict]:
+        """Get the namespace sessions of a digest thread, most recently used first."""
+        async with self._db.execute("""
+            SELECT label, session_id, namespace, cluster, created_at, updated_at
+            FROM digest_sessions WHERE thread_ts = ?
+            ORDER BY updated_at DESC
+        """, (thread_ts,)) as cursor:
+            rows = await cursor.fetchall()
+        keys = ("label", "session_id", "namespace", "cluster", "created_at", "updated_at")
+        return [dict(zip(keys, row)) for row in rows]
 
     async def get_session_count(self) -> int:
         """Get total number of sessions."""
         async with self._db.execute("SELECT COUNT(*) FROM slack_sessions") as cursor:
             row = await cursor.fetchone()
             return row[0] if row else 0
+
+    @observe_store_write("sessions")
+    async def save_pending_question(
+        self,
+        thread_ts: str,
+        session_id: str,
+        channel: str,
+        question: str,
+        origin: str,
+        namespace: str = None,
+        cluster: str = ""
+    ):
+        """
+        Persist a question the agent is waiting on.
+
+        Args:
+            thread_ts: Thread the reply is expected in
+            session_id: Claude session to resume with the reply
+            channel: Slack channel ID
+            question: The question that was posted
+            origin: Entry point that asked it (mention, thread, scan)
+            namespace: Namespace the session works on, if any
+            cluster: Kubeconfig context the session works on
+        """
+        await self._db.execute("""
+            INSERT OR REPLACE INTO pending_questions
+                (thread_ts, session_id, channel, question, origin, namespace, cluster, created_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        """, (
+            thread_ts, session_id, channel, question, origin, namespace, cluster,
+            datetime.utcnow().isoformat()
+        ))
+        await self._db.commit()
+
+    @observe_store_write("sessions")
+    async def pop_pending_question(self, thread_ts: str) -> Optional[dict]:
+        """
+        Remove and return the pending question for a thread.
+
+        Only one caller gets the question if replies race.
+
+        Returns:
+            Dict with thread_ts, session_id, channel, question, origin,
+            namespace, cluster and created_at, or None
+        """
+        async with self._db.execute(
+            """SELECT session_id, channel, question, origin, namespace, cluster, created_at
+               FROM pending_questions WHERE thread_ts = ?""",
+            (thread_ts,)
+        ) as cursor:
+            row = await cursor.fetchone()
+        if not row:
+            return None
+
+        cursor = await self._db.execute(
+            "DELETE FROM pending_questions WHERE thread_ts = ?",
+            (thread_ts,)
+        )
+        await self._db.commit()
+        if not cursor.rowcount:
+            return None
+        return {
+            "thread_ts": thread_ts,
+            "session_id": row[0],
+            "channel": row[1],
+            "question": row[2],
+            "origin": row[3],
+            "namespace": row[4],
+            "cluster": row[5],
+            "created_at": row[6],
+        }
+
+    @observe_store_write("sessions")
+    async def cleanup_pending_questions(self, hours: int = 24) -> int:
+        """Drop questions nobody answered within the given hours. Returns count deleted."""
+        cursor = await self._db.execute("""
+            DELETE FROM pending_questions
+            WHERE datetime(created_at) < datetime('now', ?)
+        """, (f"-{hours} hours",))
+        await self._db.commit()
+        return cursor.rowcount
+
+    async def get_pending_question_count(self) -> int:
+        """Get number of questions waiting for a reply."""
+        async with self._db.execute("SELECT COUNT(*) FROM pending_questions") as cursor:
+            row = await cursor.fetchone()
+            return row[0] if row else 0
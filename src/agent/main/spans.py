@@ -0,0 +1,51 @@
+"""Lightweight phase timing spans for agent runs."""
+
+import json
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+
+class SpanRecorder:
+    """
+    Collect timing spans for one run in memory.
+
+    Spans are flushed to the run_spans table with RunStore.record_spans once
+    the run finishes, so instrumentation adds no database writes mid-run.
+    """
+
+    def __init__(self):
+        self.spans: list[dict] = []
+
+    @contextmanager
+    def span(self, name: str, **attributes):
+        """Time the enclosed block as a span."""
+        started_at = time.time()
+        start = time.perf_counter()
+        try:
+            yield attributes
+        finally:
+            self.add(name, started_at, time.perf_counter() - start, attributes)
+
+    def add(self, name: str, started_at: float, duration: float, attributes: dict = None):
+        """Add a span with a wall-clock start time and duration in seconds."""
+        self.spans.append({
+            "name": name,
+            "started_at": datetime.utcfromtimestamp(started_at).strftime("%Y-%m-%d %H:%M:%S.%f")[:-3],
+            "duration_ms": round(duration * 1000, 1),
+            "attributes": json.dumps(attributes, default=str) if attributes else None,
+        })
+
+    def add_tool_calls(self, tool_calls: list[dict]):
+        """Add spans for tool calls parsed from the CLI stream."""
+        for call in tool_calls:
+            attributes = {"error": call.get("is_error", False)}
+            command = call["input"].get("command")
+            if command:
+                attributes["command"] = command[:200]
+            self.add(
+                f"tool.{call['name']}",
+                call["started_at"],
+                call["ended_at"] - call["started_at"],
+                attributes
+            )
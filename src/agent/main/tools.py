@@ -1,15 +1,11 @@
 """Custom tools for Slack communication."""
 
-import asyncio
 import logging
 from typing import Optional
 from slack_sdk.web.async_client import AsyncWebClient
 
 logger = logging.getLogger(__name__)
 
-# Pending replies: thread_ts -> asyncio.Future
-pending_replies: dict[str, asyncio.Future] = {}
-
 
 class SlackTools:
     """Custom tools for Claude to communicate via Slack."""
@@ -18,64 +14,37 @@ class SlackTools:
         self.client = client
         self.default_channel = default_channel
 
-    async def slack_ask(
+    async def post_question(
         self,
         message: str,
         channel: str = None,
-        thread_ts: str = None,
-        timeout: int = 300
+        thread_ts: str = None
     ) -> str:
         """
-        Post a message to Slack and wait for a reply.
+        Post a question to Slack without waiting for the answer.
 
         Args:
             message: The question to ask
             channel: Slack channel ID (uses default if not specified)
             thread_ts: Thread to post in (creates new thread if not specified)
-            timeout: Seconds to wait for reply (default 5 minutes)
 
         Returns:
-            The user's reply text, or a timeout message
+            The thread_ts the reply will arrive in
         """
         channel = channel or self.default_channel
-        if not channel:
-            return "[Error: No channel specified and no default channel set]"
-
-        try:
-            # Post the question
-            if thread_ts:
-                response = await self.client.chat_postMessage(
-                    channel=channel,
-                    thread_ts=thread_ts,
-                    text=f":robot_face: *Lucas Question*\n\n{message}"
-                )
-                wait_ts = thread_ts  # Wait for reply in same thread
-            else:
-                response = await self.client.chat_postMessage(
-                    channel=channel,
-                    text=f":robot_face: *Lucas Question*\n\n{message}\n\n_Reply to this thread to respond_"
-                )
-                wait_ts = response["ts"]  # Wait for reply in new thread
-
-            logger.info(f"Posted question to {channel}, waiting for reply in thread {wait_ts}")
-
-            # Create a future to wait for reply
-            future = asyncio.get_event_loop().create_future()
-            pending_replies[wait_ts] = future
-
-            try:
-                reply = await asyncio.wait_for(future, timeout=timeout)
-                logger.info(f"Received reply: {reply[:100]}...")
-                return reply
-            except asyncio.TimeoutError:
-                logger.warning(f"No reply received within {timeout}s timeout")
-                return f"[No reply received within {timeout} seconds]"
-            finally:
-                pending_replies.pop(wait_ts, None)
+        if thread_ts:
+            await self.client.chat_postMessage(
+                channel=channel,
+                thread_ts=thread_ts,
+                text=f":robot_face: *Lucas Question*\n\n{message}"
+            )
+            return thread_ts  # Reply comes in the same thread
 
-        except Exception as e:
-            logger.error(f"Error in slack_ask: {e}")
-            return f"[Error posting to Slack: {str(e)}]"
+        response = await self.client.chat_postMessage(
+            channel=channel,
+            text=f":robot_face: *Lucas Question*\n\n{message}\n\n_Reply to this thread to respond_"
+        )
+        return response["ts"]  # Reply comes in the new thread
 
     async def slack_reply(
         self,
@@ -150,20 +119,3 @@ class SlackTools:
         except Exception as e:
             logger.error(f"Error in slack_notify: {e}")
             return f"[Error sending notification: {str(e)}]"
-
-
-def resolve_pending_reply(thread_ts: str, text: str) -> bool:
-    """
-    Resolve a pending reply future.
-
-    Called by the Slack event handler when a reply is received.
-
-    Returns:
-        True if there was a pending future for this thread
-    """
-    if thread_ts in pending_replies:
-        future = pending_replies[thread_ts]
-        if not future.done():
-            future.set_result(text)
-            return True
-    return False
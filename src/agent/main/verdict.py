@@ -0,0 +1,173 @@
+"""Structured scan verdicts: the block scheduled scans end with."""
+
+import json
+import logging
+import re
+from typing import NamedTuple, Optional
+
+logger = logging.getLogger(__name__)
+
+VERDICT_START = "===VERDICT_START==="
+VERDICT_END = "===VERDICT_END==="
+VERDICT_PATTERN = re.compile(
+    re.escape(VERDICT_START) + r"\s*(?:```(?:json)?)?\s*(.*?)\s*(?:```)?\s*" + re.escape(VERDICT_END),
+    re.DOTALL
+)
+
+STATUSES = ("ok", "issues_found", "fixed")
+# Ordered from least to most severe
+SEVERITIES = ("none", "low", "medium", "high", "critical")
+
+# Appended to the scheduled scan prompt
+VERDICT_INSTRUCTIONS = f"""End your response with a verdict block in exactly this format (it is parsed, not shown to humans):
+{VERDICT_START}
+{{
+  "status": "<ok|issues_found|fixed>",
+  "severity": "<none|low|medium|high|critical>",
+  "pod_count": <pods checked>,
+  "summary": "<one sentence>",
+  "findings": [
+    {{"pod": "<name>", "issue": "<what is wrong>", "severity": "<low|medium|high|critical>", "action": "<what you did or recommend>", "fixed": <true|false>}}
+  ]
+}}
+{VERDICT_END}
+Use "ok" with an empty findings list when nothing needs attention, "fixed" when every finding was fixed."""
+
+
+class Finding(NamedTuple):
+    """One problem the scan found."""
+    pod: str
+    issue: str
+    severity: str
+    action: str
+    fixed: bool
+
+
+class Verdict(NamedTuple):
+    """Validated scan verdict."""
+    status: str
+    severity: str
+    pod_count: int
+    summary: str
+    findings: list[Finding]
+
+    @property
+    def error_count(self) -> int:
+        return len(self.findings)
+
+    @property
+    def fix_count(self) -> int:
+        return sum(1 for f in self.findings if f.fixed)
+
+    def to_json(self) -> str:
+        """Serialize for storage in runs.verdict."""
+        return json.dumps({
+            "status": self.status,
+            "severity": self.severity,
+            "pod_count": self.pod_count,
+            "error_count": self.error_count,
+            "fix_count": self.fix_count,
+            "summary": self.summary,
+            "findings": [f._asdict() for f in self.findings],
+        }, separators=(",", ":"))
+
+
+def severity_at_least(severity: str, minimum: str) -> bool:
+    """Compare severities; unknown values rank lowest."""
+    rank = {name: i for i, name in enumerate(SEVERITIES)}
+    return rank.get(severity, 0) >= rank.get(minimum, 0)
+
+
+def _count(value) -> int:
+    try:
+        return max(0, int(value))
+    except (TypeError, ValueError):
+        return 0
+
+
+def _finding(item: dict) -> Finding:
+    severity = str(item.get("severity", "")).lower()
+    return Finding(
+        pod=str(item.get("pod") or ""),
+        issue=str(item.get("issue") or ""),
+        severity=severity if severity in SEVERITIES[1:] else "medium",
+        action=str(item.get("action") or ""),
+        fixed=item.get("fixed") is True,
+    )
+
+
+def parse_verdict(text: str) -> Optional[Verdict]:
+    """
+    Parse and validate the last verdict block in a response.
+
+    Status and overall severity are made consistent with the findings:
+    unfixed findings mean issues_found, all fixed means fixed, none means
+    ok; severity is at least that of the worst unfixed finding.
+
+    Returns:
+        The verdict, or None if there is no parseable block
+    """
+    matches = VERDICT_PATTERN.findall(text or "")
+    if not matches:
+        return None
+    try:
+        data = json.loads(matches[-1])
+    except json.JSONDecodeError as e:
+        logger.warning(f"Invalid verdict JSON: {e}")
+        return None
+    if not isinstance(data, dict):
+        logger.warning("Verdict is not a JSON object")
+        return None
+
+    findings = [_finding(item) for item in data.get("findings") or [] if isinstance(item, dict)]
+    open_findings = [f for f in findings if not f.fixed]
+
+    if open_findings:
+        status = "issues_found"
+    elif findings:
+        status = "fixed"
+    else:
+        # Trust a declared problem even without itemized findings
+        status = data.get("status") if data.get("status") in STATUSES else "ok"
+
+    severity = str(data.get("severity", "")).lower()
+    if severity not in SEVERITIES:
+        severity = "none" if status == "ok" else "medium"
+    for f in open_findings:
+        if not severity_at_least(severity, f.severity):
+            severity = f.severity
+
+    return Verdict(
+        status=status,
+        severity=severity,
+        pod_count=_count(data.get("pod_count")),
+        summary=str(data.get("summary") or ""),
+        findings=findings,
+    )
+
+
+def merge_verdicts(verdicts: list[Verdict], pod_count: int, summary: str) -> Verdict:
+    """
+    Combine the verdicts of sub-investigations into one.
+
+    Status follows the combined findings like parse_verdict; severity is
+    the worst of the non-ok verdicts.
+    """
+    findings = [f for v in verdicts for f in v.findings]
+    if any(not f.fixed for f in findings) or any(v.status == "issues_found" for v in verdicts):
+        status = "issues_found"
+    elif findings or any(v.status == "fixed" for v in verdicts):
+        status = "fixed"
+    else:
+        status = "ok"
+
+    severity = "none"
+    for v in verdicts:
+        if v.status != "ok" and not severity_at_least(severity, v.severity):
+            severity = v.severity
+    return Verdict(status, severity, pod_count, summary, findings)
+
+
+def strip_verdict(text: str) -> str:
+    """Remove verdict blocks from a response before showing it to humans."""
+    return VERDICT_PATTERN.sub("", text or "").strip()
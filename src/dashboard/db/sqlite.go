@@ -2,6 +2,7 @@ package db
 
 import (
 	"database/sql"
+	"fmt"
 
 	_ "github.com/mattn/go-sqlite3"
 )
@@ -61,6 +62,16 @@ type TokenUsage struct {
 	CreatedAt    string
 }
 
+type PodHistoryPoint struct {
+	Item     string
+	TS       string
+	Phase    string
+	State    string
+	Reason   string
+	Restarts int
+	Healthy  bool
+}
+
 type CostStats struct {
 	TotalInputTokens  int
 	TotalOutputTokens int
@@ -139,6 +150,24 @@ func New(path string) (*DB, error) {
 		return nil, err
 	}
 
+	// Create pod_history table (written by the agent; scope is "[cluster/]namespace")
+	_, err = conn.Exec(`
+		CREATE TABLE IF NOT EXISTS pod_history (
+			scope TEXT NOT NULL,
+			item TEXT NOT NULL,
+			ts TEXT NOT NULL,
+			phase TEXT NOT NULL,
+			state TEXT NOT NULL DEFAULT '',
+			reason TEXT NOT NULL DEFAULT '',
+			restarts INTEGER NOT NULL DEFAULT 0,
+			healthy INTEGER NOT NULL,
+			PRIMARY KEY (scope, item, ts)
+		) WITHOUT ROWID
+	`)
+	if err != nil {
+		return nil, err
+	}
+
 	return &DB{conn: conn}, nil
 }
 
@@ -436,3 +465,29 @@ func (db *DB) RecordTokenUsage(runID int, namespace, model string, inputTokens,
 	`, runID, namespace, model, inputTokens, outputTokens, inputTokens+outputTokens, cost)
 	return err
 }
+
+// Pod history operations (table written by the agent at each scan)
+
+func (db *DB) GetPodHistory(scope string, hours int) ([]PodHistoryPoint, error) {
+	rows, err := db.conn.Query(`
+		SELECT item, ts, phase, state, reason, restarts, healthy
+		FROM pod_history
+		WHERE scope = ? AND ts >= datetime('now', ?)
+		ORDER BY item, ts
+	`, scope, fmt.Sprintf("-%d hours", hours))
+	if err != nil {
+		return nil, err
+	}
+	defer rows.Close()
+
+	var points []PodHistoryPoint
+	for rows.Next() {
+		var p PodHistoryPoint
+		err := rows.Scan(&p.Item, &p.TS, &p.Phase, &p.State, &p.Reason, &p.Restarts, &p.Healthy)
+		if err != nil {
+			return nil, err
+		}
+		points = append(points, p)
+	}
+	return points, nil
+}
@@ -296,6 +296,27 @@ func (h *Handler) APIRun(w http.ResponseWriter, r *http.Request) {
 	json.NewEncoder(w).Encode(result)
 }
 
+func (h *Handler) APIPodHistory(w http.ResponseWriter, r *http.Request) {
+	// Scope is "[cluster/]namespace", as the agent records it
+	scope := r.URL.Query().Get("scope")
+	if scope == "" {
+		http.Error(w, "Missing scope", http.StatusBadRequest)
+		return
+	}
+	hours, err := strconv.Atoi(r.URL.Query().Get("hours"))
+	if err != nil || hours <= 0 {
+		hours = 24
+	}
+
+	points, err := h.db.GetPodHistory(scope, hours)
+	if err != nil {
+		http.Error(w, err.Error(), http.StatusInternalServerError)
+		return
+	}
+	w.Header().Set("Content-Type", "application/json")
+	json.NewEncoder(w).Encode(points)
+}
+
 func (h *Handler) Health(w http.ResponseWriter, r *http.Request) {
 	w.WriteHeader(http.StatusOK)
 	w.Write([]byte("ok"))
@@ -210,6 +210,7 @@ func main() {
 	http.HandleFunc("/api/run", authRequired(h.APIRun))
 	http.HandleFunc("/api/sessions", authRequired(h.APISessions))
 	http.HandleFunc("/api/session", authRequired(h.APIDeleteSession))
+	http.HandleFunc("/api/pod-history", authRequired(h.APIPodHistory))
 
 	// Health check (no auth - for k8s probes)
 	http.HandleFunc("/health", h.Health)